@@ -6,55 +6,28 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import math
+import sys
 import logging
+import logging.handlers
+import argparse
 from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
-import yaml
 import json
-from enum import Enum
-from collections import defaultdict, Counter
+from collections import Counter
 from datetime import datetime
 import time
 #from Neoden4_PCR_Splitter import PCR_File_Splitter
 #from Assembly_file_splitter import AssemblyFileSplitter
 from typing import Dict, List, Tuple, Optional, Callable  # Add Callable here
 from template_override_v1a import Template_Override
+from n4_core import cli as n4_cli
+from n4_core import (
+    DEFAULT_BOARD_GAP, FEEDER_CHANGES_FILE, PCR_FILES_DIR,
+    OutputStage, PCBDataProcessor, PCBProcessingError, PCR_File_Splitter,
+    PlacementLOD, load_logging_config, setup_logging, start_tracing,
+    ServiceClient, load_service_config, save_board_settings
+)
 
-FEEDER_20_MAX_COUNT = 4  # Define at class level
-
-class PlacementResult(Enum):
-    PLACED = 1
-    ALREADY_PLACED = 2
-    NOT_PLACED = 3
-
-# ---- Custom Exceptions ----
-class PCBProcessingError(Exception):
-    """Custom exception for PCB processing errors"""
-    pass
-
-# ---- Data Models ----
-@dataclass
-class Point:
-    x: float
-    y: float
-    
-    def distance_to(self, other: 'Point') -> float:
-        return np.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
-
-@dataclass
-class Component:
-    refdes: str
-    value: str
-    symbol: str
-    position: Point
-    rotation: float
-    mirror: bool
-    feeder_id: Optional[str] = None
-    nozzle_type: Optional[str] = None
-    
-    @property
-    def is_fiducial(self) -> bool:
-        return self.refdes.startswith('FID')
 
 # ---- Configuration Management ----
 @dataclass
@@ -137,62 +110,9 @@ class N4SortGUIApp(tk.Tk):
         self.mainloop()
     
     def setup_logging(self):
-        """Setup logging configuration with all logs under 'logs' directory"""
-        # Create logs directory if it doesn't exist
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        
-        # Create log file names with timestamps
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        main_log = log_dir / f"neoden4_processor_{timestamp}.log"
-        pcr_log = log_dir / f"pcr_processing_{timestamp}.log"
-        debug_log = log_dir / f"debug_{timestamp}.log"
-        
-        # Create formatters
-        standard_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        detailed_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
-        )
-        
-        # Setup root logger
-        root_logger = logging.getLogger()
-        root_logger.setLevel(logging.DEBUG)
-        
-        # Clear any existing handlers
-        for handler in root_logger.handlers[:]:
-            root_logger.removeHandler(handler)
-        
-        # Main processing log - INFO and above
-        main_handler = logging.FileHandler(main_log)
-        main_handler.setLevel(logging.INFO)
-        main_handler.setFormatter(standard_formatter)
-        root_logger.addHandler(main_handler)
-        
-        # PCR processing specific log - INFO and above
-        pcr_handler = logging.FileHandler(pcr_log)
-        pcr_handler.setLevel(logging.INFO)
-        pcr_handler.setFormatter(standard_formatter)
-        logging.getLogger('PCR_File_Splitter').addHandler(pcr_handler)
-        
-        # Debug log - DEBUG and above
-        debug_handler = logging.FileHandler(debug_log)
-        debug_handler.setLevel(logging.DEBUG)
-        debug_handler.setFormatter(detailed_formatter)
-        root_logger.addHandler(debug_handler)
-        
-        # Console handler - INFO and above
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(standard_formatter)
-        root_logger.addHandler(console_handler)
-        
-        # Log the initialization
-        logging.info(f"Logging initialized - logs directory: {log_dir.absolute()}")
-        logging.info(f"Main log: {main_log.name}")
-        logging.info(f"PCR log: {pcr_log.name}")
-        logging.info(f"Debug log: {debug_log.name}")
+        """Send all logging through the shared writer to the rotating files under 'logs'"""
+        # Size- and age-bounded files; levels per logger come from configuration.json
+        setup_logging(load_logging_config())
 
 # ---- Improved Menu Class ----
 class N4SortMenu(ttk.Frame):
@@ -204,6 +124,13 @@ class N4SortMenu(ttk.Frame):
         
         # Initialize data processor
         self.data_processor = PCBDataProcessor()
+        # Board read/transform from the last Generate, reused when only the sort changes
+        self.prepared_board = None
+        self.last_output_file = None
+        
+        # Jobs go to the local service when it is enabled and running
+        service_config = load_service_config()
+        self.service = ServiceClient.from_config(service_config) if service_config['enabled'] else None
         
         # Create variables for sorting options
         self.sorting_vars = {
@@ -313,12 +240,23 @@ class N4SortMenu(ttk.Frame):
                                 text="(Leave empty for auto-calculation)", 
                                 font=("Times New Roman", 10, "italic"))
         self.width_info.grid(row=3, column=3, padx=6, pady=5)
+
+        # Panel board gap for per-board fiducial transforms
+        self.board_gap = ttk.Spinbox(frame1, name="board gap", justify="left",
+                                    width=20, from_=0, to=500)
+        self.board_gap.configure(font=("Times New Roman", 14), increment=0.5)
+        self.board_gap.set(f"{DEFAULT_BOARD_GAP:g}")
+        self.board_gap.grid(row=4, columnspan=2, column=1, padx=6, pady=5)
+        ttk.Label(frame1,
+                  text="(Panels only: gap between boards, 0 = single board)",
+                  font=("Times New Roman", 10, "italic")).grid(row=4, column=3, padx=6, pady=5)
         
         # Create top row buttons
         buttons = [
             ("Open PCB-file", 1, 0, lambda: self.open_pcbfile(self.pcb_file_entry, self.template_file_entry), None),
             ("Open Template", 2, 0, lambda: self.open_templatefile(self.template_file_entry), None),
-            ("PCB Width(mm)", 3, 0, None, None)  # Label only
+            ("PCB Width(mm)", 3, 0, None, None),  # Label only
+            ("Board Gap(mm)", 4, 0, None, None)  # Label only
         ]
         
         for text, row, col, command, _ in buttons:
@@ -368,6 +306,8 @@ class N4SortMenu(ttk.Frame):
                         fg='blue', font=("Times New Roman", 12, "bold"))
         template_btn = tk.Button(button_frame, text="Template Override", command=self.launch_template_override,
                             fg='purple', font=("Times New Roman", 12, "bold"))
+        preview_btn = tk.Button(button_frame, text=" Preview ", command=self.show_preview,
+                            fg='darkgreen', font=("Times New Roman", 12, "bold"))
         help_btn = tk.Button(button_frame, text=" Help Guide ", command=self.show_help,
                             fg='blue', font=("Times New Roman", 12, "bold"))
 
@@ -376,7 +316,8 @@ class N4SortMenu(ttk.Frame):
         gen_btn.grid(row=0, column=3, padx=15)
         xy_offset_btn.grid(row=0, column=5, padx=15)
         template_btn.grid(row=0, column=7, padx=15)
-        help_btn.grid(row=0, column=9, padx=15)    
+        preview_btn.grid(row=0, column=9, padx=15)
+        help_btn.grid(row=0, column=11, padx=15)    
 
 
         # Create radio buttons
@@ -553,7 +494,8 @@ class N4SortMenu(ttk.Frame):
             'columns': sort_columns,
             'ascending': self.sort_order_var.get(),
             'inplace': self.sort_inplace_var.get(),
-            'side': str(self.pcb_side_var.get())  # Convert to string
+            'side': str(self.pcb_side_var.get()),  # Convert to string
+            'board_gap': float(self.board_gap.get() or 0)
         }
 
     def generate_csv(self):
@@ -585,15 +527,35 @@ class N4SortMenu(ttk.Frame):
                     self.frame1.update_idletasks()
 
                 # Generate CSV with width callback
-                output_file = self.data_processor.generate_csv(
-                    pcb_file,
-                    template_file,
-                    pcb_width,
-                    sort_config,
-                    lambda current, total, status: self.parent.progress.update_progress(
-                        current, total, status),
-                    update_width  # Add width callback
-                )
+                if self.use_service():
+                    result = self.service.submit('generate', {
+                        'pcb_file': pcb_file,
+                        'template_file': template_file,
+                        'pcb_width': pcb_width,
+                        'sort_config': sort_config
+                    })
+                    if result.get('pcb_width'):
+                        update_width(result['pcb_width'])
+                    output_file = result['output_file']
+                else:
+                    progress = lambda current, total, status: self.parent.progress.update_progress(
+                        current, total, status)
+                    # Only the order changed since the last Generate: reuse the prepared board
+                    board = self.prepared_board
+                    if board is not None and board.matches(pcb_file, template_file, pcb_width, sort_config):
+                        self.data_processor.logger.info(f"Re-sorting prepared board {os.path.basename(pcb_file)}")
+                        output_file = self.data_processor.generate_prepared(board, sort_config, progress)
+                    else:
+                        output_file = self.data_processor.generate_csv(
+                            pcb_file, template_file, pcb_width, sort_config, progress,
+                            update_width  # Add width callback
+                        )
+                        # None when the output came from the job cache
+                        self.prepared_board = self.data_processor.last_board
+                self.last_output_file = output_file
+
+                # Remember the settings so watch-folder runs of this board reuse them
+                save_board_settings(os.path.dirname(pcb_file), float(self.pcb_width.get() or 0), sort_config)
 
                 messagebox.showinfo(
                     "Success",
@@ -607,6 +569,10 @@ class N4SortMenu(ttk.Frame):
                 )
                 logging.error(f"CSV generation error: {str(e)}", exc_info=True)
 
+    def use_service(self) -> bool:
+        """True if jobs should be sent to the running local service"""
+        return self.service is not None and self.service.available()
+
     def show_error(self, title: str, message: str):
         """Display error message to user"""
         tk.messagebox.showerror(title, message)
@@ -664,20 +630,35 @@ class N4SortMenu(ttk.Frame):
             self.selected_listbox.insert(new_index, value)
             self.selected_listbox.selection_set(new_index)
 
+    @staticmethod
+    def _feeder_change_note(feeder_changes: Optional[List[Dict]]) -> str:
+        """Message line listing feeders a pinned split changed"""
+        if feeder_changes is None:
+            return ""
+        if not feeder_changes:
+            return "\nNo feeder changes since the previous split."
+        lines = [f"{change['Template']} feeder {change['Feeder ID']}: {change['Action']} {change['New']}"
+                 if change['Action'] != 'unload' else
+                 f"{change['Template']} feeder {change['Feeder ID']}: unload {change['Previous']}"
+                 for change in feeder_changes[:10]]
+        more = f"\n... and {len(feeder_changes) - 10} more" if len(feeder_changes) > 10 else ""
+        return (f"\n\n{len(feeder_changes)} feeders need attention ({FEEDER_CHANGES_FILE}):\n"
+                + "\n".join(lines) + more)
+
     def process_pcb(self):
         """Handle PCR file Splitting"""
         try:
             # Get PCR file
             pcr_file = filedialog.askopenfilename(
                 title="Select PCR file",
-                filetypes=[("CSV Files", "*.csv")]
+                filetypes=[("CSV Files", "*.csv"), ("Allegro PCR Report", "*.htm *.html")]
             )
             
             if not pcr_file:
                 return
                 
             # Get directory and verify required files
-            file_dir = os.path.dirname("/Users/godwinm.mayers/Neoden4Assembly/pcr_files/")
+            file_dir = PCR_FILES_DIR
             required_files = {
                 "Component Table": "Component_Table.csv",
                 "Neoden4 Template": "Neoden4.csv",
@@ -703,6 +684,20 @@ class N4SortMenu(ttk.Frame):
                 )
                 return
             
+            if self.use_service():
+                result = self.service.submit('split', {
+                    'pcr_file': pcr_file,
+                    'component_table_file': file_paths["Component Table"],
+                    'neoden4_file': file_paths["Neoden4 Template"],
+                    'config_file': file_paths["Configuration"]
+                })
+                tk.messagebox.showinfo(
+                    "Success",
+                    "PCR file processed successfully!\nTemplate files have been created."
+                    + self._feeder_change_note(result.get('feeder_changes'))
+                )
+                return
+            
             # Process PCR file with progress tracking
             pcrSplitter = PCR_File_Splitter(
                 pcr_file,
@@ -722,6 +717,7 @@ class N4SortMenu(ttk.Frame):
             tk.messagebox.showinfo(
                 "Success",
                 "PCR file processed successfully!\nTemplate files have been created."
+                + self._feeder_change_note(pcrSplitter.feeder_changes)
             )
                 
         except Exception as e:
@@ -754,29 +750,11 @@ class N4SortMenu(ttk.Frame):
                 ):
                     return
 
-            # Read and sort file
-            df = pd.read_csv(file_to_sort)
-            
-            # Split template and component data
-            template_data = df[df['#Feeder'].isin(['stack', 'mark', 'markext', 'test', 
-                                                'mirror_create', 'mirror', '#SMD'])]
-            component_data = df[df['#Feeder'] == 'comp']
-
-            # Apply sorting to component data
-            if sort_config['columns']:
-                ascending = [sort_config['ascending']] * len(sort_config['columns'])
-                component_data = component_data.sort_values(
-                    by=sort_config['columns'],
-                    ascending=ascending,
-                    inplace=False
-                )
-
-            # Recombine data
-            sorted_df = pd.concat([template_data, component_data])
-            
-            # Save sorted file
-            output_path = file_to_sort.replace('.csv', '_sorted.csv')
-            sorted_df.to_csv(output_path, index=False)
+            if self.use_service():
+                output_path = self.service.submit('sort', {'file': file_to_sort,
+                                                           'sort_config': sort_config})['output_file']
+            else:
+                output_path = self.data_processor.sort_generated_file(file_to_sort, sort_config)
             
             messagebox.showinfo(
                 "Success",
@@ -790,6 +768,24 @@ class N4SortMenu(ttk.Frame):
             )
             logging.error(f"Sorting error: {str(e)}", exc_info=True)
 
+    def show_preview(self):
+        """Open the placement preview of the last generated board"""
+        board = self.prepared_board
+        try:
+            if board is not None and board.processed is not None and board.output_file == self.last_output_file:
+                lod = PlacementLOD.from_processed(board.processed, board.fiducial_info.get('points_m'))
+            elif self.last_output_file:
+                # Restored from the job cache or generated by the service
+                lod = PlacementLOD.read_n4_file(self.last_output_file)
+            else:
+                messagebox.showinfo("Preview", "Generate a CSV first to preview its placements.")
+                return
+        except Exception as e:
+            messagebox.showerror("Error", f"Error loading preview:\n{str(e)}")
+            logging.error(f"Preview error: {str(e)}", exc_info=True)
+            return
+        PlacementPreview(self.parent, lod, os.path.basename(self.last_output_file))
+
     # Add new method to launch template override
     def launch_template_override(self):
         template_window = tk.Toplevel(self.parent)
@@ -902,8 +898,9 @@ class N4SortMenu(ttk.Frame):
 
             # Save the modified file
             output_path = os.path.splitext(pcr_file)[0] + '_offset.csv'
-            with open(output_path, 'w') as f:
-                f.writelines(updated_lines)
+            with OutputStage(os.path.dirname(output_path)) as stage:
+                with open(stage.path(output_path), 'w') as f:
+                    f.writelines(updated_lines)
 
             logging.info(f"Successfully modified {modified_positions} component positions")
             logging.info(f"Saved output to {output_path}")
@@ -1015,9 +1012,10 @@ class N4SortMenu(ttk.Frame):
         workflow_content = """# Working with Neoden4 File Creator
 
     ## Step 1: PCR File Preparation
-    1. Export Allegro PCR file as CSV
+    1. Export Allegro PCR file as CSV (or keep the PCR.htm report;
+       Split PCR and Generate read it directly)
     2. Create directory: /Neoden4Assembly/PCB_Assembly/BoardName/
-    3. Save CSV file in new directory
+    3. Save CSV (or PCR.htm) file in new directory
     4. Rename fiducials to FID1, FID2, etc.
 
     ## Step 2: Measuring Initial Offset on N4 PNP Machine
@@ -1051,7 +1049,9 @@ class N4SortMenu(ttk.Frame):
 
     ## Step 4: Generate Placement Files
     1. Open PCB-file and select matching board file
-    2. For bottom assembly: Enter board width
+    2. For bottom assembly: Enter board width, or leave it empty to use the
+       right edge of the fiducials and placements (checked in the log)
+       For panels: Enter the gap between boards to use each board's local fiducials
     3. Select sorting options:
     • Reference Designator
     • XY Location
@@ -1113,7 +1113,100 @@ class N4SortMenu(ttk.Frame):
     Required files in pcr_files directory:
     • Component_Table.csv
     • Neoden4.csv
-    • configuration.json"""
+    • configuration.json
+
+    Optional:
+    • Neoden4_Feeder_Constraints.csv (per-feeder max placements,
+      reel widths and nozzles; defaults to feeder 20 = 4 parts, 8mm)
+
+    These files are checked together and compiled into
+    Neoden4_Machine.profile, which is rebuilt automatically when any
+    of them changes. To rebuild by hand and see validation errors:
+      python N4_File_Creator_v2k.py --compile-profile [pcr_files folder]
+
+    ## Local Service (optional)
+    Start a background service that keeps the machine files loaded:
+      python N4_File_Creator_v2k.py --serve
+    With "service": {"enabled": true} in configuration.json the GUI
+    sends Split, Generate and Sort jobs to it. From a terminal:
+      python N4_File_Creator_v2k.py --job split --params '{"pcr_file": "..."}'
+    Jobs run locally when the service is not running.
+    On a machine without Tk, use python -m n4_core in place of
+    python N4_File_Creator_v2k.py for --serve, --job and --watch.
+
+    ## Watch Folders (optional)
+      python N4_File_Creator_v2k.py --watch PCB_Assembly
+    Any PCR file copied into a watched folder (or a board folder below
+    it) is split and generated automatically once the copy finishes.
+    Width and sort options come from the board's board_settings.json,
+    saved each time Generate CSV succeeds. Progress and errors are
+    written to <PCR name>.status.json next to the PCR file.
+
+    ## Feeder Pinning
+    With "feeder_pinning": true in configuration.json, splitting a PCR
+    again (e.g. after an ECO) keeps parts that are still on the board on
+    the feeders the previous split in the same folder gave them; only new
+    parts are allocated to free feeders. The whole PCR is still split and
+    every output rewritten. Added, removed and modified parts (by REFDES)
+    are logged, and feeders to load, unload or swap are listed after the
+    split and in Feeder_Changes.csv. Delete the old Neoden4_Template files
+    to start over.
+
+    ## Job Cache
+    Generate CSV and Split PCR remember their outputs in pcr_files/job_cache,
+    keyed by the contents of the PCR, template and machine files plus the
+    width, side and sort options. Repeating a job with unchanged inputs
+    restores the saved files instantly; changing any input runs it again.
+    The least recently used results are dropped beyond "max_mb"; set
+    "job_cache": {"enabled": false} in configuration.json to turn it off.
+
+    ## Regression Benchmark
+      python -m n4_core --benchmark [--report results.json]
+    Runs split, generate and a Topa-onto-Bota template override for every
+    PCR export under PCB_Assembly and compares each output file with
+    Golden_Outputs (numbers within --tolerance). Prints runtime and peak
+    memory per board; exits non-zero on any difference. After an
+    intended output change, refresh the copies with --update-golden.
+
+    ## Placement Preview
+    After Generate CSV, the Preview button shows the board's placements in
+    machine coordinates, coloured by feeder (grey without a feeder), with
+    the fiducials as crosshairs. Scroll to zoom, drag to pan, double-click
+    to fit the board, click a part to see its RefDes and feeder. Crowded
+    views are drawn as a coarse grid of feeder colours first and refined
+    once the view settles; individual parts appear when zoomed in.
+
+    ## Log Files
+    All components write through one background writer to the logs folder:
+    neoden4_processor.log (everything), pcr_processing.log (Split PCR) and,
+    only when a level is set to DEBUG, debug.log. Each file rotates at
+    "max_mb" keeping "backup_count" old copies, and log files older than
+    "max_age_days" are deleted. Set levels per component in the "logging"
+    section of configuration.json, e.g. "levels": {"PCBDataProcessor": "DEBUG"}.
+
+    ## Network Drives
+    Outputs (N4, template, placement, _sorted and _offset files) are first
+    written to local temporary storage and then copied to the board folder
+    together. Files whose content has not changed are left untouched, the
+    others replace the old copy in one step, so the machine never reads a
+    half-written file. If the drive drops out, nothing of that job is
+    published and the error names the files that failed.
+
+    ## Pipeline Trace
+      python N4_File_Creator_v2k.py --trace run.json [--watch | --serve | --benchmark]
+    Records the stages of every job (read, board outline, sequencing,
+    split sides, feeder allocation, template override, file writes and
+    publishing) with their process and thread, and writes run.json on exit.
+    Open it in chrome://tracing or ui.perfetto.dev to see where overlapping
+    jobs wait. Without other options the GUI is traced.
+
+    ## Run Metrics
+    Every generate, split and override run appends one line to
+    logs/metrics.jsonl: stage durations with rows in and out, placements per
+    feeder and nozzle, manual placements, job cache hits and peak memory.
+    logs/metrics.prom holds the latest run per job and board in Prometheus
+    text format for a textfile collector. Set "metrics" in
+    configuration.json to move the files or "enabled": false to turn them off."""
 
         # Insert content and apply formatting
         for text_widget, content in [
@@ -1153,1628 +1246,201 @@ class N4SortMenu(ttk.Frame):
             command=help_window.destroy
         )
         close_btn.pack(pady=5)
-# ---- Data Processing Class ----
-class PCBDataProcessor:
-    def __init__(self):
-        """Initialize the PCB data processor"""
-        self.logger = logging.getLogger('PCBDataProcessor')
-        self.logger.info("PCBDataProcessor initialized")
-        self.nozzle_rotations = self._initialize_nozzle_rotations()
-        
-    def _initialize_nozzle_rotations(self) -> Dict[str, List[float]]:
-        """Initialize nozzle rotation capabilities"""
-        try:
-            # Read the nozzle configuration file
-            filepath = os.path.dirname("/Users/godwinm.mayers/Neoden4Assembly/pcr_files/")
-            nozzle_file = os.path.join(filepath, "Neoden4_Nozzles.csv")
-
-            if not os.path.exists(nozzle_file):
-                tk.messagebox.showerror(
-                    "Missing Files",
-                    f"Missing required files in {nozzle_file}:\n" 
-                )
-                return
-            
-            nozzle_config_df = pd.read_csv(nozzle_file)
-            nozzle_rotations = {}
-            for _, row in nozzle_config_df.iterrows():
-                # Convert string of rotations to list of floats
-                rotations = [float(angle.strip()) for angle in row['Rotation'].split(',')]
-                nozzle_rotations[str(row['Nozzle'])] = rotations
-            
-            self.logger.info(f"Loaded nozzle rotations: {nozzle_rotations}")
-            return nozzle_rotations
-        except Exception as e:
-            self.logger.error(f"Error loading nozzle rotations: {str(e)}")
-            raise PCBProcessingError(f"Failed to load nozzle configuration: {str(e)}")
-
-    def _normalize_angle(self, angle: float) -> float:
-        """Normalize angle to range [-180, 180]"""
-        angle = angle % 360
-        if angle > 180:
-            angle -= 360
-        return angle
-
-    def _get_compatible_nozzles(self, component_rotation: float) -> List[str]:
-        """Get list of nozzles compatible with the required rotation"""
-        normalized_rotation = self._normalize_angle(component_rotation)
-        compatible_nozzles = []
-        
-        for nozzle, allowed_rotations in self.nozzle_rotations.items():
-            if any(abs(normalized_rotation - self._normalize_angle(allowed)) < 0.1 
-                  for allowed in allowed_rotations):
-                compatible_nozzles.append(nozzle)
-                
-        self.logger.debug(f"Compatible nozzles for rotation {component_rotation}: {compatible_nozzles}")
-        return compatible_nozzles
-
-    def create_component_key(self,pcr_row: pd.Series) -> str:
-        """
-        Create a consistent component key for matching between PCR and template
-        
-        Args:
-            pcr_row: Row from PCR file containing component info
-            
-        Returns:
-            String key in format "FOOTPRINT/VALUE"
-            
-        Example:
-            Input PCR row:
-            - SYM_NAME: CAP0603
-            - COMP_VALUE: 0.1UF
-            Returns: "CAP0603/0.1UF"
-        """
-        try:
-            footprint = str(pcr_row['SYM_NAME']).strip()
-            value = str(pcr_row['COMP_VALUE']).strip()
-            
-            # Create combined key
-            key = f"{footprint}/{value}"
-            return key
-            
-        except Exception as e:
-            logging.error(f"Error creating component key: {str(e)}")
-            return ""
-
-    def nozzle_feeder_assignment(self, pcr_path: str, pcb_df: pd.DataFrame, n4_df: pd.DataFrame) -> pd.DataFrame:
-        """
-        Assign nozzles and feeders to components based on rotation capabilities
-        """
-        try:
-            self.logger.info("Starting nozzle and feeder assignment with rotation checking")
-            
-            # Create mapping of value to feeder information
-            n4_map = {}
-            for _, row in n4_df.iterrows():
-                if row['#Feeder'] != 'stack':
-                    continue
-                    
-                value = str(row['Value']).strip()
-                key = value
-                feeder_id = str(row['Feeder ID'])
-                
-                # Get list of available nozzles for this feeder
-                # Handle single and multi-digit nozzle numbers
-                nozzle_str = str(row['Nozzle'])
-                if len(nozzle_str) == 1:
-                    available_nozzles = [nozzle_str]
-                else:
-                    available_nozzles = [n for n in nozzle_str]
-                
-                if key not in n4_map:
-                    n4_map[key] = {
-                        '#Feeder': feeder_id,
-                        'Available_Nozzles': available_nozzles
-                    }
-                print("nozzle_str",nozzle_str)
-            # Track feeder and nozzle usage
-            feeder_nozzle_assignment = defaultdict(list)
-            feeder_component_counts = defaultdict(int)
-            unmatched_rows = []
-
-            # First pass: Count components per feeder for FEEDER_20_MAX_COUNT check
-            for _, row in pcb_df.iterrows():
-                comp_value = str(row['COMP_VALUE']).strip()
-                sym_name = str(row['SYM_NAME']).strip()
-                combined_value = f"{sym_name}/{comp_value}"
-                
-                if combined_value in n4_map:
-                    feeder_id = n4_map[combined_value]['#Feeder']
-                    feeder_component_counts[feeder_id] += 1
-
-            # Process each component
-            for index, row in pcb_df.iterrows():
-                comp_value = str(row['COMP_VALUE']).strip()
-                sym_name = str(row['SYM_NAME']).strip()
-                combined_value = f"{sym_name}/{comp_value}"
-                rotation = float(row['SYM_ROTATE'])
-                
-                self.logger.debug(f"Processing component: {row['REFDES']}, "
-                                f"Value: {combined_value}, Rotation: {rotation}")
-                
-                if combined_value in n4_map:
-                    feeder_id = n4_map[combined_value]['#Feeder']
-                    
-                    # Check component count limit for feeder 20
-                    if feeder_id == '20' and feeder_component_counts[feeder_id] > FEEDER_20_MAX_COUNT:
-                        self.logger.warning(
-                            f"Feeder 20 component count ({feeder_component_counts[feeder_id]}) "
-                            f"exceeds maximum ({FEEDER_20_MAX_COUNT})"
-                        )
-                        unmatched_rows.append(row)
-                        continue
-                    
-                    # Get available nozzles for this feeder
-                    available_nozzles = n4_map[combined_value]['Available_Nozzles']
-                    
-                    # Get compatible nozzles for the required rotation
-                    compatible_nozzles = self._get_compatible_nozzles(rotation)
-                    
-                    # Find intersection of available and compatible nozzles
-                    valid_nozzles = [n for n in available_nozzles if n in compatible_nozzles]
-                    
-                    self.logger.debug(f"Component {row['REFDES']}: "
-                                    f"Available nozzles: {available_nozzles}, "
-                                    f"Compatible nozzles: {compatible_nozzles}, "
-                                    f"Valid nozzles: {valid_nozzles}")
-                    
-                    if valid_nozzles:
-                        # Choose the least used compatible nozzle
-                        nozzle_counts = {n: feeder_nozzle_assignment[feeder_id].count(n) 
-                                       for n in valid_nozzles}
-                        chosen_nozzle = min(nozzle_counts.keys(), 
-                                          key=lambda k: nozzle_counts[k])
-                        
-                        # Assign feeder and nozzle
-                        pcb_df.at[index, '#Feeder'] = 'comp'
-                        pcb_df.at[index, 'Feeder ID'] = feeder_id
-                        pcb_df.at[index, 'Nozzle'] = chosen_nozzle
-                        
-                        # Track assignment
-                        feeder_nozzle_assignment[feeder_id].append(chosen_nozzle)
-                        
-                        self.logger.info(
-                            f"Assigned {row['REFDES']} (rotation: {rotation}) to "
-                            f"feeder {feeder_id}, nozzle {chosen_nozzle}"
-                        )
-                    else:
-                        self.logger.warning(
-                            f"No compatible nozzle found for {row['REFDES']} "
-                            f"rotation {rotation}"
-                        )
-                        unmatched_rows.append(row)
-                else:
-                    self.logger.warning(f"No match found for component: {row['REFDES']}")
-                    unmatched_rows.append(row)
-
-            # Handle unmatched components
-            if unmatched_rows:
-                unmatched_df = pd.DataFrame(unmatched_rows)
-                unmatched_file = os.path.join(pcr_path, 'manual_assignment.csv')
-                unmatched_df.to_csv(unmatched_file, index=False)
-                self.logger.warning(f"Written {len(unmatched_rows)} unmatched components to {unmatched_file}")
-
-            # Log assignment statistics
-            for feeder_id, assignments in feeder_nozzle_assignment.items():
-                nozzle_counts = Counter(assignments)
-                self.logger.info(f"Feeder {feeder_id} nozzle usage: {dict(nozzle_counts)}")
-                if feeder_id == '20':
-                    self.logger.info(f"Feeder 20 total component count: {feeder_component_counts['20']}")
-
-            return pcb_df
-
-        except Exception as e:
-            self.logger.error(f"Error in nozzle_feeder_assignment: {str(e)}")
-            raise PCBProcessingError(f"Failed to assign nozzles and feeders: {str(e)}")
-
-    def process_board_side(self, pcb_df: pd.DataFrame, pcb_width: float,
-                          sort_config: Dict) -> pd.DataFrame:
-        """Process board side and apply mirroring if needed"""
-        try:
-            # Get mirror option directly from config
-            mirror_option = sort_config['side']  # Now a string, not StringVar
-            
-            if mirror_option == "True":  # Bottom side
-                if float(pcb_width) <= 0:
-                    raise PCBProcessingError("PCB width required for bottom side processing")
-                    
-                # Filter and process bottom side components
-                pcb_df = pcb_df[pcb_df['SYM_MIRROR'] == 'YES']
-                pcb_df['SYM_X'] = pcb_df['SYM_X'].apply(lambda x: float(pcb_width) - float(x))
-                pcb_df['SYM_ROTATE'] = pcb_df['SYM_ROTATE'].apply(lambda x: 180 - float(x))
-            else:  # Top side
-                pcb_df = pcb_df[pcb_df['SYM_MIRROR'] == 'NO']
-
-            return pcb_df
-
-        except Exception as e:
-            logging.error(f"Error in process_board_side: {str(e)}")
-            raise PCBProcessingError(f"Failed to process board side: {str(e)}")
-
-    def get_pcb_width_from_fiducials(self, pcb_df: pd.DataFrame) -> float:
-        """
-        Calculate PCB width from fiducial positions, with specific handling for 2-fiducial cases.
-        
-        For 2 fiducials, the logic is:
-        1. If fiducials are diagonally opposite (different X and Y):
-        - Use the one with larger X value
-        2. If fiducials are on same vertical line (same X):
-        - Flag as warning, might need manual width
-        3. If fiducials are on same horizontal line (same Y):
-        - Use the larger X value
-        
-        Args:
-            pcb_df: DataFrame containing PCB component data
-            
-        Returns:
-            float: Calculated PCB width from fiducial position
-            
-        Example cases with 2 fiducials:
-        Case 1 (Diagonal):         Case 2 (Horizontal):      Case 3 (Vertical):
-        FID2 *                     FID1 *    * FID2          FID2 *
-                                                                
-                                                                
-        FID1 *                                                FID1 *
-        """
-        try:
-            # Filter for fiducials
-            fiducials = pcb_df[pcb_df['REFDES'].str.contains('FID', case=False, na=False)]
-            
-            if fiducials.empty:
-                self.logger.warning("No fiducials found in PCB data")
-                return 0.0
-                
-            # Log found fiducials
-            self.logger.info(f"Found {len(fiducials)} fiducials:")
-            for _, fid in fiducials.iterrows():
-                self.logger.info(f"  {fid['REFDES']}: X={fid['SYM_X']:.3f}, Y={fid['SYM_Y']:.3f}")
-
-            # Special handling for 2 fiducials
-            if len(fiducials) == 2:
-                fid1 = fiducials.iloc[0]
-                fid2 = fiducials.iloc[1]
-                
-                x1, y1 = float(fid1['SYM_X']), float(fid1['SYM_Y'])
-                x2, y2 = float(fid2['SYM_X']), float(fid2['SYM_Y'])
-                
-                # Calculate differences
-                x_diff = abs(x2 - x1)
-                y_diff = abs(y2 - y1)
-                
-                self.logger.info(
-                    f"Two fiducial analysis:\n"
-                    f"  FID1: ({x1:.3f}, {y1:.3f})\n"
-                    f"  FID2: ({x2:.3f}, {y2:.3f})\n"
-                    f"  X difference: {x_diff:.3f}mm\n"
-                    f"  Y difference: {y_diff:.3f}mm"
-                )
-
-                # Check fiducial arrangement
-                if x_diff < 0.001:  # Same vertical line
-                    self.logger.warning(
-                        "Fiducials are on same vertical line. "
-                        "Width calculation may not be accurate."
-                    )
-                    return max(x1, x2)
-                    
-                elif y_diff < 0.001:  # Same horizontal line
-                    self.logger.info("Fiducials are on same horizontal line")
-                    return max(x1, x2)
-                    
-                else:  # Diagonal arrangement
-                    self.logger.info("Fiducials are diagonally arranged")
-                    # For diagonal arrangement, use the larger X value
-                    max_x = max(x1, x2)
-                    if x1 > x2:
-                        self.logger.info(f"Using FID1 position ({x1:.3f}, {y1:.3f}) for width")
-                    else:
-                        self.logger.info(f"Using FID2 position ({x2:.3f}, {y2:.3f}) for width")
-                    return max_x
-
-            # If more than 2 fiducials, use original logic
-            else:
-                # Sort by X descending and Y ascending
-                sorted_fiducials = fiducials.sort_values(['SYM_X', 'SYM_Y'], ascending=[False, True])
-                rightmost_fid = sorted_fiducials.iloc[0]
-                pcb_width = float(rightmost_fid['SYM_X'])
-                
-                self.logger.info(
-                    f"Using rightmost fiducial {rightmost_fid['REFDES']} "
-                    f"at position ({pcb_width:.3f}, {float(rightmost_fid['SYM_Y']):.3f})"
-                )
-                return pcb_width
-
-        except Exception as e:
-            self.logger.error(f"Error calculating PCB width from fiducials: {str(e)}")
-            return 0.0
-
-    def verify_pcb_width(self, width: float, pcb_df: pd.DataFrame) -> None:
-        """
-        Verify calculated PCB width against component positions
-        
-        Args:
-            width: Calculated PCB width
-            pcb_df: DataFrame containing PCB component data
-        
-        Raises:
-            PCBProcessingError if width appears invalid
-        """
-        try:
-            # Get maximum X position of any component
-            max_component_x = pcb_df['SYM_X'].max()
-            
-            # Add some margin (e.g., 5mm) to account for component size
-            margin = 5.0
-            
-            if width < (max_component_x + margin):
-                self.logger.warning(
-                    f"Calculated width ({width:.3f}mm) is less than maximum component "
-                    f"position ({max_component_x:.3f}mm + {margin}mm margin)"
-                )
-                raise PCBProcessingError(
-                    f"Calculated PCB width {width:.3f}mm appears too small. "
-                    "Please verify fiducial positions or provide width manually."
-                )
-                
-        except Exception as e:
-            self.logger.error(f"Error verifying PCB width: {str(e)}")
-            raise
-
-    def generate_csv(self, pcb_file: str, template_file: str, pcb_width: float,
-                    sort_config: Dict, 
-                    progress_callback: Optional[Callable[[int, int, str], None]] = None,
-                    width_callback: Optional[Callable[[float], None]] = None) -> str:
-        """Main method to process PCB data and generate Neoden4 CSV file"""
-        try:
-            # Read input files
-            pcb_df = pd.read_csv(pcb_file.strip())
-            n4_df = pd.read_csv(template_file.strip())
-            
-            if progress_callback:
-                progress_callback(1, 5, "Files loaded successfully")
-
-            # Validate dataframes
-            if pcb_df.empty:
-                raise PCBProcessingError("PCB file contains no data")
-            if n4_df.empty:
-                raise PCBProcessingError("Template file contains no data")
-
-            # Log input data statistics
-            self.logger.info(f"PCB file loaded: {len(pcb_df)} components")
-            self.logger.info(f"Template file loaded: {len(n4_df)} entries")
-            self.logger.info(f"Sort configuration: {sort_config}")
-
-            # Handle PCB width
-            if pcb_width <= 0:
-                self.logger.info("No PCB width provided, calculating from fiducial positions...")
-                pcb_width = self.get_pcb_width_from_fiducials(pcb_df)
-                
-                if pcb_width <= 0:
-                    raise PCBProcessingError(
-                        "Could not calculate PCB width from fiducials. "
-                        "Please provide width manually."
-                    )
-                
-                # Update GUI if callback provided
-                if width_callback:
-                    width_callback(pcb_width)
-                    self.logger.info(f"Updated GUI with calculated PCB width: {pcb_width:.3f}mm")
-            else:
-                self.logger.info(f"Using provided PCB width: {pcb_width:.3f}mm")
-
-            # Process board side
-            pcb_df = self.process_board_side(pcb_df, pcb_width, sort_config)
-            if progress_callback:
-                progress_callback(3, 5, "Board side processed")
-                
-            # Verify required columns before processing
-            required_cols = ['REFDES', 'COMP_VALUE', 'SYM_NAME', 'SYM_X', 'SYM_Y', 'SYM_ROTATE', 'SYM_MIRROR']
-            missing_cols = [col for col in required_cols if col not in pcb_df.columns]
-            if missing_cols:
-                raise PCBProcessingError(f"Missing required columns in PCB data: {missing_cols}")
-
-            # Log component processing start
-            self.logger.info("Starting component processing...")
-            self.logger.info(f"PCB components to process: {len(pcb_df)}")
-
-            # Process components with proper arguments
-            processed_df = self.process_components(
-                pcb_df=pcb_df,  # PCB component data
-                n4_df=n4_df,    # Template data
-                sort_config=sort_config,  # Sorting configuration
-                pcr_path=os.path.dirname(pcb_file)  # Directory for saving unmatched components
-            )
-            
-            if progress_callback:
-                progress_callback(4, 5, "Components processed")
-
-            # Verify processed data
-            if processed_df.empty:
-                raise PCBProcessingError("No components were processed")
-                
-            self.logger.info(f"Component processing complete. Processed {len(processed_df)} components")
-
-            # Generate output file
-            output_file = self.generate_output(processed_df, n4_df, pcb_file)
-            if progress_callback:
-                progress_callback(5, 5, "CSV file generated")
-
-            # Set Neoden4 default Component XY location 
-            #output_file = self._set_default_component(output_file)
-            # Log success
-            self.logger.info(f"Successfully generated output file: {output_file}")
-            return output_file
-
-        except Exception as e:
-            self.logger.error(f"Error in generate_csv: {str(e)}")
-            raise PCBProcessingError(f"Failed to generate CSV: {str(e)}")
-
-    def process_components(self, pcb_df: pd.DataFrame, n4_df: pd.DataFrame,
-                        sort_config: Dict, pcr_path: str) -> pd.DataFrame:
-        """
-        Process and sort components with coordinate transformation and rotation adjustment
-        
-        Args:
-            pcb_df: PCB component data
-            n4_df: Neoden4 template data
-            sort_config: Sorting configuration
-            pcr_path: Path to save unmatched components
-            
-        Returns:
-            Processed DataFrame
-        """
-        try:
-             # First get fiducial information before filtering them out
-            fiducial_info = self.get_fiducial_info(n4_df, pcb_df)
-
-              # Log processing statistics before nozzle_feeder_assignments
-            self.logger.info(f"Processed {pcb_df} components")
-            
-            
-            # Calculate distances if XY_DIST is in sort columns
-            if 'XY_DIST' in sort_config.get('columns', []):
-                pcb_df['XY_DIST'] = pcb_df.apply(
-                    lambda row: math.dist(
-                        [row['SYM_X'], row['SYM_Y']], 
-                        [fiducial_info['offset_x'], fiducial_info['offset_y']]
-                    ), 
-                    axis=1
-                )
-
-            
-            # Sort components using configured options
-            if sort_config['columns']:
-                ascending = [sort_config['ascending']] * len(sort_config['columns'])
-                pcb_df.sort_values(
-                    by=sort_config['columns'],
-                    ascending=ascending,
-                    inplace=sort_config['inplace']
-                )
-           
-
-            # Clean up temporary columns
-            #if 'XY_DIST' in pcb_df.columns and 'XY_DIST' not in sort_config['columns']:
-            pcb_df.drop(columns=['XY_DIST'], inplace=True)
-            pcb_df.drop(columns=['COMP_DEVICE_TYPE'], inplace=True)
-            pcb_df.drop(columns=['COMP_TOL'], inplace=True)
-
-            # Add Neoden4 required columns
-            pcb_df.insert(0, "#Feeder", ['comp'] * len(pcb_df))
-            pcb_df.insert(1, "Feeder ID", ['1'] * len(pcb_df))
-            pcb_df.insert(2, "Nozzle", ['1'] * len(pcb_df))
-
-            
-
-            # Calculate and apply coordinate transformation
-            transform = self.calculate_homography(
-                fiducial_info['points_i'],
-                fiducial_info['points_m']
-            )
-            pcb_df = self.apply_transform(pcb_df, transform)
-
-           
-            # Assign nozzles and feeders
-
-            pcb_df = self.nozzle_feeder_assignment(pcr_path, pcb_df, n4_df)
-
-             # Filter out fiducials from processing
-            pcb_df = pcb_df[
-                ~pcb_df['REFDES'].str.contains("FID", na=False, case=True)&
-                ~pcb_df['SYM_NAME'].str.contains("FID", na=False, case=False)&
-                ~pcb_df['COMP_VALUE'].str.contains("FID", na=False, case=False)
-            ]
-             # Log processing statistics before nozzle_feeder_assignments
-            self.logger.info(f"Processed {pcb_df} components")
-
-            # Adjust rotation after nozzle assignment
-            pcb_df['SYM_ROTATE'] = pcb_df.apply(self.adjust_rotation, axis=1)
-
-            # Rename columns for Neoden4 format
-            column_mapping = {
-                'Nozzle': 'Type',
-                'REFDES': 'Nozzle',
-                'COMP_VALUE': 'X',
-                'SYM_NAME': 'Y',
-                'SYM_X': 'Angle',
-                'SYM_Y': 'Footprint',
-                'SYM_ROTATE': 'Value',
-                'SYM_MIRROR': 'Pick height'
-            }
-            pcb_df.rename(columns=column_mapping, inplace=True)
-
-            
-            self.logger.info(f"Processed {len(pcb_df)} components")
-            self.logger.info(f"Applied coordinate transformation with {len(fiducial_info['points_i'])} fiducial points")
-            
-            # Validate final component positions
-            max_x = pcb_df['Angle'].max()
-            max_y = pcb_df['Footprint'].max()
-            self.logger.info(f"Component position range - X: 0 to {max_x:.2f}, Y: 0 to {max_y:.2f}")
-                    
-            return pcb_df
-
-        except Exception as e:
-            self.logger.error(f"Error processing components: {str(e)}")
-            raise PCBProcessingError(f"Failed to process components: {str(e)}")
-
-    def get_fiducial_info(self, n4_df: pd.DataFrame, pcb_df: pd.DataFrame) -> Dict:
-        """
-        Extract fiducial information from template and PCB data
-        
-        Args:
-            n4_df: Neoden4 template data
-            pcb_df: PCB component data
-            
-        Returns:
-            Dictionary containing fiducial information
-        """
-        try:
-            # Get fiducial locations from template
-            measured_fiducial_loc = n4_df.loc[n4_df['#Feeder'] == "mark"]
-            if measured_fiducial_loc.empty:
-                raise PCBProcessingError("No fiducial marks found in template")
-                
-            col_names = list(measured_fiducial_loc.columns)
-
-            # Get fiducial points from PCB data
-            fiducial_pts_i = self.get_board_fiducials(pcb_df)
-            if not fiducial_pts_i:
-                raise PCBProcessingError("No fiducials found in PCB data")
-                
-            self.logger.info(f"Found {len(fiducial_pts_i)} fiducials in PCB data")
-            for i, pt in enumerate(fiducial_pts_i):
-                self.logger.info(f"PCB Fiducial {i+1}: X={pt[0]:.3f}, Y={pt[1]:.3f}")
-
-            # Get template fiducial points
-            fiducial_pts_m = []
-            try:
-                for i in range(len(fiducial_pts_i)):
-                    x = float(measured_fiducial_loc[col_names[i*2+3]].iloc[0])
-                    y = float(measured_fiducial_loc[col_names[i*2+4]].iloc[0])
-                    fiducial_pts_m.append([x, y])
-                    self.logger.info(f"Template Fiducial {i+1}: X={x:.3f}, Y={y:.3f}")
-            except (IndexError, ValueError) as e:
-                raise PCBProcessingError(f"Error extracting template fiducial coordinates: {str(e)}")
-
-            if len(fiducial_pts_i) != len(fiducial_pts_m):
-                raise PCBProcessingError(
-                    f"Mismatch in number of fiducials: PCB has {len(fiducial_pts_i)}, "
-                    f"Template has {len(fiducial_pts_m)}"
-                )
-
-            # Sort fiducial points by distance from origin (0,0)
-            fiducial_pts_mr = sorted(
-                fiducial_pts_m, 
-                key=lambda point: math.sqrt(point[0]**2 + point[1]**2)
-            )
-            self.logger.info(f"FIDUCIALS: TEMPLATE={fiducial_pts_mr}, PCB={fiducial_pts_i}")
-            self.logger.info(f"Processed {pcb_df} components")
-            print("Measured Fid", fiducial_pts_mr)
-            print("PCB Fid", fiducial_pts_i)
-            
-            # Get offset from first fiducial
-            n4_offsetx = fiducial_pts_i[0][0]
-            n4_offsety = fiducial_pts_i[0][1]
-            
-            self.logger.info(f"Using offset point: X={n4_offsetx:.3f}, Y={n4_offsety:.3f}")
-                    
-            return {
-                'offset_x': n4_offsetx,
-                'offset_y': n4_offsety,
-                'points_i': fiducial_pts_i,
-                'points_m': fiducial_pts_mr
-            }
-
-        except Exception as e:
-            self.logger.error(f"Error in get_fiducial_info: {str(e)}")
-            raise PCBProcessingError(f"Failed to get fiducial information: {str(e)}")
-
-    def get_board_fiducials(self, pcb_df: pd.DataFrame) -> List[List[float]]:
-        """
-        Extract fiducial points from PCB data
-        
-        Args:
-            pcb_df: PCB component data
-            
-        Returns:
-            List of fiducial coordinates [[x1,y1], [x2,y2], ...]
-        """
-        try:
-            # Find fiducials in PCB data
-            fid_df = pcb_df[pcb_df['REFDES'].str.contains('FID', case=False, na=False)]
-            
-            if fid_df.empty:
-                self.logger.error("No fiducials found in PCB data")
-                return []
-                
-            # Calculate distance from origin for each fiducial
-            fid_df['XY_DIST'] = fid_df.apply(
-                lambda row: math.dist([row['SYM_X'], row['SYM_Y']], [0, 0]), 
-                axis=1
-            )
-            
-            # Sort by distance
-            fid_df.sort_values("XY_DIST", ascending=True, inplace=True)
-            
-            # Log found fiducials
-            self.logger.info(f"Found {len(fid_df)} fiducials:")
-            for _, fid in fid_df.iterrows():
-                self.logger.info(
-                    f"  {fid['REFDES']}: X={fid['SYM_X']:.3f}, Y={fid['SYM_Y']:.3f}, "
-                    f"Distance={fid['XY_DIST']:.3f}"
-                )
-            
-            # Return coordinates as list of [x,y] pairs
-            fiducials = fid_df[['SYM_X', 'SYM_Y']].values.tolist()
-            
-            if not fiducials:
-                raise PCBProcessingError("No valid fiducial coordinates found")
-                
-            return fiducials
-
-        except Exception as e:
-            self.logger.error(f"Error in get_board_fiducials: {str(e)}")
-            raise PCBProcessingError(f"Failed to get board fiducials: {str(e)}")
-
-    def calculate_homography(self, fiducial_pts_i: List[List[float]],
-                           fiducial_pts_m: List[List[float]]) -> np.ndarray:
-        """Calculate homography transformation matrix"""
-        try:
-            num_points = len(fiducial_pts_i)
-            if num_points < 2:
-                raise PCBProcessingError("At least 2 fiducial points required")
-
-            if num_points == 2:
-                # Affine transformation for 2 points
-                src = np.array(fiducial_pts_i, dtype=np.float32)
-                dst = np.array(fiducial_pts_m, dtype=np.float32)
-                
-                # Calculate translation
-                t_x = np.mean(dst[:, 0] - src[:, 0])
-                t_y = np.mean(dst[:, 1] - src[:, 1])
-                
-                # Calculate rotation and scale
-                src_centered = src - np.mean(src, axis=0)
-                dst_centered = dst - np.mean(dst, axis=0)
-                
-                covariance = np.dot(src_centered.T, dst_centered)
-                U, _, Vt = np.linalg.svd(covariance)
-                
-                rotation = np.dot(Vt.T, U.T)
-                scale = np.sum(dst_centered * np.dot(src_centered, rotation)) / np.sum(src_centered**2)
-                
-                transform = np.zeros((2, 3))
-                transform[:2, :2] = scale * rotation
-                transform[:, 2] = [t_x, t_y]
-                return transform
-            else:
-                # Full homography for 3+ points
-                A = np.zeros((2*num_points, 9))
-                for i in range(num_points):
-                    x, y = fiducial_pts_i[i]
-                    x_prime, y_prime = fiducial_pts_m[i]
-                    A[2*i] = [-x, -y, -1, 0, 0, 0, x*x_prime, y*x_prime, x_prime]
-                    A[2*i+1] = [0, 0, 0, -x, -y, -1, x*y_prime, y*y_prime, y_prime]
-
-                _, _, V = np.linalg.svd(A)
-                H = V[-1].reshape(3, 3)
-                return H / H[2, 2]
-
-        except Exception as e:
-            logging.error(f"Error in calculate_homography: {str(e)}")
-            raise PCBProcessingError(f"Failed to calculate transformation: {str(e)}")
-
-    def apply_transform(self, pcb_df: pd.DataFrame, 
-                       transform: np.ndarray) -> pd.DataFrame:
-        """Apply coordinate transformation to components"""
-        try:
-            for row in pcb_df.itertuples(index=False):
-                pt_i = np.array([row.SYM_X, row.SYM_Y])
-                if transform.shape == (2, 3):  # Affine
-                    pt_f = np.dot(transform[:, :2], pt_i) + transform[:, 2]
-                else:  # Homography
-                    pt_h = np.array([pt_i[0], pt_i[1], 1])
-                    pt_f = np.dot(transform, pt_h)
-                    pt_f = pt_f[:2] / pt_f[2]
-
-                pcb_df.loc[pcb_df['REFDES'] == row.REFDES, 'SYM_X'] = pt_f[0]
-                pcb_df.loc[pcb_df['REFDES'] == row.REFDES, 'SYM_Y'] = pt_f[1]
-
-            return pcb_df
-
-        except Exception as e:
-            logging.error(f"Error in apply_transform: {str(e)}")
-            raise PCBProcessingError(f"Failed to apply transformation: {str(e)}")
-
-    def adjust_rotation(self, row: pd.Series) -> float:
-        """Adjust component rotation"""
-        try:
-            rotation = float(row['SYM_ROTATE']) % 360
-            if int(row['Feeder ID']) >= 20:
-                rotation = (rotation - 180) % 360
-            
-            if rotation > 180:
-                rotation = rotation - 360
-            
-            return rotation
-
-        except Exception as e:
-            logging.error(f"Error in adjust_rotation: {str(e)}")
-            return 0.0
-
-    def generate_output(self, processed_df: pd.DataFrame, template_df: pd.DataFrame,
-                       input_file: str) -> str:
-        """
-        Generate final output CSV file
-        
-        Args:
-            processed_df: Processed PCB data
-            template_df: Template data
-            input_file: Original input file path
-            
-        Returns:
-            Path to generated output file
-        """
-        try:
-            # Combine template and processed data
-            frames = [template_df, processed_df]
-            final_df = pd.concat(frames)
-
-            # Generate output filename
-            output_path = os.path.join(
-                os.path.dirname(input_file),
-                f'N4_{Path(input_file).stem}.csv'
-            )
-
-            # Save to CSV
-            final_df.to_csv(output_path, index=False)
-            logging.info(f"Generated output file: {output_path}")
-
-            return output_path
-
-        except Exception as e:
-            logging.error(f"Error in generate_output: {str(e)}")
-            raise PCBProcessingError(f"Failed to generate output file: {str(e)}")
-
-    def validate_input_files(self, pcb_file: str, template_file: str) -> None:
-        """
-        Validate input files exist and have required format
-        
-        Args:
-            pcb_file: Path to PCB file
-            template_file: Path to template file
-            
-        Raises:
-            PCBProcessingError: If validation fails
-        """
-        # Check file existence
-        if not os.path.exists(pcb_file):
-            raise PCBProcessingError(f"PCB file not found: {pcb_file}")
-        if not os.path.exists(template_file):
-            raise PCBProcessingError(f"Template file not found: {template_file}")
-
-        # Check file extensions
-        if not pcb_file.lower().endswith('.csv'):
-            raise PCBProcessingError(f"Invalid PCB file format: {pcb_file}")
-        if not template_file.lower().endswith('.csv'):
-            raise PCBProcessingError(f"Invalid template file format: {template_file}")
-
-        # Validate PCB file structure
-        try:
-            pcb_df = pd.read_csv(pcb_file)
-            required_cols = ['REFDES', 'COMP_VALUE', 'SYM_NAME', 'SYM_X', 'SYM_Y', 'SYM_ROTATE', 'SYM_MIRROR']
-            missing_cols = [col for col in required_cols if col not in pcb_df.columns]
-            if missing_cols:
-                raise PCBProcessingError(f"Missing columns in PCB file: {missing_cols}")
-        except Exception as e:
-            raise PCBProcessingError(f"Failed to read PCB file: {str(e)}")
-
-        # Validate template file structure
-        try:
-            template_df = pd.read_csv(template_file)
-            required_cols = ['#Feeder', 'Feeder ID', 'Nozzle']
-            missing_cols = [col for col in required_cols if col not in template_df.columns]
-            if missing_cols:
-                raise PCBProcessingError(f"Missing columns in template file: {missing_cols}")
-        except Exception as e:
-            raise PCBProcessingError(f"Failed to read template file: {str(e)}")
-
-    def sort_components(self, pcb_df: pd.DataFrame, sort_config: Dict) -> pd.DataFrame:
-        """
-        Sort components according to multiple criteria
-        
-        Args:
-            pcb_df: DataFrame containing PCB components
-            sort_config: Dictionary containing sorting configuration
-            
-        Returns:
-            Sorted DataFrame
-        """
-        try:
-            if sort_config['columns']:
-                # Create list of ascending/descending for each column
-                ascending = [sort_config['ascending']] * len(sort_config['columns'])
-                
-                # Sort DataFrame
-                pcb_df.sort_values(
-                    by=sort_config['columns'],
-                    ascending=ascending,
-                    inplace=sort_config['inplace']
-                )
-                
-            return pcb_df
-            
-        except Exception as e:
-            logging.error(f"Error sorting components: {str(e)}")
-            raise PCBProcessingError(f"Failed to sort components: {str(e)}")
-
-    def _set_default_component1(self, pcb_data):
-        df = pd.read_csv(pcb_data)
-        try:
-            # Get XY values from #SMD row
-            smd_row = df[df['#Feeder'] == '#SMD'].iloc[0]
-            #x_val = float(smd_row['X'])  # 216.65
-            #y_val = float(smd_row['Y'])  # 157.36
-
-            # Skip first few columns which contain metadata
-            x_coord_start = 6  # X coordinate is in column 6 
-            y_coord_start = 7  # Y coordinate is in column 7
-            
-            x_val = float(smd_row.iloc[x_coord_start])  # Get X value
-            y_val = float(smd_row.iloc[y_coord_start])  # Get Y value
-
-            # Update mirror_create row's Nozzle and X columns
-            df.loc[df['#Feeder'] == 'mirror_create', ['Nozzle', 'X']] = [x_val, y_val]
-            
-            # Update mirror row's Feeder ID and Type columns 
-            df.loc[df['#Feeder'] == 'mirror', ['Feeder ID', 'Type']] = [x_val, y_val]
-
-            return df
-
-        except Exception as e:
-            self.logger.error(f"Error setting default component: {str(e)}")
-            raise PCBProcessingError(f"Failed to set default component: {str(e)}")
-
-    def _set_default_component2(self, df):
-        try:
-            # Get row with '#SMD' value
-            smd_row = df[df['#Feeder'] == '#SMD'].iloc[0]
-            
-            # Debug print
-            print("SMD row columns:", smd_row.index.tolist())
-            print("SMD row values:", smd_row.values.tolist())
-            print("Value at index 6:", smd_row.iloc[6])
-            print("Value at index 7:", smd_row.iloc[7])
-            
-            x_coord_start = 6  
-            y_coord_start = 7
-            
-            x_val = float(smd_row.iloc[x_coord_start])
-            y_val = float(smd_row.iloc[y_coord_start])
-
-            df.loc[df['#Feeder'] == 'mirror_create', ['Nozzle', 'X']] = [x_val, y_val]
-            df.loc[df['#Feeder'] == 'mirror', ['Feeder ID', 'Type']] = [x_val, y_val]
-
-            return df
-
-        except Exception as e:
-            self.logger.error(f"Error setting default component: {str(e)}")
-            raise PCBProcessingError(f"Failed to set default component: {str(e)}")
-
-    def _set_default_component(self, df):
-        try:
-            # Debug print
-            smd_row = df[df['#Feeder'] == '#SMD']
-            print("DataFrame columns:", df.columns.tolist())
-            print("\nSMD row:")
-            print(smd_row)
-            print("\nFirst SMD row values:")
-            print(smd_row.iloc[0])
-
-            # Original logic will go here after we identify correct columns
-            return df
-
-        except Exception as e:
-                self.logger.error(f"Error setting default component: {str(e)}")
-                raise PCBProcessingError(f"Failed to set default component: {str(e)}")    
-               
-class PCR_File_Splitter:
-    def __init__(self, pcr_file: str, component_table_file: str, neoden4_file: str, config_file: str, progress_callback=None):
-       
-        self.logger = logging.getLogger('PCR_File_Splitter')
-        self.progress_callback = progress_callback
-        
-        self.config = self._load_config(config_file)
-
-        self.pcr_df = pd.read_csv(pcr_file)
-        self.component_table_df = pd.read_csv(component_table_file)
-        self.neoden4_df = pd.read_csv(neoden4_file)
-        self.pcr_filename = Path(pcr_file).stem
-        self.filepath = os.path.split(pcr_file)[0]
-        
-        # Initialize with dynamic reel sizes
-        self.available_reel_sizes = set()  # Will be populated from input files
-        self.available_reels = {}
-        self.available_feeders = {}
-        self._initialize_available_feeders()
-        self._remove_ignored_features()
-        
-        self.placed_components = set()
-        self.matched_count = 0
-        self.unmatched_count = 0
-        
-        self.logger.info("PCR_File_Splitter initialized")
-        self.logger.info(f"Processing PCR file: {pcr_file}")
-        
-    def update_progress(self, current: int, total: int, status: str):
-        """Update progress bar if callback is available"""
-        if self.progress_callback:
-            self.progress_callback(current, total, status)
-
-    def _initialize_available_feeders(self):
-        """Initialize available feeders based on actual reel sizes from template and component table"""
-        # Get all unique reel sizes from Component_Table
-        component_reel_sizes = set(str(size) for size in self.component_table_df['Reel'].unique())
-        
-        # Get all unique reel sizes from Neoden4 template
-        template_reel_sizes = set(str(size) for size in self.neoden4_df['Reel'].unique() 
-                                if str(size).isdigit())  # Exclude non-numeric values like '-'
-        
-        # Combine all unique reel sizes
-        self.available_reel_sizes = component_reel_sizes.union(template_reel_sizes)
-        
-        # Initialize empty lists for each reel size
-        self.available_reels = {size: [] for size in self.available_reel_sizes}
-        
-        # Track Feeder 20 separately but it's actually an 8mm reel
-        self.feeder_20_available = False
-        
-        # Sort the template by Reel column first
-        sorted_template = self.neoden4_df.sort_values('Reel')
-        
-        # Go through template and assign feeders based on their actual reel size
-        for _, row in sorted_template.iterrows():
-            if row['#Feeder'] == 'stack':
-                feeder_id = str(row['Feeder ID'])
-                reel_size = str(row['Reel'])
-                
-                # Special handling for feeder 20
-                if feeder_id == '20':
-                    self.feeder_20_available = True
-                    continue
-                    
-                # All other feeders go by their reel size
-                if reel_size in self.available_reels:
-                    self.available_reels[reel_size].append(feeder_id)
-                else:
-                    self.logger.warning(f"Unknown reel size {reel_size} for feeder {feeder_id}")
-        
-        # Sort feeders numerically within each reel size
-        for reel_size in self.available_reels:
-            self.available_reels[reel_size].sort(key=lambda x: int(x))
-        
-        self.logger.info("Available reel sizes: %s", sorted(self.available_reel_sizes))
-        self.logger.info("Available feeders after initialization:")
-        for reel_size, feeders in self.available_reels.items():
-            self.logger.info(f"Reel {reel_size}: {feeders}")
-        self.logger.info(f"Feeder 20 available: {self.feeder_20_available}")
-
-    def _reset_available_feeders(self):
-        """Reset available feeders to their initial state based on template"""
-        # Reset all reel sizes to empty lists
-        self.available_reels = {size: [] for size in self.available_reel_sizes}
-        
-        # Reset Feeder 20 availability
-        self.feeder_20_available = False
-        
-        # Sort the template by Reel column first
-        sorted_template = self.neoden4_df.sort_values('Reel')
-        
-        # Reconstruct the feeder assignments
-        for _, row in sorted_template.iterrows():
-            if row['#Feeder'] == 'stack':
-                feeder_id = str(row['Feeder ID'])
-                reel_size = str(row['Reel'])
-                
-                # Special handling for feeder 20
-                if feeder_id == '20':
-                    self.feeder_20_available = True
-                    continue
-                    
-                # All other feeders go by their reel size
-                if reel_size in self.available_reels:
-                    self.available_reels[reel_size].append(feeder_id)
-        
-        # Sort feeders numerically within each reel size
-        for reel_size in self.available_reels:
-            self.available_reels[reel_size].sort(key=lambda x: int(x))
-
-    def _get_reel_progression(self, initial_reel: str) -> List[str]:
-        """
-        Get progression of compatible reel sizes for a given initial reel size
-        
-        Args:
-            initial_reel: Initial reel size as string
-            
-        Returns:
-            List of compatible reel sizes in ascending order
-        """
-        try:
-            # Convert available reel sizes to integers for sorting
-            sorted_sizes = sorted([int(size) for size in self.available_reel_sizes])
-            
-            # Find starting point in progression
-            try:
-                start_index = sorted_sizes.index(int(initial_reel))
-            except ValueError:
-                self.logger.error(f"Invalid initial reel size: {initial_reel}")
-                return []
-                
-            # Return progression from initial size onwards
-            progression = [str(size) for size in sorted_sizes[start_index:]]
-            
-            self.logger.debug(f"Reel progression for {initial_reel}: {progression}")
-            return progression
-            
-        except Exception as e:
-            self.logger.error(f"Error in _get_reel_progression: {str(e)}")
-            return []
-
-    def _remove_ignored_features(self):
-        ignored_features = self.config['ignored_pcb_features']
-        ignored_features.extend(['TP', 'DNP', 'DNE', 'HDR', 'Hole', 'Panel', 'Edge', 'MH', 'MOUNTHOLE'])
-        self.pcr_df = self.pcr_df[
-            ~self.pcr_df['REFDES'].str.contains('|'.join(ignored_features), na=False, case=False) &
-            ~self.pcr_df['SYM_NAME'].str.contains('|'.join(ignored_features), na=False, case=False) &
-            ~self.pcr_df['COMP_VALUE'].str.contains('|'.join(ignored_features), na=False, case=False)
-        ]
 
-    def process_files(self):
-        try:
-            pcr_groups = self._group_pcr_data()
-            for group_name, pcr_data in pcr_groups.items():
-                self.logger.info(f"Processing group: {group_name}")
-                self._process_group(pcr_data, group_name)
-                #time.sleep(1)
-        except Exception as e:
-            self.logger.error(f"An error occurred during processing: {str(e)}", exc_info=True)
-            raise
-
-    def _create_component_groups(self, pcr_data: pd.DataFrame) -> List[Dict]:
-        """Create component groups with accurate counting"""
-        component_groups = defaultdict(list)
-        component_counts = defaultdict(int)
-        
-        # First pass: Count all components
-        for _, pcr_row in pcr_data.iterrows():
-            group_key = (pcr_row['SYM_NAME'], pcr_row['COMP_VALUE'])
-            component_counts[group_key] += 1
-        
-        # Second pass: Create groups with known counts
-        for _, pcr_row in pcr_data.iterrows():
-            comp_match = self._find_component_match(pcr_row)
-            group_key = (pcr_row['SYM_NAME'], pcr_row['COMP_VALUE'])
-            
-            component_groups[group_key].append({
-                'footprint': pcr_row['SYM_NAME'],
-                'value': pcr_row['COMP_VALUE'],
-                'Reel': comp_match['Reel'] if comp_match else None,
-                'pcr_row': pcr_row,
-                'matched': comp_match is not None
-            })
-        
-        # Convert to list format with accurate counts
-        result = [
-            {
-                'footprint': key[0],
-                'value': key[1],
-                'Reel': group[0]['Reel'],
-                'components': group,
-                'count': component_counts[key]  # Use pre-calculated count
-            }
-            for key, group in component_groups.items()
-        ]
-        
-        # Log component counts for verification
-        for group in result:
-            self.logger.info(f"Component group {group['footprint']}/{group['value']} count: {group['count']}")
-            
-        return result
-
-    def _sort_component_groups(self, groups: List[Dict]) -> List[Dict]:
-        """Sort component groups by count in descending order"""
-        sorted_groups = sorted(groups, key=lambda x: x['count'], reverse=True)
-        self.logger.info("Sorted groups order:")
-        for group in sorted_groups:
-            self.logger.info(f"{group['footprint']}/{group['value']}: {group['count']} placements")
-        return sorted_groups
-
-    def _find_component_match(self, pcr_row: pd.Series) -> Optional[Dict]:
-        comp_matches = self.component_table_df[self.component_table_df['Footprint'] == pcr_row['SYM_NAME']]
-        if not comp_matches.empty:
-            match = comp_matches.iloc[0]
-            self.logger.info(f"Match found for {pcr_row['SYM_NAME']}/{pcr_row['COMP_VALUE']} in component table")
-            return {
-                'footprint': match['Footprint'],
-                'value': pcr_row['COMP_VALUE'],
-                'Reel': str(match['Reel'])  # Ensure Reel is converted to string
-            }
+# ---- Placement Preview ----
+class PlacementPreview(tk.Toplevel):
+    """
+    Zoomable preview of a generated board: placements coloured by feeder,
+    fiducials as crosshairs.
+
+    Crowded views are drawn as coarse grid cells first and refined in small
+    chunks after the view settles, so a redraw never creates more than
+    PlacementLOD.DETAIL_LIMIT canvas items at once.
+    """
+    COARSE_CELL_PX = 24
+    FINE_CELL_PX = 5
+    REFINE_DELAY_MS = 120
+    CHUNK_ITEMS = 400
+    MARGIN_PX = 20
+    PALETTE = ['#e6194b', '#3cb44b', '#4363d8', '#f58231', '#911eb4', '#42d4f4',
+               '#f032e6', '#9a6324', '#469990', '#808000', '#000075', '#e6b800']
+    MANUAL_COLOUR = '#a0a0a0'
+
+    def __init__(self, parent, lod: PlacementLOD, name: str):
+        super().__init__(parent)
+        self.title(f"Placement Preview - {name}")
+        self.geometry("900x700")
+        self.logger = logging.getLogger(__name__)
+
+        self.lod = lod
+        self.fiducials = lod.fiducials
+        self.colours = [self.MANUAL_COLOUR if not str(name).isdigit() else self.PALETTE[i % len(self.PALETTE)]
+                        for i, name in enumerate(self.lod.feeder_names)]
+
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=0)
+        self.canvas.pack(fill='both', expand=True)
+        self.status = ttk.Label(self, text="", anchor='w')
+        self.status.pack(fill='x', padx=5, pady=2)
+
+        # World -> screen: sx = (x - origin_x) * scale, sy = height - (y - origin_y) * scale
+        self.scale = 1.0
+        self.origin = [0.0, 0.0]
+        self.drag_start = None
+        self.refine_job = None
+        self.coarse_px = self.COARSE_CELL_PX
+        self.selected = ""
+
+        self.canvas.bind('<Configure>', lambda e: self.fit())
+        self.canvas.bind('<MouseWheel>', lambda e: self.zoom(e.x, e.y, 1.25 if e.delta > 0 else 0.8))
+        self.canvas.bind('<Button-4>', lambda e: self.zoom(e.x, e.y, 1.25))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom(e.x, e.y, 0.8))
+        self.canvas.bind('<ButtonPress-1>', self.start_drag)
+        self.canvas.bind('<B1-Motion>', self.drag)
+        self.canvas.bind('<ButtonRelease-1>', self.end_drag)
+        self.canvas.bind('<Double-Button-1>', lambda e: self.fit())
+
+    # ---- View ----
+    def fit(self):
+        """Zoom to show every placement and fiducial"""
+        x0, y0, x1, y1 = self.lod.bounds()
+        if len(self.fiducials):
+            x0, y0 = min(x0, self.fiducials[:, 0].min()), min(y0, self.fiducials[:, 1].min())
+            x1, y1 = max(x1, self.fiducials[:, 0].max()), max(y1, self.fiducials[:, 1].max())
+        width = max(self.canvas.winfo_width() - 2 * self.MARGIN_PX, 1)
+        height = max(self.canvas.winfo_height() - 2 * self.MARGIN_PX, 1)
+        self.scale = min(width / max(x1 - x0, 1e-3), height / max(y1 - y0, 1e-3))
+        self.origin = [x0 - self.MARGIN_PX / self.scale, y0 - self.MARGIN_PX / self.scale]
+        self.redraw()
+
+    def zoom(self, sx: int, sy: int, factor: float):
+        """Zoom by ``factor`` keeping the point under the cursor fixed"""
+        wx, wy = self.to_world(sx, sy)
+        self.scale *= factor
+        height = self.canvas.winfo_height()
+        self.origin = [wx - sx / self.scale, wy - (height - sy) / self.scale]
+        self.redraw()
+
+    def start_drag(self, event):
+        self.drag_start = (event.x, event.y, event.x, event.y)
+
+    def drag(self, event):
+        if self.drag_start is None:
+            return
+        _, _, last_x, last_y = self.drag_start
+        self.origin[0] -= (event.x - last_x) / self.scale
+        self.origin[1] += (event.y - last_y) / self.scale
+        self.drag_start = self.drag_start[:2] + (event.x, event.y)
+        self.redraw()
+
+    def end_drag(self, event):
+        # A click without movement selects the nearest placement
+        if self.drag_start and abs(event.x - self.drag_start[0]) + abs(event.y - self.drag_start[1]) < 3:
+            idx = self.lod.nearest(*self.to_world(event.x, event.y))
+            if idx is not None:
+                self.selected = (f"{self.lod.refdes[idx]}: feeder {self.lod.feeder_names[self.lod.feeder_codes[idx]]}, "
+                                 f"X {self.lod.x[idx]:.2f}, Y {self.lod.y[idx]:.2f}")
+                self.redraw()
+        self.drag_start = None
+
+    def to_world(self, sx: float, sy: float) -> Tuple[float, float]:
+        height = self.canvas.winfo_height()
+        return self.origin[0] + sx / self.scale, self.origin[1] + (height - sy) / self.scale
+
+    def to_screen(self, x, y):
+        height = self.canvas.winfo_height()
+        return (x - self.origin[0]) * self.scale, height - (y - self.origin[1]) * self.scale
+
+    # ---- Drawing ----
+    def redraw(self):
+        """Draw the current view at the cheapest level of detail that fits the budget"""
+        start = time.perf_counter()
+        if self.refine_job is not None:
+            self.after_cancel(self.refine_job)
+            self.refine_job = None
+        self.canvas.delete('all')
+
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        x0, y0 = self.to_world(0, height)
+        x1, y1 = self.to_world(width, 0)
+        index = self.lod.visible((x0, y0, x1, y1))
+
+        if len(index) <= PlacementLOD.DETAIL_LIMIT:
+            self.draw_placements(index)
+            level = "all parts"
         else:
-            self.logger.warning(f"No match found for {pcr_row['SYM_NAME']}/{pcr_row['COMP_VALUE']} in component table")
-        return None
-
-    def _place_component(self, template: pd.DataFrame, component: Dict) -> Tuple[PlacementResult, Optional[str], Optional[str]]:
-        component_key = f"{component['footprint']}/{component['value']}"
-        
-        if 'Reel' not in component:
-            self.logger.warning(f"No reel information for component {component_key}")
-            return PlacementResult.NOT_PLACED, None, None
-        
-        reel_sizes = ['8', '12', '16', '20']
-        initial_reel = component['Reel']
-        
-        # Check if the component is already placed in the template
-        already_placed_rows = template[(template['Footprint'] == component['footprint']) & 
-                                    (template['Value'] == component_key)]
-        if not already_placed_rows.empty:
-            self.logger.info(f"Component {component_key} is already placed in the template")
-            return PlacementResult.ALREADY_PLACED, initial_reel, already_placed_rows.iloc[0]['#Feeder']
-        
-        for reel in reel_sizes[reel_sizes.index(initial_reel):]:
-            self.logger.debug(f"Attempting to place component {component_key} with reel {reel}")
-            
-            if reel in self.available_reels and self.available_reels[reel]:
-                for feeder_index, feeder in enumerate(self.available_reels[reel]):
-                    vacant_rows = template[(template['Reel'] == reel) & (template['#Feeder'] == feeder) & (template['Footprint'] == '-')]
-                    if not vacant_rows.empty:
-                        row_index = vacant_rows.index[0]
-                        self._merge_component_data(template, row_index, component)
-                        # Remove the used feeder only after successful placement
-                        self.available_reels[reel].pop(feeder_index)
-                        self.logger.info(f"Placed component {component_key} using feeder {feeder} (reel {reel})")
-                        return PlacementResult.PLACED, reel, feeder
-            else:
-                self.logger.warning(f"No available feeders for reel {reel} for component {component_key}")
-        
-        self.logger.warning(f"No vacant positions found for component {component_key} on any available reel")
-        return PlacementResult.NOT_PLACED, None, None
-
-    def _merge_component_group_data(self, template: pd.DataFrame, row_index: int, group: Dict):
-        """Update template row with component data while preserving nozzle value"""
-        try:
-            # Get the feeder ID for this row
-            feeder_id = template.at[row_index, 'Feeder ID']
-            
-            # Get the original nozzle value from base template
-            original_nozzle = self.neoden4_df[
-                (self.neoden4_df['#Feeder'] == 'stack') & 
-                (self.neoden4_df['Feeder ID'] == feeder_id)
-            ]['Nozzle'].iloc[0]
-            
-            # Get component data from component table
-            comp_data = self.component_table_df[
-                self.component_table_df['Footprint'] == group['footprint']
-            ].iloc[0]
-            
-            # Update template row
-            template.at[row_index, 'Footprint'] = group['footprint']
-            template.at[row_index, 'Value'] = f"{group['footprint']}/{group['value']}"
-            template.at[row_index, 'Nozzle'] = original_nozzle  # Preserve original nozzle value
-            
-            # Copy parameters from component table
-            template.at[row_index, 'Pick height'] = comp_data['Pick height']
-            template.at[row_index, 'Pick delay'] = comp_data['Pick delay']
-            template.at[row_index, 'Place Height'] = comp_data['Place Height']
-            template.at[row_index, 'Place Delay'] = comp_data['Place Delay']
-            template.at[row_index, 'Vacuum detection'] = comp_data['Vacuum detection']
-            template.at[row_index, 'Threshold'] = comp_data['Threshold']
-            template.at[row_index, 'Vision Alignment'] = comp_data['Vision Alignment']
-            template.at[row_index, 'Speed'] = comp_data['Speed']
-            
-            # Copy unnamed parameters
-            for i in range(17, 30):
-                col_name = f'Unnamed: {i}'
-                if col_name in comp_data:
-                    template.at[row_index, col_name] = comp_data[col_name]
-            
-            self.logger.debug(
-                f"Updated template row {row_index} with component "
-                f"{group['footprint']}/{group['value']} using original nozzle {original_nozzle}"
-            )
-            
-        except Exception as e:
-            self.logger.error(f"Error merging component data for {group['footprint']}: {str(e)}")
-            raise
-
-    def _merge_component_data(self, template: pd.DataFrame, row_index: int, component: Dict):
-        # Get the component data from the component table
-        comp_data = self.component_table_df[self.component_table_df['Footprint'] == component['footprint']].iloc[0]
-        
-        # Update all columns except 'Reel'
-        for column in template.columns:
-            if column in comp_data.index and column != 'Reel':
-                template.at[row_index, column] = comp_data[column]
-        
-        # Update Footprint and Value separately as they might have special formatting
-        template.at[row_index, 'Footprint'] = component['footprint']
-        template.at[row_index, 'Value'] = f"{component['footprint']}/{component['value']}"
-        
-        self.logger.info(f"Updated template row {row_index} with component {component['footprint']}/{component['value']}")
-    
-    def _save_pcr(self, pcr_data: pd.DataFrame, suffix: str):
-        filename = f"{self.pcr_filename}{suffix}.csv"
-        pcr_data.to_csv(os.path.join(self.filepath, filename), index=False)
-        self.logger.info(f"Saved {filename}")
-
-    def _group_pcr_data(self) -> Dict[str, pd.DataFrame]:
-        grouped = {'_Bot': self.pcr_df[self.pcr_df['SYM_MIRROR'] == 'YES'],
-            '_Top': self.pcr_df[self.pcr_df['SYM_MIRROR'] == 'NO']}
-        
-        for group, data in grouped.items():
-            self.logger.info(f"Group {group} has {len(data)} components")
-            if len(data) == 0:
-                self.logger.warning(f"Group {group} is empty. Check PCR data for SYM_MIRROR values.")
-        
-        return grouped
-
-    def _is_fiducial(self, pcr_row: pd.Series) -> bool:
-        return pcr_row['REFDES'].startswith('FID')
-
-    def _save_template(self, template: pd.DataFrame, suffix: str):
-        # Remove the 'Reel' column
-        template_to_save = template.drop(columns=['Reel'], errors='ignore')
-        filename = f"Neoden4_Template{self.pcr_filename}{suffix}.csv"
-        template_to_save.to_csv(os.path.join(self.filepath, filename), index=False)
-        self.logger.info(f"Saved {filename}.csv (Reel column removed)")
-
-    def _save_manual_placement(self, manual_placement: pd.DataFrame, group_name: str):
-        filename = f"Manual_Placement{group_name}.csv"
-        manual_placement.to_csv(os.path.join(self.filepath, filename), index=False)
-        self.logger.info(f"Saved {filename}")
-
-    def _get_reel_options(self, component_size: str) -> List[str]:
-        sizes = ['8', '12', '16']
-        try:
-            start_index = sizes.index(str(component_size))
-        except ValueError:
-            self.logger.warning(f"Invalid component size: {component_size}. Using smallest size.")
-            start_index = 0
-
-        reel_options = []
-        for size in sizes[start_index:]:
-            reel_options.extend(list(self.available_reels[size]))
-            if reel_options:
-                break
-        
-        return reel_options
-    
-    def _log_available_reels(self):
-        self.logger.info("Current state of available reels:")
-        for size, reels in self.available_reels.items():
-            self.logger.info(f"Size {size}: {len(reels)} reels available")
-            self.logger.debug(f"Size {size} reels: {reels}")   
-
-    def _remove_ignored_features(self):
-        ignored_features = self.config['ignored_pcb_features']
-        ignored_features.extend(['TP', 'DNP', 'DNE', 'HDR', 'Hole', 'Panel', 'Edge', 'MH', 'MOUNTHOLE'])
-        self.pcr_df = self.pcr_df[
-            ~self.pcr_df['REFDES'].str.contains('|'.join(ignored_features), na=False, case=False) &
-            ~self.pcr_df['SYM_NAME'].str.contains('|'.join(ignored_features), na=False, case=False) &
-            ~self.pcr_df['COMP_VALUE'].str.contains('|'.join(ignored_features), na=False, case=False)
-        ]
-    
-    def _report_matching_stats(self):
-        total = self.matched_count + self.unmatched_count
-        self.logger.info(f"Matching Statistics:")
-        self.logger.info(f"Total components: {total}")
-        self.logger.info(f"Matched components: {self.matched_count} ({self.matched_count/total*100:.2f}%)")
-        self.logger.info(f"Unmatched components: {self.unmatched_count} ({self.unmatched_count/total*100:.2f}%)")
-
-    def _load_config(self, config_file: str) -> Dict:
-        with open(config_file, 'r') as f:
-            if config_file.endswith('.json'):
-                return json.load(f)
-            elif config_file.endswith('.yaml') or config_file.endswith('.yml'):
-                return yaml.safe_load(f)
+            # Large windows get larger coarse cells so the first pass stays within the item budget
+            self.coarse_px = max(self.COARSE_CELL_PX, math.ceil(math.sqrt(width * height / PlacementLOD.DETAIL_LIMIT)))
+            self.draw_bins(self.lod.bins(index, self.origin, self.coarse_px / self.scale), 'coarse')
+            self.refine_job = self.after(self.REFINE_DELAY_MS, lambda: self.refine(index))
+            level = "coarse grid"
+        self.draw_fiducials()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.logger.debug(f"Preview redraw: {len(index)} visible, {level}, {elapsed:.1f} ms")
+        self.show_status(len(index), level, elapsed)
+
+    def draw_placements(self, index: np.ndarray):
+        size = max(2.0, 0.5 * self.scale)
+        sx, sy = self.to_screen(self.lod.x[index], self.lod.y[index])
+        for x, y, code in zip(sx.tolist(), sy.tolist(), self.lod.feeder_codes[index].tolist()):
+            colour = self.colours[code]
+            self.canvas.create_rectangle(x - size, y - size, x + size, y + size,
+                                         fill=colour, outline=colour)
+
+    def draw_bins(self, bins: Dict[str, np.ndarray], tag: str, start: int = 0, stop: Optional[int] = None):
+        cell = self.coarse_px if tag == 'coarse' else self.FINE_CELL_PX
+        sx, sy = self.to_screen(bins['x'][start:stop], bins['y'][start:stop])
+        for x, y, code in zip(sx.tolist(), sy.tolist(), bins['feeder'][start:stop].tolist()):
+            colour = self.colours[code]
+            self.canvas.create_rectangle(x, y - cell, x + cell, y, fill=colour, outline='', tags=tag)
+
+    def refine(self, index: np.ndarray):
+        """Replace the coarse grid with the fine grid, a chunk per idle callback"""
+        bins = self.lod.bins(index, self.origin, self.FINE_CELL_PX / self.scale)
+        total = len(bins['x'])
+
+        def draw_chunk(start: int):
+            stop = min(start + self.CHUNK_ITEMS, total)
+            self.draw_bins(bins, 'fine', start, stop)
+            if stop < total:
+                self.refine_job = self.after(1, lambda: draw_chunk(stop))
             else:
-                raise ValueError("Unsupported configuration file format")
-
-    def _setup_logger(self) -> logging.Logger:
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        logger = logging.getLogger('PCR_File_Splitter')
-        logger.setLevel(self.config['logging']['level'])
-        
-        formatter = logging.Formatter(self.config['logging']['format'])
-        
-        file_handler = logging.FileHandler(self.config['logging']['file'])
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        
-        return logger
-
-    def _should_skip_component(self, pcr_row: pd.Series) -> bool:
-        return any(feature in pcr_row['REFDES'] or feature in pcr_row['SYM_NAME'] 
-                   for feature in self.config['ignored_pcb_features'])
-
-    def _process_group(self, pcr_data: pd.DataFrame, group_name: str):
-        """Process a group of PCR data with smart feeder assignment"""
-        try:
-            # Initialize dataframes
-            manual_placement = pd.DataFrame(columns=pcr_data.columns)
-            fiducials = pd.DataFrame(columns=pcr_data.columns)
-            template_a = self.neoden4_df.copy()  # Create exact copy of base template
-            template_b = self.neoden4_df.copy()
-            pcr_a = pd.DataFrame(columns=pcr_data.columns)
-            pcr_b = pd.DataFrame(columns=pcr_data.columns)
-
-            # Create component groups and sort by count
-            if self.progress_callback:
-                self.progress_callback(10, 100, f"Creating component groups for {group_name}")
-                
-            component_groups = self._create_component_groups(pcr_data)
-            
-            # Split groups by count
-            low_count_groups = []
-            high_count_groups = []
-            
-            for group in component_groups:
-                if group['count'] <= FEEDER_20_MAX_COUNT:
-                    low_count_groups.append(group)
-                else:
-                    high_count_groups.append(group)
-                    
-            # Sort groups
-            high_count_groups.sort(key=lambda x: x['count'], reverse=True)
-            low_count_groups.sort(key=lambda x: x['count'], reverse=True)
-            
-            if self.progress_callback:
-                self.progress_callback(20, 100, 
-                    f"Sorted components - {len(high_count_groups)} high count, {len(low_count_groups)} low count groups")
-
-            # Process components in sorted order
-            total_groups = len(low_count_groups) + len(high_count_groups)
-            current_group = 0
-
-            # First process high count groups
-            self.logger.info("Processing high count groups first...")
-            for group in high_count_groups:
-                if self.progress_callback:
-                    progress = 20 + int((current_group / total_groups) * 60)
-                    self.progress_callback(progress, 100, 
-                        f"Processing high count group {group['footprint']}/{group['value']} (count: {group['count']})")
-            
-                # Try placement in templates
-                for template, pcr_df in [(template_a, pcr_a), (template_b, pcr_b)]:
-                    self._reset_available_feeders()
-                    result, reel, feeder = self._place_component_group(template, group, allow_feeder_20=False)
-                    
-                    if result in [PlacementResult.PLACED, PlacementResult.ALREADY_PLACED]:
-                        components_df = pd.DataFrame([c['pcr_row'].to_dict() for c in group['components']])
-                        if pcr_df is pcr_a:
-                            pcr_a = pd.concat([pcr_a, components_df], ignore_index=True)
-                        else:
-                            pcr_b = pd.concat([pcr_b, components_df], ignore_index=True)
-                        
-                        self.matched_count += group['count']
-                        placed = True
-                        self.logger.info(f"Placed high count group {group['footprint']}/{group['value']} "
-                                    f"(count: {group['count']}) on feeder {feeder}")
-                        break
-                        
-                if result == PlacementResult.NOT_PLACED:
-                    manual_placement = pd.concat([manual_placement, pd.DataFrame(
-                        c['pcr_row'].to_dict() for c in group['components'])], ignore_index=True)
-                    self.unmatched_count += group['count']
-                    self.logger.warning(f"Could not place high count group {group['footprint']}/{group['value']} "
-                                    f"(count: {group['count']})")
-                    
-                current_group += 1
-
-            # Process low count groups
-            self.logger.info("Processing low count groups...")
-            for group in low_count_groups:
-                if self.progress_callback:
-                    progress = 20 + int((current_group / total_groups) * 60)
-                    self.progress_callback(progress, 100, 
-                        f"Processing low count group {group['footprint']}/{group['value']} (count: {group['count']})")
-                
-                # Handle fiducials
-                if self._is_fiducial(group['components'][0]['pcr_row']):
-                    fiducials = pd.concat([fiducials, pd.DataFrame(
-                        c['pcr_row'].to_dict() for c in group['components'])], ignore_index=True)
-                    current_group += 1
-                    continue
-
-                # Try placement in templates
-                for template, pcr_df in [(template_a, pcr_a), (template_b, pcr_b)]:
-                    self._reset_available_feeders()
-                    result, reel, feeder = self._place_component_group(template, group, allow_feeder_20=True)
-                    
-                    if result in [PlacementResult.PLACED, PlacementResult.ALREADY_PLACED]:
-                        components_df = pd.DataFrame([c['pcr_row'].to_dict() for c in group['components']])
-                        if pcr_df is pcr_a:
-                            pcr_a = pd.concat([pcr_a, components_df], ignore_index=True)
-                        else:
-                            pcr_b = pd.concat([pcr_b, components_df], ignore_index=True)
-                        
-                        self.matched_count += group['count']
-                        action_word = "Found" if result == PlacementResult.ALREADY_PLACED else "Placed"
-                        self.logger.info(f"{action_word} {group['count']} components of "
-                            f"{group['footprint']}/{group['value']} in Template{group_name}"
-                            f"{'a' if pcr_df is pcr_a else 'b'} using reel {reel}, feeder {feeder}")
-                        break
-
-                if result == PlacementResult.NOT_PLACED:
-                    manual_placement = pd.concat([manual_placement, pd.DataFrame(
-                        c['pcr_row'].to_dict() for c in group['components'])], ignore_index=True)
-                    self.unmatched_count += group['count']
-                    self.logger.warning(f"Could not place low count group {group['footprint']}/{group['value']} "
-                                    f"(count: {group['count']})")
-                    
-                current_group += 1
-
-            # Add fiducials and save files
-            if self.progress_callback:
-                self.progress_callback(80, 100, f"Adding fiducials and saving files for {group_name}")
-                
-            pcr_a = pd.concat([pcr_a, fiducials], ignore_index=True)
-            pcr_b = pd.concat([pcr_b, fiducials], ignore_index=True)
-            
-            self._save_template(template_a, f"{group_name}a")
-            self._save_template(template_b, f"{group_name}b")
-            self._save_pcr(pcr_a, f"{group_name}a")
-            self._save_pcr(pcr_b, f"{group_name}b")
-            self._save_manual_placement(manual_placement, group_name)
-
-            if self.progress_callback:
-                self.progress_callback(100, 100, f"Completed processing {group_name}")
-
-            self._log_placement_statistics(group_name, template_a, template_b, 
-                                        manual_placement, fiducials)
-                
-        except Exception as e:
-            self.logger.error(f"Error in _process_group: {str(e)}", exc_info=True)
-            raise
-
-    def _place_component_group(self, template: pd.DataFrame, group: Dict, 
-                            allow_feeder_20: bool = True) -> Tuple[PlacementResult, Optional[str], Optional[str]]:
-        """Place a component group in the template with proper reel size and feeder restrictions"""
-        component_key = f"{group['footprint']}/{group['value']}"
-        count = group['count']
-        
-        self.logger.info(f"Attempting to place {component_key} with count {count}, allow_feeder_20={allow_feeder_20}")
-        
-        if not group.get('Reel'):
-            self.logger.warning(f"No reel information for component group {component_key}")
-            return PlacementResult.NOT_PLACED, None, None
-        
-        # Get the initial reel size for this component
-        initial_reel = str(group['Reel'])
-        
-        self.logger.info(f"Initial reel size for {component_key}: {initial_reel}")
-        
-        # If component requires 8mm reel and Feeder 20 is available and allowed
-        if initial_reel == '8' and self.feeder_20_available and allow_feeder_20 and count <= FEEDER_20_MAX_COUNT:
-            # Try Feeder 20 first for eligible components
-            self.logger.debug(f"Checking Feeder 20 for {component_key}")
-            vacant_rows = template[
-                (template['Reel'] == '8') & 
-                (template['Feeder ID'] == '20') & 
-                (template['Footprint'] == '-')
-            ]
-            if not vacant_rows.empty:
-                row_index = vacant_rows.index[0]
-                if not self._is_duplicate_in_template(template, group['footprint'], group['value']):
-                    self._merge_component_group_data(template, row_index, group)
-                    self.feeder_20_available = False
-                    self.logger.info(f"Placed low-count component {component_key} on Feeder 20")
-                    return PlacementResult.PLACED, '8', '20'
-        
-        # Get allowed reel sizes for this component
-        allowed_reels = self._get_reel_progression(initial_reel)
-        if not allowed_reels:
-            return PlacementResult.NOT_PLACED, None, None
-            
-        # Try each possible reel size
-        for reel in allowed_reels:
-            # Skip reel 20 if not allowed or component count too high
-            if reel == '20':
-                if not allow_feeder_20:
-                    self.logger.info(f"Skipping reel 20 - not allowed for {component_key}")
-                    continue
-                if count > FEEDER_20_MAX_COUNT:
-                    self.logger.info(f"Skipping reel 20 - count {count} > FEEDER_20_MAX_COUNT for {component_key}")
-                    continue
-            
-            # Get available feeders for this reel size
-            available_feeders = self.available_reels.get(reel, [])
-            if not available_feeders:
-                self.logger.debug(f"No available feeders for reel size {reel}")
-                continue
-                
-            # Try each available feeder
-            for feeder_index, feeder_id in enumerate(available_feeders):
-                self.logger.debug(f"Checking feeder {feeder_id} on reel {reel} for {component_key}")
-                
-                # Look for vacant position in template
-                vacant_rows = template[
-                    (template['Reel'] == reel) & 
-                    (template['Feeder ID'] == feeder_id) & 
-                    (template['Footprint'] == '-')
-                ]
-                
-                if not vacant_rows.empty:
-                    row_index = vacant_rows.index[0]
-                    
-                    # Check if component is already placed
-                    if self._is_duplicate_in_template(template, group['footprint'], group['value']):
-                        self.logger.info(f"Component {component_key} already exists in template")
-                        return PlacementResult.ALREADY_PLACED, reel, feeder_id
-                    
-                    # Place the component
-                    self._merge_component_group_data(template, row_index, group)
-                    
-                    # Remove the used feeder from available feeders
-                    self.available_reels[reel].pop(feeder_index)
-                    
-                    self.logger.info(
-                        f"Placed component group {component_key} "
-                        f"(count: {count}) using feeder {feeder_id} on reel {reel}"
-                    )
-                    return PlacementResult.PLACED, reel, feeder_id
-                
-                self.logger.debug(f"No vacant position for feeder {feeder_id}")
-        
-        self.logger.warning(
-            f"Could not place component group {component_key} "
-            f"(count: {count}) on any available feeder"
-        )
-        return PlacementResult.NOT_PLACED, None, None
-
-    def _log_placement_statistics(self, group_name: str, template_a: pd.DataFrame, 
-                                template_b: pd.DataFrame, manual_placement: pd.DataFrame, 
-                                fiducials: pd.DataFrame) -> None:
-        """Log detailed placement statistics"""
-        feeder_20_components = len(template_a[template_a['Feeder ID'] == '20']) + \
-                            len(template_b[template_b['Feeder ID'] == '20'])
-        
-        self.logger.info(f"Group {group_name} processing complete:")
-        self.logger.info(f"  Components in {group_name}a: {len(template_a)}")
-        self.logger.info(f"  Components in {group_name}b: {len(template_b)}")
-        self.logger.info(f"  Components in manual_placement: {len(manual_placement)}")
-        self.logger.info(f"  Fiducials: {len(fiducials)}")
-        self.logger.info(f"  Components assigned to Feeder #20: {feeder_20_components}")
-        self.logger.info(f"  Total matched components: {self.matched_count}")
-        self.logger.info(f"  Total unmatched components: {self.unmatched_count}")
-
-    def _is_duplicate_in_template(self, template: pd.DataFrame, footprint: str, value: str) -> bool:
-        return ((template['Footprint'] == footprint) & (template['Value'] == f"{footprint}/{value}")).any()
+                self.refine_job = None
+                self.canvas.delete('coarse')
+                self.canvas.tag_raise('fiducial')
+                self.show_status(len(index), "fine grid")
+
+        draw_chunk(0)
+
+    def draw_fiducials(self):
+        sx, sy = self.to_screen(self.fiducials[:, 0], self.fiducials[:, 1])
+        for x, y in zip(sx.tolist(), sy.tolist()):
+            self.canvas.create_oval(x - 6, y - 6, x + 6, y + 6, outline='black', width=2, tags='fiducial')
+            self.canvas.create_line(x - 9, y, x + 9, y, tags='fiducial')
+            self.canvas.create_line(x, y - 9, x, y + 9, tags='fiducial')
+
+    def show_status(self, visible: int, level: str, elapsed: Optional[float] = None):
+        text = f"{len(self.lod)} placements, {visible} in view ({level})"
+        if elapsed is not None:
+            text += f", {elapsed:.0f} ms"
+        if self.selected:
+            text += f"  |  {self.selected}"
+        self.status.config(text=text)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; without options the GUI starts"""
+    parser = argparse.ArgumentParser(description="Neoden4 CSV Creator")
+    n4_cli.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        start_tracing(args.trace)
+
+    if not n4_cli.headless_requested(args):
+        N4SortGUIApp("Neoden4 CSV Creator v2k", (750, 600))  # runs its own mainloop
+        return 0
+    return n4_cli.run(args)
 
 # Initialize application
 if __name__ == "__main__":
-    app = N4SortGUIApp("Neoden4 CSV Creator v2k", (750, 600))
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Neoden4 File Creator processing core, usable without Tk or a display
+
+    from n4_core import PCBDataProcessor, PCR_File_Splitter, override_templates
+
+Exports are loaded on first access, so ``import n4_core`` itself is cheap;
+pandas and NumPy are imported with the first processing class used.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    # Processing
+    'PCBDataProcessor': 'processing',
+    'PreparedBoard': 'processing',
+    'PCR_File_Splitter': 'processing',
+    'PCBProcessingError': 'processing',
+    # Machine files and caching
+    'MachineProfile': 'processing',
+    'JobCache': 'processing',
+    'load_job_cache_config': 'processing',
+    'OutputStage': 'processing',
+    'FeederConstraints': 'processing',
+    'FeederAllocationSolver': 'processing',
+    'IgnoreRuleMatcher': 'processing',
+    'write_n4_file': 'processing',
+    # Input and geometry
+    'PCRReportParser': 'processing',
+    'read_pcr_file': 'processing',
+    'SpatialGridIndex': 'processing',
+    'PlacementLOD': 'processing',
+    'BoardOutline': 'processing',
+    # Constants
+    'DEFAULT_BOARD_GAP': 'processing',
+    'FEEDER_CHANGES_FILE': 'processing',
+    'PCR_FILES_DIR': 'paths',
+    'PCR_REPORT_EXTENSIONS': 'processing',
+    # Template override
+    'override_templates': 'override',
+    # Job service and watch folders
+    'JobRunner': 'service',
+    'N4Service': 'service',
+    'ServiceClient': 'service',
+    'load_service_config': 'service',
+    'FolderWatcher': 'watch',
+    'load_watch_config': 'watch',
+    'load_board_settings': 'watch',
+    'save_board_settings': 'watch',
+    # Regression benchmark
+    'RegressionBenchmark': 'benchmark',
+    # Log storage
+    'setup_logging': 'logs',
+    'stop_logging': 'logs',
+    'load_logging_config': 'logs',
+    'logging_configured': 'logs',
+    # Pipeline tracing
+    'span': 'trace',
+    'start_tracing': 'trace',
+    'stop_tracing': 'trace',
+    # Run metrics
+    'metrics_run': 'metrics',
+    'load_metrics_config': 'metrics',
+    'configure_metrics': 'metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,6 @@
+"""Headless command line: python -m n4_core --serve | --watch | --job"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Golden-output regression and performance benchmark over the shipped boards
+
+    python -m n4_core --benchmark [ASSEMBLY_DIR] [--update-golden]
+
+Runs headless like the service and the watch folders; nothing here
+imports tkinter.
+"""
+import io
+import os
+import csv
+import math
+import time
+import shutil
+import logging
+import tempfile
+import contextlib
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .paths import APP_DIR
+from .processing import PCBProcessingError
+from .service import JobRunner
+from .watch import FolderWatcher, load_board_settings
+
+ASSEMBLY_DIR = os.path.join(APP_DIR, "PCB_Assembly")
+GOLDEN_OUTPUTS_DIR = os.path.join(APP_DIR, "Golden_Outputs")
+BENCHMARK_TOLERANCE = 1e-6  # Absolute tolerance for numeric cells in golden comparisons
+
+
+class RegressionBenchmark:
+    """
+    Golden-output regression and performance run over the shipped boards.
+
+    Every PCR export (CSV or PCR.htm) found under the assembly folder is
+    copied to a scratch folder and run headlessly through split, generate
+    for each side (with the board's saved settings) and a template
+    override of the Topa layout onto Bota. Every output file is compared
+    with the stored golden copy under <golden_dir>/<board>/<pcr>/, numeric
+    cells within a tolerance. Runtime comes from an untraced pass and peak
+    Python memory from a second pass under tracemalloc.
+    """
+    OVERRIDE_SIDES = ('Topa', 'Bota')  # base layout, template being overridden
+
+    def __init__(self, assembly_dir: str, golden_dir: str = GOLDEN_OUTPUTS_DIR,
+                 tolerance: float = BENCHMARK_TOLERANCE, runner: Optional[JobRunner] = None):
+        self.logger = logging.getLogger('RegressionBenchmark')
+        self.assembly_dir = os.path.abspath(assembly_dir)
+        self.golden_dir = os.path.abspath(golden_dir)
+        self.tolerance = tolerance
+        self.runner = runner or JobRunner(use_cache=False)
+
+    def find_cases(self) -> List[str]:
+        """PCR exports under the assembly folder, relative to it"""
+        cases = []
+        for folder, dirs, files in os.walk(self.assembly_dir):
+            dirs.sort()
+            if os.path.abspath(folder).startswith(self.golden_dir):
+                continue
+            for name in sorted(files):
+                path = os.path.join(folder, name)
+                if FolderWatcher.is_pcr_export(path):
+                    cases.append(os.path.relpath(path, self.assembly_dir))
+        return cases
+
+    def golden_path(self, case: str) -> str:
+        """Golden folder of a case: board folder plus PCR name with its extension"""
+        stem, ext = os.path.splitext(case)
+        return os.path.join(self.golden_dir, f"{stem}_{ext.lstrip('.')}")
+
+    def _run_case(self, case: str, work_dir: str) -> List[str]:
+        """Split, generate and override one PCR export inside work_dir; returns output names"""
+        source = os.path.join(self.assembly_dir, case)
+        pcr_file = os.path.join(work_dir, os.path.basename(case))
+        shutil.copy(source, pcr_file)
+        with contextlib.redirect_stdout(io.StringIO()):  # debug prints in the pipeline
+            self._run_jobs(pcr_file, os.path.dirname(source))
+        return sorted(name for name in os.listdir(work_dir)
+                      if name != os.path.basename(pcr_file) and name.lower().endswith('.csv'))
+
+    def _run_jobs(self, pcr_file: str, board_dir: str) -> None:
+        """Split, generate each side and override Topa onto Bota, as the watch folder would"""
+        work_dir = os.path.dirname(pcr_file)
+        stem = Path(pcr_file).stem
+        settings = load_board_settings(board_dir)
+        self.runner.run({'type': 'split', 'params': {'pcr_file': pcr_file}})
+        templates = {}
+        for side, bottom in FolderWatcher.SIDES:
+            side_file = os.path.join(work_dir, f"{stem}_{side}.csv")
+            template_file = os.path.join(work_dir, f"Neoden4_Template{stem}_{side}.csv")
+            if not (os.path.exists(side_file) and os.path.exists(template_file)):
+                continue
+            templates[side] = template_file
+            try:
+                self.runner.run({'type': 'generate', 'params': {
+                    'pcb_file': side_file,
+                    'template_file': template_file,
+                    'pcb_width': settings['pcb_width'],
+                    'sort_config': dict(settings['sort_config'], side=bottom)
+                }})
+            except PCBProcessingError as e:
+                # Sides without placeable parts fail in the GUI too; the missing file is the result
+                self.logger.debug(f"{os.path.basename(pcr_file)} {side}: {str(e)}")
+
+        base_side, second_side = self.OVERRIDE_SIDES
+        if base_side in templates and second_side in templates:
+            self.runner.run({'type': 'override', 'params': {
+                'base_file': templates[base_side], 'second_file': templates[second_side]}})
+
+    def compare_file(self, output_file: str, golden_file: str, limit: int = 5) -> List[str]:
+        """
+        Differences between an output file and its golden copy
+
+        Cells that are equal as text match; otherwise both must parse as
+        numbers within the tolerance.
+
+        Returns:
+            Up to limit human-readable differences
+        """
+        with open(output_file, newline='') as f:
+            output_rows = list(csv.reader(f))
+        with open(golden_file, newline='') as f:
+            golden_rows = list(csv.reader(f))
+        differences = []
+        if len(output_rows) != len(golden_rows):
+            differences.append(f"{len(output_rows)} rows, golden has {len(golden_rows)}")
+        for line, (row, golden_row) in enumerate(zip(output_rows, golden_rows), 1):
+            if row == golden_row:
+                continue
+            if len(row) != len(golden_row):
+                differences.append(f"line {line}: {len(row)} fields, golden has {len(golden_row)}")
+            for column, (value, expected) in enumerate(zip(row, golden_row)):
+                if value == expected:
+                    continue
+                try:
+                    if math.isclose(float(value), float(expected), rel_tol=0.0, abs_tol=self.tolerance):
+                        continue
+                except ValueError:
+                    pass
+                differences.append(f"line {line} field {column + 1}: {value!r}, golden {expected!r}")
+            if len(differences) >= limit:
+                break
+        return differences[:limit]
+
+    def run_case(self, case: str, update_golden: bool = False) -> Dict:
+        """
+        Benchmark one PCR export and check (or rewrite) its golden outputs
+
+        Returns:
+            Result dict with case, seconds, peak_mb, outputs, status and differences
+        """
+        result = {'case': case, 'outputs': 0, 'differences': {}}
+        try:
+            with tempfile.TemporaryDirectory(prefix='n4-bench-') as work_dir:
+                start = time.perf_counter()
+                outputs = self._run_case(case, work_dir)
+                result['seconds'] = round(time.perf_counter() - start, 3)
+                result['outputs'] = len(outputs)
+
+            with tempfile.TemporaryDirectory(prefix='n4-bench-') as work_dir:
+                tracemalloc.start()
+                try:
+                    self._run_case(case, work_dir)
+                    result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+                finally:
+                    tracemalloc.stop()
+
+                golden = self.golden_path(case)
+                if update_golden:
+                    shutil.rmtree(golden, ignore_errors=True)
+                    os.makedirs(golden)
+                    for name in outputs:
+                        shutil.copy(os.path.join(work_dir, name), os.path.join(golden, name))
+                    result['status'] = 'updated'
+                    return result
+
+                if not os.path.isdir(golden):
+                    result['status'] = 'no golden'
+                    return result
+                expected = sorted(name for name in os.listdir(golden) if name.lower().endswith('.csv'))
+                for name in sorted(set(expected) - set(outputs)):
+                    result['differences'][name] = ["missing from output"]
+                for name in sorted(set(outputs) - set(expected)):
+                    result['differences'][name] = ["not in golden outputs"]
+                for name in sorted(set(outputs) & set(expected)):
+                    differences = self.compare_file(os.path.join(work_dir, name), os.path.join(golden, name))
+                    if differences:
+                        result['differences'][name] = differences
+                result['status'] = 'FAIL' if result['differences'] else 'ok'
+        except Exception as e:
+            self.logger.error(f"Benchmark case {case} failed: {str(e)}", exc_info=True)
+            result.update(status='error', error=str(e))
+        return result
+
+    def run(self, update_golden: bool = False, cases: Optional[List[str]] = None) -> List[Dict]:
+        """Run every case (or the given ones) and log a summary line per case"""
+        results = []
+        for case in cases or self.find_cases():
+            result = self.run_case(case, update_golden)
+            results.append(result)
+            self.logger.info(f"{result['status']:>9}  {case}  {result.get('seconds', '-')}s  "
+                             f"{result.get('peak_mb', '-')} MB  {result['outputs']} files")
+            for name, differences in result['differences'].items():
+                for difference in differences:
+                    self.logger.info(f"           {name}: {difference}")
+        return results
@@ -0,0 +1,139 @@
+"""
+Headless command line: job service, watch folders, one-off jobs, benchmark
+
+    python -m n4_core --serve
+    python -m n4_core --job split --params '{"pcr_file": "..."}'
+    python -m n4_core --watch PCB_Assembly
+    python -m n4_core --benchmark
+
+Nothing here imports tkinter, so these run on machines without Tk.
+N4_File_Creator_v2k.py accepts the same options and starts the GUI
+when none is given.
+"""
+import os
+import json
+import logging
+import sys
+import argparse
+from typing import List, Optional
+
+from .benchmark import ASSEMBLY_DIR, BENCHMARK_TOLERANCE, GOLDEN_OUTPUTS_DIR, RegressionBenchmark
+from .logs import load_logging_config, setup_logging
+from .paths import PCR_FILES_DIR
+from .processing import MachineProfile, PCBProcessingError
+from .service import JobRunner, N4Service, ServiceClient, load_service_config
+from .trace import start_tracing
+from .watch import FolderWatcher, load_watch_config
+
+
+def compile_machine_profile(pcr_dir: str = PCR_FILES_DIR) -> str:
+    """Compile and save the machine profile of a pcr_files directory"""
+    logger = logging.getLogger('MachineProfile')
+    config_file = os.path.join(pcr_dir, "configuration.json")
+    config = {}
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    profile_path = MachineProfile.resolve_path(pcr_dir, config)
+    MachineProfile.compile(MachineProfile.source_paths(pcr_dir), logger).save(profile_path)
+    return profile_path
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the headless options to a parser"""
+    parser.add_argument('--compile-profile', nargs='?', const=PCR_FILES_DIR, metavar='PCR_DIR',
+                        help="compile the machine profile of a pcr_files folder")
+    parser.add_argument('--serve', action='store_true', help="run the local job service")
+    parser.add_argument('--port', type=int, help="service port (default from configuration.json)")
+    parser.add_argument('--job', choices=JobRunner.JOB_TYPES, help="submit a job to the service")
+    parser.add_argument('--params', default='{}', help="job parameters as JSON")
+    parser.add_argument('--no-wait', action='store_true', help="return once the job is queued")
+    parser.add_argument('--watch', nargs='*', metavar='FOLDER',
+                        help="split and generate PCR files dropped into these folders "
+                             "(default from configuration.json)")
+    parser.add_argument('--benchmark', nargs='?', const=ASSEMBLY_DIR, metavar='ASSEMBLY_DIR',
+                        help="run every board headlessly and compare with the golden outputs")
+    parser.add_argument('--golden', default=GOLDEN_OUTPUTS_DIR, help="golden outputs folder for --benchmark")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="rewrite the golden outputs from this run instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE,
+                        help="absolute tolerance for numeric cells")
+    parser.add_argument('--report', metavar='JSON', help="write benchmark results to this file")
+    parser.add_argument('--trace', metavar='JSON',
+                        help="record pipeline spans and write them as a Chrome trace to this file on exit")
+
+
+def headless_requested(args: argparse.Namespace) -> bool:
+    """True if the parsed options name a headless command"""
+    return bool(args.compile_profile or args.serve or args.job or args.watch is not None or args.benchmark)
+
+
+def run_benchmark(args: argparse.Namespace) -> int:
+    """Run --benchmark, printing one summary line per board; non-zero exit on any failure"""
+    # Pipeline warnings (unmatched parts etc.) would drown the per-board summary
+    logging.basicConfig(level=logging.ERROR, format='%(name)s - %(levelname)s - %(message)s')
+    logging.getLogger().handlers[0].setLevel(logging.ERROR)
+    summary = logging.StreamHandler(sys.stdout)
+    summary.setFormatter(logging.Formatter('%(message)s'))
+    bench_logger = logging.getLogger('RegressionBenchmark')
+    bench_logger.setLevel(logging.INFO)
+    bench_logger.addHandler(summary)
+    bench_logger.propagate = False
+    results = RegressionBenchmark(args.benchmark, args.golden, args.tolerance).run(args.update_golden)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result['status'] in ('FAIL', 'error', 'no golden') for result in results) else 0
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Run the headless command named by parsed options
+
+    Returns:
+        Process exit code
+    """
+    if args.benchmark:
+        return run_benchmark(args)
+    setup_logging(load_logging_config())
+    service_config = load_service_config()
+    if args.port:
+        service_config['port'] = args.port
+    try:
+        if args.compile_profile:
+            print(f"Machine profile written to {compile_machine_profile(args.compile_profile)}")
+        elif args.watch is not None:
+            watch_config = load_watch_config()
+            folders = args.watch or watch_config['folders']
+            if not folders:
+                print("No watch folders given or configured")
+                return 1
+            FolderWatcher(folders, JobRunner(), watch_config).run()
+        elif args.serve:
+            N4Service(JobRunner(), service_config['host'], int(service_config['port']),
+                      int(service_config['workers']), int(service_config['max_pending'])).serve_forever()
+        else:
+            params = json.loads(args.params)
+            client = ServiceClient.from_config(service_config)
+            if client.available():
+                result = client.submit(args.job, params, wait=not args.no_wait)
+            else:
+                logging.info("Service not running, processing locally")
+                result = JobRunner().run({'type': args.job, 'params': params})
+            print(json.dumps(result, indent=2, default=str))
+    except PCBProcessingError as e:
+        print(str(e))
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Headless entry point (python -m n4_core)"""
+    parser = argparse.ArgumentParser(prog="python -m n4_core", description="Neoden4 CSV Creator, headless")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if not headless_requested(args):
+        parser.error("one of --compile-profile, --serve, --job, --watch or --benchmark is required")
+    if args.trace:
+        start_tracing(args.trace)
+    return run(args)
@@ -0,0 +1,187 @@
+"""
+Shared log storage for the GUI, the service and the processing core
+
+Logging calls only put the record on a queue; one QueueListener thread
+formats and writes it for every component. Log files have fixed names,
+rotate by size and are deleted once older than max_age_days, so the logs
+folder stays bounded. Levels per logger come from the "logging" section
+of configuration.json.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Dict, List, Optional
+
+from .paths import APP_DIR, PCR_FILES_DIR
+
+DEFAULT_LOG_CONFIG = {
+    'level': "INFO",
+    'format': "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    'folder': "logs",  # Relative to the folder of N4_File_Creator_v2k.py
+    'max_mb': 5,  # Size of one log file before it rotates
+    'backup_count': 3,  # Rotated files kept per log
+    'max_age_days': 30,
+    'levels': {}  # Logger name -> level, e.g. {"PCBDataProcessor": "DEBUG"}
+}
+DETAILED_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+MAIN_LOG_FILE = "neoden4_processor.log"
+PCR_LOG_FILE = "pcr_processing.log"
+DEBUG_LOG_FILE = "debug.log"  # Only written when some level is DEBUG
+# Files pruned by age: the logs above plus the timestamped logs of earlier versions
+LOG_FILE_PREFIXES = ('neoden4_processor', 'pcr_processing', 'debug', 'template_override', 'neoden4_generator')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def load_logging_config(pcr_dir: str = PCR_FILES_DIR, config: Optional[Dict] = None) -> Dict:
+    """Logging settings from configuration.json merged over DEFAULT_LOG_CONFIG"""
+    log_config = dict(DEFAULT_LOG_CONFIG)
+    if config is None:
+        config_file = os.path.join(pcr_dir, "configuration.json")
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+    log_config.update(config.get('logging', {}))
+    return log_config
+
+
+def prune_logs(folder: str, max_age_days: float, prefixes=LOG_FILE_PREFIXES) -> List[str]:
+    """
+    Delete log files in ``folder`` older than ``max_age_days``
+
+    Returns:
+        Paths of the deleted files
+    """
+    removed = []
+    cutoff = time.time() - max_age_days * 86400
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return removed
+    for name in names:
+        path = os.path.join(folder, name)
+        if not name.startswith(prefixes) or '.log' not in name:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        except OSError:
+            pass  # Still open elsewhere or already gone
+    return removed
+
+
+class BoundedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that also drops this log's files older than max_age_days on rollover"""
+
+    def __init__(self, filename: str, max_mb: float, backup_count: int, max_age_days: float):
+        super().__init__(filename, maxBytes=int(max_mb * 2 ** 20), backupCount=int(backup_count),
+                         encoding='utf-8', delay=True)
+        self.max_age_days = max_age_days
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        # Checked against the size after the last write: the stock check formats and stats per record
+        if self.stream is None:
+            self.stream = self._open()
+        return self.maxBytes > 0 and self.stream.tell() >= self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        prune_logs(os.path.dirname(self.baseFilename), self.max_age_days,
+                   (os.path.basename(self.baseFilename),))
+
+
+def setup_logging(log_config: Optional[Dict] = None, console: bool = True) -> str:
+    """
+    Route all logging through one queue to bounded log files
+
+    Replaces the root logger's handlers and any writer started before.
+
+    Args:
+        log_config: "logging" settings, default from configuration.json
+        console: Also write INFO and above to stderr
+
+    Returns:
+        The logs folder
+    """
+    global _listener, _queue_handler
+    log_config = log_config or load_logging_config()
+    stop_logging()
+
+    folder = log_config['folder']
+    if not os.path.isabs(folder):
+        folder = os.path.join(APP_DIR, folder)
+    os.makedirs(folder, exist_ok=True)
+    prune_logs(folder, log_config['max_age_days'])
+
+    levels = {name: logging.getLevelName(str(level).upper())
+              for name, level in (log_config.get('levels') or {}).items()}
+    root_level = logging.getLevelName(str(log_config['level']).upper())
+    standard_formatter = logging.Formatter(log_config['format'])
+
+    def file_handler(name: str, level: int, formatter: logging.Formatter) -> logging.Handler:
+        handler = BoundedRotatingFileHandler(os.path.join(folder, name), log_config['max_mb'],
+                                             log_config['backup_count'], log_config['max_age_days'])
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+        return handler
+
+    # Main log: everything at INFO and above
+    handlers = [file_handler(MAIN_LOG_FILE, logging.INFO, standard_formatter)]
+
+    # PCR splitting only
+    pcr_handler = file_handler(PCR_LOG_FILE, logging.INFO, standard_formatter)
+    pcr_handler.addFilter(logging.Filter('PCR_File_Splitter'))
+    handlers.append(pcr_handler)
+
+    # Per-component DEBUG lines are opt-in through the configured levels
+    if logging.DEBUG in [root_level] + list(levels.values()):
+        handlers.append(file_handler(DEBUG_LOG_FILE, logging.DEBUG, logging.Formatter(DETAILED_LOG_FORMAT)))
+
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(standard_formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root_logger.addHandler(_queue_handler)
+    root_logger.setLevel(root_level)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    logging.getLogger(__name__).info(f"Logging initialized - logs directory: {folder}")
+    return folder
+
+
+def logging_configured() -> bool:
+    """True once setup_logging has started the shared writer"""
+    return _listener is not None
+
+
+def stop_logging() -> None:
+    """Write out queued records and close the log files"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
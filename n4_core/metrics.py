@@ -0,0 +1,307 @@
+"""
+Machine-readable metrics record of every generate, split and override run
+
+Each run appends one JSON line to metrics.jsonl and rewrites metrics.prom
+in the Prometheus text exposition format (for a node_exporter textfile
+collector or any scraper reading the file). A record holds the run's
+stage durations with rows in and out, placements per feeder and nozzle,
+manual-placement counts, job cache hit rates and the process's peak RSS.
+
+Stage timings come from the trace spans (n4_core.trace) of the thread
+that runs the job, so they are collected whether or not a trace is
+exported. Settings come from the "metrics" section of configuration.json.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .paths import APP_DIR, PCR_FILES_DIR
+from . import trace
+
+DEFAULT_METRICS_CONFIG = {
+    'enabled': True,
+    'folder': "logs",  # Relative to the folder of N4_File_Creator_v2k.py
+    'jsonl_file': "metrics.jsonl",
+    'prometheus_file': "metrics.prom",
+    'max_mb': 5  # metrics.jsonl is renamed to metrics.jsonl.1 beyond this size
+}
+PROMETHEUS_PREFIX = "n4"
+
+_config: Optional[Dict] = None
+_lock = threading.Lock()
+_latest: Dict[Tuple[str, str], Dict] = {}  # (job, board) -> last record, for metrics.prom
+_runs_total: Counter = Counter()  # (job, status) -> runs of this process
+
+
+def load_metrics_config(pcr_dir: str = PCR_FILES_DIR, config: Optional[Dict] = None) -> Dict:
+    """Metrics settings from configuration.json merged over DEFAULT_METRICS_CONFIG"""
+    metrics_config = dict(DEFAULT_METRICS_CONFIG)
+    if config is None:
+        config_file = os.path.join(pcr_dir, "configuration.json")
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+    metrics_config.update(config.get('metrics', {}))
+    return metrics_config
+
+
+def configure_metrics(metrics_config: Optional[Dict] = None) -> Dict:
+    """Use these settings instead of configuration.json for the following runs"""
+    global _config
+    _config = dict(DEFAULT_METRICS_CONFIG, **(metrics_config or {}))
+    return _config
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, None where it cannot be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak if sys.platform == 'darwin' else peak * 1024)  # kB except on macOS
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return int(counters.PeakWorkingSetSize)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class RunMetrics:
+    """Metrics of one run, filled by the spans and counters of its thread"""
+
+    def __init__(self, job: str, board: str):
+        self.job = job
+        self.board = board
+        self.status = 'ok'
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counts: Counter = Counter()
+        self.feeders: Counter = Counter()
+        self.nozzles: Counter = Counter()
+        self.cache: Optional[Dict] = None
+
+    def add_stage(self, name: str, seconds: float, info: Dict) -> None:
+        """Span sink: add one finished span to its stage"""
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows_in': 0, 'rows_out': 0})
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+        for key, arg in (('rows_in', 'rows'), ('rows_out', 'rows_out')):
+            if isinstance(info.get(arg), (int, float)):
+                stage[key] += int(info[arg])
+
+    def partial(self) -> Dict:
+        """Stage and placement data to hand to the run of another process"""
+        return {'stages': self.stages, 'counts': dict(self.counts),
+                'feeders': dict(self.feeders), 'nozzles': dict(self.nozzles)}
+
+    def merge(self, partial: Dict) -> None:
+        """Add the partial() of a side worker"""
+        for name, values in partial.get('stages', {}).items():
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows_in': 0, 'rows_out': 0})
+            for key, value in values.items():
+                stage[key] += value
+        self.counts.update(partial.get('counts', {}))
+        self.feeders.update(partial.get('feeders', {}))
+        self.nozzles.update(partial.get('nozzles', {}))
+
+    def record(self) -> Dict:
+        """The run as one JSON-serialisable record"""
+        return {
+            'timestamp': self.started,
+            'job': self.job,
+            'board': self.board,
+            'status': self.status,
+            'seconds': round(time.perf_counter() - self._start, 6),
+            'stages': {name: dict(stage, seconds=round(stage['seconds'], 6)) for name, stage in self.stages.items()},
+            'counts': dict(self.counts),
+            'placements_per_feeder': dict(sorted(self.feeders.items())),
+            'placements_per_nozzle': dict(sorted(self.nozzles.items())),
+            'cache': self.cache,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'pid': os.getpid()
+        }
+
+
+_local = threading.local()
+
+
+def current_run() -> Optional[RunMetrics]:
+    """The run of this thread, if one is being measured"""
+    return getattr(_local, 'run', None)
+
+
+@contextlib.contextmanager
+def metrics_run(job: str, board: str, publish: bool = True):
+    """
+    Measure the enclosed block as one run of ``job`` on ``board``
+
+    Inside a run of the same thread the outer run is reused, so a job
+    calling another job's steps gives one record.
+
+    Args:
+        publish: Write the record on exit; side workers return partial() instead
+    """
+    outer = current_run()
+    if outer is not None:
+        yield outer
+        return
+    run = RunMetrics(job, board)
+    _local.run = run
+    previous_sink = trace.set_span_sink(run)
+    try:
+        yield run
+    except BaseException:
+        run.status = 'error'
+        raise
+    finally:
+        trace.set_span_sink(previous_sink)
+        _local.run = None
+        if publish:
+            write_record(run.record())
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a counter of the current run"""
+    run = current_run()
+    if run is not None:
+        run.counts[name] += int(value)
+
+
+def add_placements(feeders: Iterable = (), nozzles: Iterable = ()) -> None:
+    """Count placements per feeder and per nozzle in the current run, one entry per part"""
+    run = current_run()
+    if run is not None:
+        run.feeders.update(str(feeder) for feeder in feeders if feeder is not None and feeder == feeder)
+        run.nozzles.update(str(nozzle) for nozzle in nozzles if nozzle is not None and nozzle == nozzle)
+
+
+def set_cache_stats(cache, hit: bool) -> None:
+    """Record whether the current run came from the job cache, with the cache's running hit rate"""
+    run = current_run()
+    if run is None or cache is None:
+        return
+    lookups = cache.hits + cache.misses
+    run.cache = {'hit': hit, 'hits': cache.hits, 'misses': cache.misses,
+                 'hit_rate': round(cache.hits / lookups, 4) if lookups else None}
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(records: List[Dict], runs_total: Optional[Dict[Tuple[str, str], int]] = None) -> str:
+    """
+    Prometheus text exposition of the latest record per job and board
+
+    Args:
+        records: Records as written to metrics.jsonl
+        runs_total: (job, status) -> number of runs, exported as a counter
+
+    Returns:
+        Text ending with a newline
+    """
+    families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def sample(name: str, kind: str, help_text: str, labels: Dict, value) -> None:
+        if value is None:
+            return
+        family = families.setdefault(name, (kind, help_text, []))
+        label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+        family[2].append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {float(value):g}")
+
+    for record in records:
+        run = {'job': record['job'], 'board': record['board']}
+        sample('run_seconds', 'gauge', "Duration of the last run", run, record['seconds'])
+        sample('run_timestamp_seconds', 'gauge', "Start of the last run (Unix time)", run,
+               datetime.fromisoformat(record['timestamp']).timestamp())
+        sample('run_success', 'gauge', "1 if the last run finished without error", run,
+               1 if record['status'] == 'ok' else 0)
+        for stage, values in record['stages'].items():
+            labels = dict(run, stage=stage)
+            sample('stage_seconds', 'gauge', "Time spent in a stage during the last run", labels, values['seconds'])
+            sample('stage_calls', 'gauge', "Times a stage ran during the last run", labels, values['calls'])
+            sample('stage_rows_in', 'gauge', "Rows into a stage during the last run", labels, values['rows_in'])
+            sample('stage_rows_out', 'gauge', "Rows out of a stage during the last run", labels, values['rows_out'])
+        for name, value in record['counts'].items():
+            sample(name, 'gauge', f"{name.replace('_', ' ').capitalize()} in the last run", run, value)
+        for feeder, value in record['placements_per_feeder'].items():
+            sample('feeder_placements', 'gauge', "Parts placed from a feeder in the last run",
+                   dict(run, feeder=feeder), value)
+        for nozzle, value in record['placements_per_nozzle'].items():
+            sample('nozzle_placements', 'gauge', "Parts placed with a nozzle in the last run",
+                   dict(run, nozzle=nozzle), value)
+        cache = record.get('cache') or {}
+        sample('cache_hit', 'gauge', "1 if the last run was restored from the job cache", run,
+               int(cache['hit']) if cache else None)
+        sample('cache_hit_ratio', 'gauge', "Job cache hits per lookup of this process", run, cache.get('hit_rate'))
+        sample('peak_rss_bytes', 'gauge', "Peak resident memory of the process after the last run", run,
+               record.get('peak_rss_bytes'))
+    for (job, status), value in sorted((runs_total or {}).items()):
+        sample('runs_total', 'counter', "Runs finished by this process", {'job': job, 'status': status}, value)
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+def write_record(record: Dict) -> Optional[str]:
+    """
+    Append a record to metrics.jsonl and rewrite metrics.prom
+
+    Returns:
+        Path of metrics.jsonl, None when metrics are disabled or not writable
+    """
+    global _config
+    if _config is None:
+        _config = load_metrics_config()
+    if not _config.get('enabled', True):
+        return None
+    folder = _config['folder']
+    if not os.path.isabs(folder):
+        folder = os.path.join(APP_DIR, folder)
+    jsonl_path = os.path.join(folder, _config['jsonl_file'])
+    prom_path = os.path.join(folder, _config['prometheus_file'])
+    with _lock:
+        _latest[(record['job'], record['board'])] = record
+        _runs_total[(record['job'], record['status'])] += 1
+        try:
+            os.makedirs(folder, exist_ok=True)
+            if os.path.exists(jsonl_path) and os.path.getsize(jsonl_path) > float(_config['max_mb']) * 2 ** 20:
+                os.replace(jsonl_path, f"{jsonl_path}.1")
+            with open(jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+            temp_path = f"{prom_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(prometheus_text(list(_latest.values()), _runs_total))
+            os.replace(temp_path, prom_path)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not write metrics: {str(e)}")
+            return None
+    return jsonl_path
@@ -0,0 +1,134 @@
+"""
+Template override: lay a second Neoden4 template onto a base template's feeders
+"""
+import os
+import logging
+from typing import Optional
+
+import pandas as pd
+
+from . import metrics
+from .processing import OutputStage
+from .trace import span
+
+
+def override_templates(base_file_path: str, second_file_path: str,
+                       logger: Optional[logging.Logger] = None) -> dict:
+    """
+    Override the second template with the feeder layout of the base template
+
+    Components already on a base feeder keep their position; remaining
+    base positions are filled with the second template's leftover
+    components. Writes template_override_<second> and
+    Component_Replacements.csv next to the second template.
+
+    Args:
+        base_file_path: Template whose feeder layout is kept
+        second_file_path: Template whose components are laid onto it
+        logger: Defaults to the TemplateOverride logger
+
+    Returns:
+        Dict with output_file, replacement_file, matches and filled
+    """
+    logger = logger or logging.getLogger('TemplateOverride')
+    with metrics.metrics_run('override', os.path.splitext(os.path.basename(second_file_path))[0]):
+        result = _override_templates(base_file_path, second_file_path, logger)
+        metrics.count('matches', result['matches'])
+        metrics.count('filled', result['filled'])
+    return result
+
+
+def _override_templates(base_file_path: str, second_file_path: str, logger: logging.Logger) -> dict:
+    logger.info("Starting file processing")
+    
+    # Read CSV files
+    df1 = pd.read_csv(base_file_path, dtype=str, keep_default_na=False)
+    df2 = pd.read_csv(second_file_path, dtype=str, keep_default_na=False)
+    
+    # Split into stack and non-stack rows
+    df1_stack = df1[df1['#Feeder'] == 'stack'].copy()
+    df2_stack = df2[df2['#Feeder'] == 'stack'].copy()
+    preserve_rows = df1[df1['#Feeder'] != 'stack'].copy()
+    
+    # Convert second file components to list
+    available_components = df2_stack.to_dict('records')
+    matched_components = set()  # Track which components from file2 have been used
+    
+    # Lists to track results and replacements
+    result_rows = []
+    replacement_rows = []  # Track replacements for the new file
+    match_count = 0
+    fill_count = 0
+    
+    with span('override matching', base=os.path.basename(base_file_path), rows=len(df1_stack)):
+        # First pass: Identify matches and keep them
+        for idx, base_row in df1_stack.iterrows():
+            new_row = base_row.copy()
+            match_found = False
+            replacement_row = base_row.copy()  # Create empty row for replacement tracking
+        
+            # Only look for match if position has component
+            if base_row['Footprint'].strip() not in ['-', ''] and base_row['Value'].strip() not in ['-', '']:
+                for i, comp in enumerate(available_components):
+                    if (i not in matched_components and
+                        comp['Footprint'] == base_row['Footprint'] and 
+                        comp['Value'] == base_row['Value']):
+                        match_found = True
+                        matched_components.add(i)
+                        match_count += 1
+                        logger.info(f"Matched at Feeder ID {base_row['Feeder ID']}: {base_row['Footprint']} - {base_row['Value']}")
+                        # Clear replacement row for matched components
+                        for col in df1.columns[7:]:
+                            replacement_row[col] = ''
+                        break
+        
+            # If no match found, this position needs filling
+            if not match_found:
+                # Get next unused component
+                for i, comp in enumerate(available_components):
+                    if i not in matched_components:
+                        # Update component data from Footprint onwards
+                        for col in df1.columns[7:]:
+                            new_row[col] = comp[col]
+                            replacement_row[col] = comp[col]  # Track the replacement
+                        matched_components.add(i)
+                        fill_count += 1
+                        logger.info(f"Filled position at Feeder ID {base_row['Feeder ID']} with: {comp['Footprint']} - {comp['Value']}")
+                        break
+            else:
+                # Clear replacement row for matched components
+                for col in df1.columns[7:]:
+                    replacement_row[col] = ''
+        
+            result_rows.append(new_row)
+            replacement_rows.append(replacement_row)
+    
+    # Create main result dataframe
+    stack_df = pd.DataFrame(result_rows)
+    result_df = pd.concat([stack_df, preserve_rows], ignore_index=True)
+    
+    # Create replacement tracking dataframe
+    replacement_df = pd.DataFrame(replacement_rows)
+    replacement_df = pd.concat([replacement_df, preserve_rows], ignore_index=True)
+    
+    # Both files are written locally and published next to the second template together
+    with span('write override outputs'), OutputStage(os.path.dirname(second_file_path), logger) as stage:
+        # Save main result
+        output_path = stage.path('template_override_' + os.path.basename(second_file_path))
+        result_df.to_csv(output_path, index=False)
+    
+        # Save replacement tracking file
+        replacement_path = stage.path('Component_Replacements.csv')
+        replacement_df.to_csv(replacement_path, index=False)
+    output_path = stage.destination(output_path)
+    replacement_path = stage.destination(replacement_path)
+    
+    logger.info(f"Matches (kept original): {match_count}")
+    logger.info(f"Positions filled: {fill_count}")
+    logger.info(f"Output files saved: \n{os.path.basename(output_path)}\n{os.path.basename(replacement_path)}")
+    return {
+        'output_file': output_path,
+        'replacement_file': replacement_path,
+        'matches': match_count,
+        'filled': fill_count
+    }
@@ -0,0 +1,11 @@
+"""
+Locations shared by the GUI and the processing core
+
+Kept free of heavy imports so light modules (logs) can use them.
+"""
+import os
+
+# Folder of N4_File_Creator_v2k.py; machine files and logs live below it
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Machine files; NEODEN4_PCR_FILES overrides the directory next to N4_File_Creator_v2k.py
+PCR_FILES_DIR = os.environ.get('NEODEN4_PCR_FILES', os.path.join(APP_DIR, 'pcr_files'))
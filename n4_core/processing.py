@@ -0,0 +1,3946 @@
+"""
+Neoden4 File Creator processing core
+
+PCR parsing, the compiled machine profile, feeder allocation, N4 file
+generation (PCBDataProcessor) and PCR splitting (PCR_File_Splitter).
+Nothing here imports tkinter, so it runs headless; N4_File_Creator_v2k.py
+builds the GUI, service and watch folders on top of it. yaml and the
+process pool are imported only when a job needs them.
+"""
+import os
+import re
+import csv
+import io
+import json
+import math
+import time
+import shutil
+import hashlib
+import contextlib
+import logging
+import logging.handlers
+import tempfile
+import threading
+from collections import defaultdict, Counter
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .paths import PCR_FILES_DIR
+from . import metrics
+from .trace import collect_spans, merge_spans, span, start_tracing, tracing_enabled
+
+DEFAULT_BOARD_GAP = 0.0  # mm between panel boards; 0 disables per-board fiducial transforms
+DEFAULT_IGNORED_FEATURES = ['TP', 'DNP', 'DNE', 'HDR', 'Hole', 'Panel', 'Edge', 'MH', 'MOUNTHOLE']
+IGNORE_RULE_COLUMNS = ['REFDES', 'SYM_NAME', 'COMP_VALUE']
+PCR_REPORT_EXTENSIONS = ('.htm', '.html')  # Allegro "Placed Component Report" exports
+FEEDER_CONSTRAINTS_FILE = "Neoden4_Feeder_Constraints.csv"  # Lives next to Neoden4.csv
+# Used when the machine profile has no constraint table: feeder 20 takes at most 4 parts from an 8mm reel
+DEFAULT_FEEDER_CONSTRAINTS = [{'Feeder ID': '20', 'Max Placements': 4, 'Reel Widths': '8', 'Nozzles': ''}]
+MACHINE_PROFILE_FILE = "Neoden4_Machine.profile"
+MACHINE_PROFILE_MAGIC = b"N4PROFILE"
+MACHINE_PROFILE_VERSION = 2  # Bump when the compiled layout changes
+FEEDER_CHANGES_FILE = "Feeder_Changes.csv"  # Written next to the PCR when feeder pinning is on
+PCR_DIFF_COLUMNS = ['SYM_NAME', 'COMP_VALUE', 'SYM_X', 'SYM_Y', 'SYM_ROTATE', 'SYM_MIRROR']
+JOB_CACHE_VERSION = 2  # Bump when output formats change so stale cache entries are ignored
+# Component row layout of a Neoden4 file, after the #SMD header of the template
+N4_COMP_COLUMNS = ['#Feeder', 'Feeder ID', 'Type', 'Nozzle', 'X', 'Y', 'Angle', 'Footprint', 'Value', 'Pick height']
+N4_COMP_FORMATS = {'Angle': '%.6f', 'Footprint': '%.6f', 'Value': '%.2f'}  # Machine X, Y (mm) and rotation
+DEFAULT_JOB_CACHE_CONFIG = {
+    'enabled': True,
+    'folder': "job_cache",  # Relative to the pcr_files directory
+    'max_mb': 256
+}
+
+class PlacementResult(Enum):
+    PLACED = 1
+    ALREADY_PLACED = 2
+    NOT_PLACED = 3
+
+# ---- Custom Exceptions ----
+class PCBProcessingError(Exception):
+    """Custom exception for PCB processing errors"""
+    pass
+
+# ---- Data Models ----
+class ComponentRow:
+    """Lightweight view of one row of a ComponentTable"""
+    __slots__ = ('_table', '_pos')
+
+    def __init__(self, table: 'ComponentTable', pos: int):
+        self._table = table
+        self._pos = pos
+
+    @property
+    def position(self) -> int:
+        return self._pos
+
+    @property
+    def refdes(self) -> str:
+        return self._table.refdes_names[self._table.refdes_codes[self._pos]]
+
+    @property
+    def footprint(self):
+        return self._table.footprints[self._table.footprint_codes[self._pos]]
+
+    @property
+    def value(self):
+        return self._table.values[self._table.value_codes[self._pos]]
+
+    @property
+    def x(self) -> float:
+        return float(self._table.x[self._pos])
+
+    @property
+    def y(self) -> float:
+        return float(self._table.y[self._pos])
+
+    @property
+    def rotation(self) -> float:
+        return float(self._table.rotation[self._pos])
+
+    @property
+    def bottom(self) -> bool:
+        return bool(self._table.bottom[self._pos])
+
+    @property
+    def is_fiducial(self) -> bool:
+        return str(self.refdes).startswith('FID')
+
+    def __getitem__(self, column: str):
+        """Raw value of any PCR column, for code written against pd.Series rows"""
+        codes, uniques = self._table.columns[column]
+        return uniques[codes[self._pos]]
+
+    def __repr__(self) -> str:
+        return f"ComponentRow({self.refdes}, {self.footprint}/{self.value}, x={self.x}, y={self.y})"
+
+
+class ComponentTable:
+    """
+    Columnar (struct-of-arrays) view of PCR component data.
+
+    Coordinates and rotation are float64 arrays, REFDES, SYM_NAME and
+    COMP_VALUE are stored as integer codes into their unique values, and the
+    board side is a boolean flag. Components sharing a footprint/value pair
+    get the same group id. Every other PCR column is kept the same way, as
+    codes into its unique values, so output files are rebuilt from the table
+    without holding on to the source DataFrame.
+    """
+    __slots__ = ('x', 'y', 'rotation', 'bottom',
+                 'refdes_codes', 'refdes_names', 'footprint_codes', 'footprints',
+                 'value_codes', 'values', 'columns', 'group_ids', 'group_rows')
+
+    def __init__(self, source: pd.DataFrame):
+        self.x = pd.to_numeric(source['SYM_X'], errors='coerce').to_numpy(dtype=np.float64)
+        self.y = pd.to_numeric(source['SYM_Y'], errors='coerce').to_numpy(dtype=np.float64)
+        self.rotation = pd.to_numeric(source['SYM_ROTATE'], errors='coerce').to_numpy(dtype=np.float64)
+        self.bottom = (source['SYM_MIRROR'] == 'YES').to_numpy()
+
+        self.refdes_codes, self.refdes_names = self._encode(source['REFDES'])
+        self.footprint_codes, self.footprints = self._encode(source['SYM_NAME'])
+        self.value_codes, self.values = self._encode(source['COMP_VALUE'])
+
+        # Column name -> (codes, unique values), in source column order
+        encoded = {'REFDES': (self.refdes_codes, self.refdes_names),
+                   'SYM_NAME': (self.footprint_codes, self.footprints),
+                   'COMP_VALUE': (self.value_codes, self.values)}
+        self.columns = {column: encoded[column] if column in encoded else self._encode(source[column])
+                        for column in source.columns}
+
+        # Group ids follow first appearance, like a dict keyed by (footprint, value)
+        pair_codes = self.footprint_codes.astype(np.int64) * max(len(self.values), 1) + self.value_codes
+        group_ids, _ = pd.factorize(pair_codes)
+        self.group_ids = group_ids.astype(np.int32)
+        self.group_rows = None
+
+    @staticmethod
+    def _encode(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        return codes.astype(np.int32), np.asarray(uniques)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'ComponentTable':
+        return cls(df)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield ComponentRow(self, pos)
+
+    def row(self, pos: int) -> ComponentRow:
+        return ComponentRow(self, pos)
+
+    @property
+    def num_groups(self) -> int:
+        return int(self.group_ids.max()) + 1 if len(self.group_ids) else 0
+
+    def group_counts(self) -> np.ndarray:
+        return np.bincount(self.group_ids, minlength=self.num_groups)
+
+    def groups(self) -> List[np.ndarray]:
+        """Row positions of each footprint/value group, in group id order"""
+        if self.group_rows is None:
+            order = np.argsort(self.group_ids, kind='stable')
+            splits = np.cumsum(self.group_counts())[:-1]
+            self.group_rows = np.split(order, splits) if len(order) else []
+        return self.group_rows
+
+    def group_key(self, group_id: int) -> Tuple:
+        """(footprint, value) of a group"""
+        pos = self.groups()[group_id][0]
+        return (self.footprints[self.footprint_codes[pos]], self.values[self.value_codes[pos]])
+
+    def frame(self, positions: np.ndarray) -> pd.DataFrame:
+        """Source rows at the given positions as a new DataFrame"""
+        positions = np.asarray(positions, dtype=np.int64)
+        return pd.DataFrame({column: uniques[codes[positions]]
+                             for column, (codes, uniques) in self.columns.items()})
+
+# ---- PCR Report Parsing ----
+class PCRReportParser(HTMLParser):
+    """
+    Streaming parser for the Allegro "Placed Component Report" HTML table.
+
+    Cells are collected straight into per-column lists as rows close, so
+    memory is bounded by the table itself plus one read chunk. The first
+    row of the report table is the header.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.header: Optional[List[str]] = None
+        self.columns: List[List[str]] = []
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._in_table = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._in_table = True
+        elif self._in_table and tag == 'tr':
+            self._row = []
+        elif self._row is not None and tag in ('td', 'th'):
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            # &nbsp; arrives as U+00A0; a cell holding only that is empty
+            self._row.append(''.join(self._cell).replace('\xa0', ' ').strip())
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._end_row(self._row)
+            self._row = None
+        elif tag == 'table':
+            self._in_table = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _end_row(self, row: List[str]) -> None:
+        if self.header is None:
+            self.header = row
+            self.columns = [[] for _ in row]
+            return
+        if not any(row):
+            return
+        row = (row + [''] * len(self.header))[:len(self.header)]
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    @classmethod
+    def read_header(cls, path: str) -> List[str]:
+        """Column names of a PCR.htm report, reading only as far as the header row"""
+        parser = cls()
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), ''):
+                parser.feed(chunk)
+                if parser.header is not None:
+                    break
+        return parser.header or []
+
+    @classmethod
+    def read(cls, path: str) -> pd.DataFrame:
+        """
+        Parse a PCR.htm report into the DataFrame pd.read_csv gives for its CSV export
+
+        Raises:
+            PCBProcessingError: if the file has no component table
+        """
+        parser = cls()
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), ''):
+                parser.feed(chunk)
+        parser.close()
+        if not parser.header:
+            raise PCBProcessingError(f"No component table found in {path}")
+
+        # Same typing as the CSV export: empty -> NaN, numeric columns -> float,
+        # whole-number columns (the report pads SYM_ROTATE to 270.000) -> int
+        frame = {}
+        for name, values in zip(parser.header, parser.columns):
+            column = pd.Series([value or np.nan for value in values], dtype=object)
+            try:
+                column = pd.to_numeric(column)
+            except (ValueError, TypeError):
+                column = column.astype(object)
+            else:
+                if (column.dtype.kind == 'f' and column.notna().all()
+                        and (column % 1 == 0).all()):
+                    column = column.astype(np.int64)
+            frame[name] = column
+        return pd.DataFrame(frame, columns=parser.header)
+
+
+def read_pcr_file(path: str) -> pd.DataFrame:
+    """Load PCR data from a CSV export or directly from an Allegro PCR.htm report"""
+    if path.lower().endswith(PCR_REPORT_EXTENSIONS):
+        return PCRReportParser.read(path)
+    return pd.read_csv(path)
+
+# ---- Spatial Indexing ----
+class SpatialGridIndex:
+    """
+    Uniform grid index over 2D points for fixed-radius neighbour queries.
+
+    Points are hashed into square cells of side ``cell_size`` so that every
+    neighbour within ``cell_size`` of a point lives in the same or one of the
+    eight surrounding cells.
+    """
+    def __init__(self, points: np.ndarray, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(list)
+        cell_keys = np.floor(self.points / self.cell_size).astype(np.int64)
+        for idx, (cx, cy) in enumerate(cell_keys.tolist()):
+            self.cells[(cx, cy)].append(idx)
+        self.cells = {key: np.array(members) for key, members in self.cells.items()}
+
+    def connected_clusters(self) -> np.ndarray:
+        """
+        Label points by single-linkage clustering with link distance ``cell_size``
+
+        Returns:
+            Array of cluster labels (0..n_clusters-1), one per point
+        """
+        parent = np.arange(len(self.points))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        limit = self.cell_size ** 2
+        for (cx, cy), members in self.cells.items():
+            # Only look "forward" so each cell pair is compared once
+            for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+                others = self.cells.get((cx + dx, cy + dy))
+                if others is None:
+                    continue
+                diff = self.points[members][:, None, :] - self.points[others][None, :, :]
+                close = np.argwhere((diff ** 2).sum(axis=2) <= limit)
+                for a, b in close:
+                    root_a, root_b = find(members[a]), find(others[b])
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+        roots = np.array([find(i) for i in range(len(self.points))], dtype=np.int64)
+        return np.unique(roots, return_inverse=True)[1]
+
+
+class PlacementLOD:
+    """
+    Level-of-detail queries over the placements of a processed board.
+
+    Coordinates are held once as arrays. Each query culls to the visible
+    window; when more than ``DETAIL_LIMIT`` placements are visible they are
+    binned into a square grid instead, one cell per occupied bin coloured by
+    its most common feeder. Queries are vectorised, so their cost does not
+    depend on drawing one item per placement.
+    """
+    DETAIL_LIMIT = 1500
+
+    def __init__(self, x, y, feeders, refdes, fiducials=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.refdes = np.asarray(refdes, dtype=object)
+        self.fiducials = np.asarray(fiducials if fiducials is not None else [], dtype=float).reshape(-1, 2)
+        # Feeder names become small integer codes for colouring and binning
+        self.feeder_codes, self.feeder_names = pd.factorize(pd.Series(feeders, dtype=object).fillna(''))
+        self.feeder_codes = self.feeder_codes.astype(np.int64)
+
+    @classmethod
+    def from_processed(cls, processed: pd.DataFrame, fiducials=None) -> 'PlacementLOD':
+        """Build from the processed component table (machine X/Y are in Angle/Footprint)"""
+        return cls(processed['Angle'].to_numpy(), processed['Footprint'].to_numpy(),
+                   processed['Feeder ID'].astype(str).to_numpy(), processed['Nozzle'].to_numpy(),
+                   fiducials)
+
+    @classmethod
+    def read_n4_file(cls, path: str) -> 'PlacementLOD':
+        """Build from a generated N4 file: its comp rows and the mark row's fiducials"""
+        x, y, feeders, refdes, fiducials = [], [], [], [], []
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                if row[0] == 'comp':
+                    feeders.append(row[1])
+                    refdes.append(row[3])
+                    x.append(float(row[6]))
+                    y.append(float(row[7]))
+                elif row[0] == 'mark':
+                    values = [float(v) for v in row[3:] if v.strip()]
+                    fiducials.extend(zip(values[0::2], values[1::2]))
+        return cls(x, y, feeders, refdes, fiducials)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(x0, y0, x1, y1) of all placements"""
+        if not len(self):
+            return (0.0, 0.0, 1.0, 1.0)
+        return (float(self.x.min()), float(self.y.min()), float(self.x.max()), float(self.y.max()))
+
+    def visible(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """Indices of placements inside the (x0, y0, x1, y1) window"""
+        x0, y0, x1, y1 = bounds
+        return np.flatnonzero((self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1))
+
+    def bins(self, index: np.ndarray, origin: Tuple[float, float], cell: float) -> Dict[str, np.ndarray]:
+        """
+        Bin placements into square cells of side ``cell`` anchored at ``origin``
+
+        Returns:
+            Dict of per occupied cell arrays: x, y (lower-left corner),
+            feeder (most common feeder code) and count
+        """
+        if not len(index):
+            empty = np.empty(0)
+            return {'x': empty, 'y': empty, 'feeder': empty.astype(np.int64), 'count': empty.astype(np.int64)}
+        cx = np.floor((self.x[index] - origin[0]) / cell).astype(np.int64)
+        cy = np.floor((self.y[index] - origin[1]) / cell).astype(np.int64)
+        cx -= cx.min()
+        cy -= cy.min()
+        n_cols = int(cx.max()) + 1
+        n_cells = n_cols * (int(cy.max()) + 1)
+        cell_ids = cy * n_cols + cx
+        n_feeders = max(len(self.feeder_names), 1)
+
+        # Dense counts: the grid spans the visible window, so it is bounded by the screen size
+        counts = np.bincount(cell_ids, minlength=n_cells)
+        occupied = np.flatnonzero(counts)
+        rank = np.cumsum(counts > 0) - 1
+        feeder_counts = np.bincount(rank[cell_ids] * n_feeders + self.feeder_codes[index],
+                                    minlength=len(occupied) * n_feeders).reshape(len(occupied), n_feeders)
+
+        x_min = np.floor((self.x[index].min() - origin[0]) / cell) * cell + origin[0]
+        y_min = np.floor((self.y[index].min() - origin[1]) / cell) * cell + origin[1]
+        return {
+            'x': x_min + (occupied % n_cols) * cell,
+            'y': y_min + (occupied // n_cols) * cell,
+            'feeder': feeder_counts.argmax(axis=1),
+            'count': counts[occupied]
+        }
+
+    def nearest(self, x: float, y: float) -> Optional[int]:
+        """Index of the placement closest to (x, y)"""
+        if not len(self):
+            return None
+        return int(np.argmin((self.x - x) ** 2 + (self.y - y) ** 2))
+
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """
+    Convex hull of 2D points, counter-clockwise from the lowest-leftmost point
+
+    Points inside the polygon of the eight extreme points (along x, y and
+    both diagonals) are dropped in one vectorised test first, so only the
+    few points near the outline are sorted and walked by the monotone chain.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) >= 8:
+        x, y = points[:, 0], points[:, 1]
+        # Extremes in counter-clockwise order: left, bottom-left, bottom, ..., top-left
+        order = [x.argmin(), (x + y).argmin(), y.argmin(), (x - y).argmax(),
+                 x.argmax(), (x + y).argmax(), y.argmax(), (x - y).argmin()]
+        ring = points[order]
+        ring = ring[np.r_[True, np.any(ring[1:] != ring[:-1], axis=1)]]
+        if len(ring) >= 3:
+            inside = np.ones(len(points), dtype=bool)
+            for a, b in zip(ring, np.roll(ring, -1, axis=0)):
+                inside &= (b[0] - a[0]) * (y - a[1]) - (b[1] - a[1]) * (x - a[0]) > 0
+            points = points[~inside]
+    points = np.unique(points, axis=0)  # Sorted by x, then y
+    if len(points) < 3:
+        return points
+    candidates = points.tolist()
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for point in candidates:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    for point in reversed(candidates):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+    return np.array(lower[:-1] + upper[:-1])
+
+
+@dataclass
+class BoardOutline:
+    """
+    Board outline estimated from every placement and fiducial of a PCR.
+
+    ``origin`` and ``extent`` are the lower-left and upper-right corners of
+    the fiducial frame (the placement bounds with fewer than two fiducials).
+    ``width`` is the line bottom-side parts are mirrored about: the right
+    edge of the fiducial frame, widened to the outermost placement when a
+    part sits beyond it, so mirrored coordinates never go negative.
+    """
+    bounds: Tuple[float, float, float, float]  # x_min, y_min, x_max, y_max
+    hull: np.ndarray
+    fiducials: np.ndarray
+    origin: Tuple[float, float]
+    extent: Tuple[float, float]
+    width: float
+    confident: bool
+    reason: str
+
+    FIDUCIAL_EDGE_TOLERANCE = 10.0  # mm a placement may sit beyond the fiducial frame
+    MIN_FIDUCIAL_SPAN = 0.5  # Fraction of the outline width the fiducials should span
+
+    @classmethod
+    def empty(cls, reason: str, fiducials: Optional[np.ndarray] = None) -> 'BoardOutline':
+        """Outline of a PCR without usable coordinates (width 0.0)"""
+        return cls((0.0, 0.0, 0.0, 0.0), np.empty((0, 2)),
+                   fiducials if fiducials is not None else np.empty((0, 2)),
+                   (0.0, 0.0), (0.0, 0.0), 0.0, False, reason)
+
+    @classmethod
+    def from_pcr(cls, pcb_df: pd.DataFrame) -> 'BoardOutline':
+        """Estimate the outline of a PCR table (fiducials are REFDES containing FID)"""
+        x = pd.to_numeric(pcb_df['SYM_X'], errors='coerce').to_numpy(dtype=float)
+        y = pd.to_numeric(pcb_df['SYM_Y'], errors='coerce').to_numpy(dtype=float)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        is_fiducial = pcb_df['REFDES'].astype(str).str.contains('FID', case=False, na=False).to_numpy() & valid
+        points = np.column_stack([x[valid], y[valid]])
+        fiducials = np.column_stack([x[is_fiducial], y[is_fiducial]])
+
+        if not len(points):
+            return cls.empty("no placement coordinates", fiducials)
+
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        hull = convex_hull(points)
+
+        if len(fiducials) >= 2:
+            origin = tuple(float(v) for v in fiducials.min(axis=0))
+            extent = tuple(float(v) for v in fiducials.max(axis=0))
+            span = (extent[0] - origin[0]) / max(x_max - x_min, 1e-9)
+            overhang = float(hull[:, 0].max()) - extent[0]
+            confident = span >= cls.MIN_FIDUCIAL_SPAN and overhang <= cls.FIDUCIAL_EDGE_TOLERANCE
+            if overhang > 0:
+                reason = (f"{len(fiducials)} fiducials span {span:.0%} of the outline, "
+                          f"widened {overhang:.3f}mm to the outermost placement")
+            else:
+                reason = f"{len(fiducials)} fiducials span {span:.0%} of the outline, width from the fiducial frame"
+        else:
+            origin, extent = (float(x_min), float(y_min)), (float(x_max), float(y_max))
+            confident = False
+            reason = f"{len(fiducials)} fiducial(s); width from placements only"
+        return cls((float(x_min), float(y_min), float(x_max), float(y_max)), hull, fiducials,
+                   origin, extent, max(extent[0], float(x_max)), confident, reason)
+
+# ---- Feature Filtering ----
+class IgnoreRuleMatcher:
+    """
+    Compiled ignore rules for PCR rows.
+
+    Rules come from the configuration file:
+      - ``ignored_pcb_features``: legacy list, each entry is a case-insensitive
+        regex searched for in REFDES, SYM_NAME and COMP_VALUE
+      - ``ignore_rules``: list of {"column", "type", "pattern"} entries where type
+        is prefix, exact, contains (literal substring) or regex (search), and
+        column is a PCR column or "*" for all of IGNORE_RULE_COLUMNS.
+        Rules are case-insensitive unless "case_sensitive" is true.
+
+    Matchers are cached per rule set, so building several splitters from the
+    same configuration compiles the patterns only once.
+    """
+    RULE_TYPES = ('prefix', 'exact', 'regex', 'contains')
+    _cache: Dict[str, 'IgnoreRuleMatcher'] = {}
+
+    def __init__(self, rules: List[Dict]):
+        self.rules = rules
+        # One compiled regex per column, all rule types folded into alternations
+        per_column = defaultdict(list)
+        for rule in rules:
+            rule_type = rule.get('type', 'contains')
+            if rule_type not in self.RULE_TYPES:
+                raise ValueError(f"Unknown ignore rule type: {rule_type}")
+            pattern = str(rule['pattern'])
+            if rule_type == 'prefix':
+                pattern = f"^{re.escape(pattern)}"
+            elif rule_type == 'exact':
+                pattern = f"^{re.escape(pattern)}$"
+            elif rule_type == 'contains':
+                pattern = re.escape(pattern)
+            # Scoped inline flags keep per-rule case handling inside a single regex
+            scoped = f"(?:{pattern})" if rule.get('case_sensitive', False) else f"(?i:{pattern})"
+            columns = IGNORE_RULE_COLUMNS if rule.get('column', '*') == '*' else [rule['column']]
+            for column in columns:
+                per_column[column].append(scoped)
+        self.patterns = {column: re.compile('|'.join(parts)) for column, parts in per_column.items()}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'IgnoreRuleMatcher':
+        """Get the (cached) matcher for a configuration dictionary"""
+        features = list(dict.fromkeys(
+            list(config.get('ignored_pcb_features', [])) + DEFAULT_IGNORED_FEATURES))
+        rules = [{'column': '*', 'type': 'regex', 'pattern': '|'.join(features)}] if features else []
+        rules.extend(config.get('ignore_rules', []))
+
+        key = json.dumps(rules, sort_keys=True)
+        if key not in cls._cache:
+            cls._cache[key] = cls(rules)
+        return cls._cache[key]
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Boolean mask of rows matching any ignore rule
+
+        Each column is factorized and the patterns are evaluated once per
+        unique value, then broadcast back to the rows through the codes.
+        """
+        result = np.zeros(len(df), dtype=bool)
+        for column, pattern in self.patterns.items():
+            if column not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[column])
+            unique_hits = np.fromiter(
+                (isinstance(value, str) and pattern.search(value) is not None for value in uniques),
+                dtype=bool, count=len(uniques))
+            # Missing values get code -1 and never match
+            result |= (codes >= 0) & unique_hits[codes]
+        return result
+
+    def matches(self, row: pd.Series) -> bool:
+        """Check a single PCR row against the rules"""
+        return any(isinstance(row.get(column), str) and pattern.search(row[column]) is not None
+                   for column, pattern in self.patterns.items())
+
+# ---- Feeder Constraints ----
+class FeederConstraints:
+    """
+    Per-feeder capacity constraints of the machine profile.
+
+    One row per constrained feeder: the most parts it may hold, the reel
+    widths it accepts and the nozzles it may use. Blank cells mean no
+    restriction; feeders not in the table are unrestricted. Feeders with a
+    placement limit are strip/tray positions for low-count parts.
+    """
+    UNLIMITED = np.iinfo(np.int64).max
+
+    def __init__(self, records: List[Dict]):
+        self.feeder_ids: List[str] = []
+        self.limits: Dict[str, int] = {}
+        self.reel_widths: Dict[str, frozenset] = {}
+        self.nozzles: Dict[str, str] = {}
+        for record in records:
+            feeder_id = str(record['Feeder ID']).strip()
+            self.feeder_ids.append(feeder_id)
+            limit = self._cell(record.get('Max Placements'))
+            if limit:
+                self.limits[feeder_id] = int(float(limit))
+            widths = self._cell(record.get('Reel Widths'))
+            if widths:
+                self.reel_widths[feeder_id] = frozenset(w.strip() for w in widths.split(',') if w.strip())
+            nozzles = self._cell(record.get('Nozzles'))
+            if nozzles:
+                self.nozzles[feeder_id] = nozzles.replace(',', '').replace(' ', '')
+
+        # Column arrays for the vectorized check
+        self.column_of = {feeder_id: i for i, feeder_id in enumerate(self.feeder_ids)}
+        self.max_placements = np.array([self.limits.get(f, self.UNLIMITED) for f in self.feeder_ids],
+                                       dtype=np.int64)
+        self.reel_vocabulary = sorted({w for widths in self.reel_widths.values() for w in widths})
+        reel_index = {width: i for i, width in enumerate(self.reel_vocabulary)}
+        # Last column stands for any width outside the vocabulary
+        self.reel_allowed = np.ones((len(self.feeder_ids), len(self.reel_vocabulary) + 1), dtype=bool)
+        for feeder_id, widths in self.reel_widths.items():
+            row = self.reel_allowed[self.column_of[feeder_id]]
+            row[:] = False
+            row[[reel_index[w] for w in widths]] = True
+        self._reel_index = reel_index
+        self.nozzle_bits = np.array([self.nozzle_mask(self.nozzles[f]) if f in self.nozzles else -1
+                                     for f in self.feeder_ids], dtype=np.int64)
+
+    @staticmethod
+    def _cell(value) -> str:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return ''
+        return str(value).strip()
+
+    @staticmethod
+    def nozzle_mask(nozzles) -> int:
+        """Bitmask of nozzle digits, e.g. '12' -> 0b110"""
+        mask = 0
+        for nozzle in str(nozzles):
+            if nozzle.isdigit():
+                mask |= 1 << int(nozzle)
+        return mask
+
+    @classmethod
+    def from_file(cls, path: str, logger: logging.Logger) -> 'FeederConstraints':
+        """Load the constraint table, falling back to DEFAULT_FEEDER_CONSTRAINTS"""
+        if not os.path.exists(path):
+            logger.info(f"No feeder constraint table at {path}, using defaults")
+            return cls(DEFAULT_FEEDER_CONSTRAINTS)
+        try:
+            table = pd.read_csv(path, dtype=str, keep_default_na=False)
+            constraints = cls(table.to_dict('records'))
+            logger.info(f"Loaded feeder constraints for feeders {constraints.feeder_ids} from {path}")
+            return constraints
+        except Exception as e:
+            logger.error(f"Error loading feeder constraints: {str(e)}")
+            raise PCBProcessingError(f"Failed to load feeder constraints: {str(e)}")
+
+    @property
+    def limited_feeders(self) -> List[str]:
+        """Feeders with a placement limit, in numeric order"""
+        return sorted(self.limits, key=int)
+
+    @property
+    def low_count_limit(self) -> int:
+        """Largest count any limited feeder takes; smaller groups are 'low count'"""
+        return max(self.limits.values(), default=DEFAULT_FEEDER_CONSTRAINTS[0]['Max Placements'])
+
+    def allowed_nozzles(self, feeder_id: str, nozzles: List[str]) -> List[str]:
+        """Restrict a feeder's nozzles to those the table allows"""
+        allowed = self.nozzles.get(str(feeder_id))
+        return list(nozzles) if allowed is None else [n for n in nozzles if n in allowed]
+
+    def admissible(self, counts, reels=None, nozzle_masks=None) -> np.ndarray:
+        """
+        Check every group against every constrained feeder in one pass
+
+        Args:
+            counts: Parts per group
+            reels: Optional reel width per group
+            nozzle_masks: Optional nozzle bitmask per group (see nozzle_mask)
+
+        Returns:
+            Boolean matrix (groups x constrained feeders)
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        ok = counts[:, None] <= self.max_placements[None, :]
+        if reels is not None:
+            unknown = len(self.reel_vocabulary)
+            reel_codes = np.fromiter((self._reel_index.get(str(reel), unknown) for reel in reels),
+                                     dtype=np.int64, count=len(counts))
+            ok &= self.reel_allowed[:, reel_codes].T
+        if nozzle_masks is not None:
+            masks = np.asarray(nozzle_masks, dtype=np.int64)
+            ok &= (masks[:, None] & self.nozzle_bits[None, :]) != 0
+        return ok
+
+# ---- Feeder Pool ----
+class FeederPool:
+    """
+    Immutable feeder layout of a Neoden4 machine template.
+
+    Built once from the base template: for every reel width the stack
+    feeders in numeric order, the template row of each feeder and its
+    original nozzle. Availability is tracked separately as integer bitsets
+    (bit i = i-th feeder of that reel width), so a fresh state is O(1).
+    Feeders with a placement limit in the constraint table are kept out of
+    the reel lists and offered to low-count groups first.
+    """
+    __slots__ = ('reel_sizes', 'reels', 'bit_of', 'nozzles', 'reel_of', 'constraints', 'limited',
+                 'restricted_bits', 'full_bits')
+
+    def __init__(self, neoden4_df: pd.DataFrame, reel_sizes: set, logger: logging.Logger,
+                 constraints: Optional[FeederConstraints] = None):
+        self.reel_sizes = frozenset(reel_sizes)
+        self.constraints = constraints or FeederConstraints(DEFAULT_FEEDER_CONSTRAINTS)
+        reels = {size: [] for size in self.reel_sizes}
+        self.nozzles = {}
+        self.reel_of = {}
+        limited = []
+
+        stack = neoden4_df[neoden4_df['#Feeder'] == 'stack']
+        for feeder_id, reel_size, nozzle in zip(stack['Feeder ID'], stack['Reel'], stack['Nozzle']):
+            feeder_id, reel_size = str(feeder_id), str(reel_size)
+            self.reel_of.setdefault(feeder_id, reel_size)
+            if feeder_id not in self.nozzles:
+                allowed = self.constraints.nozzles.get(feeder_id)
+                self.nozzles[feeder_id] = (nozzle if allowed is None else
+                                           ''.join(n for n in str(nozzle) if n in allowed))
+
+            if feeder_id in self.constraints.limits:
+                if feeder_id not in limited:
+                    limited.append(feeder_id)
+                continue
+
+            if reel_size in reels:
+                reels[reel_size].append(feeder_id)
+            else:
+                logger.warning(f"Unknown reel size {reel_size} for feeder {feeder_id}")
+
+        # Feeders numerically within each reel size
+        self.limited = tuple(sorted(limited, key=int))
+        self.reels = {size: tuple(sorted(feeders, key=int)) for size, feeders in reels.items()}
+        self.bit_of = {size: {feeder: 1 << i for i, feeder in enumerate(feeders)}
+                       for size, feeders in self.reels.items()}
+        self.full_bits = {size: (1 << len(feeders)) - 1 for size, feeders in self.reels.items()}
+        # Reel feeders that carry reel or nozzle restrictions but no limit
+        self.restricted_bits = {size: sum(bit for feeder, bit in bits.items()
+                                          if feeder in self.constraints.column_of)
+                                for size, bits in self.bit_of.items()}
+
+    def state(self) -> Dict:
+        """Plain-data snapshot of the layout, stored in the machine profile"""
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'constraints'}
+
+    @staticmethod
+    def state_from_json(state: Dict) -> Dict:
+        """Undo the list conversion of a state() read back from JSON"""
+        state = dict(state)
+        state['reel_sizes'] = frozenset(state['reel_sizes'])
+        state['reels'] = {size: tuple(feeders) for size, feeders in state['reels'].items()}
+        state['limited'] = tuple(state['limited'])
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict, constraints: FeederConstraints) -> 'FeederPool':
+        """Rebuild a pool from state() without re-reading the template"""
+        pool = cls.__new__(cls)
+        for name, value in state.items():
+            setattr(pool, name, value)
+        pool.constraints = constraints
+        return pool
+
+    def fresh_state(self) -> 'FeederAvailability':
+        return FeederAvailability(self)
+
+    def feeders_in(self, reel: str, bits: int) -> List[str]:
+        """Feeder IDs of a reel width whose bits are set, in feeder order"""
+        return [feeder for i, feeder in enumerate(self.reels.get(reel, ())) if bits >> i & 1]
+
+    def first_feeder(self, reel: str, bits: int) -> Optional[str]:
+        """Lowest-numbered feeder of a reel width whose bit is set"""
+        if not bits:
+            return None
+        return self.reels[reel][(bits & -bits).bit_length() - 1]
+
+    def admissibility(self, groups: List[Dict]) -> List['GroupAdmissibility']:
+        """Evaluate all component groups against the constraint table at once"""
+        if not groups:
+            return []
+        matrix = self.constraints.admissible([group['count'] for group in groups],
+                                             [str(group.get('Reel')) for group in groups])
+        column_of = self.constraints.column_of
+        result = []
+        for row in matrix:
+            limited = tuple(f for f in self.limited if row[column_of[f]])
+            blocked = {size: sum(self.bit_of[size][f] for f in self.feeders_in(size, bits)
+                                 if not row[column_of[f]])
+                       for size, bits in self.restricted_bits.items() if bits}
+            result.append(GroupAdmissibility(limited, blocked))
+        return result
+
+    def template_slots(self, template: pd.DataFrame) -> 'TemplateSlots':
+        """Vacant feeder rows of a template copy as bitsets"""
+        vacant_bits = {size: 0 for size in self.reels}
+        rows = {}
+        limited_rows = {}
+        vacant = template[template['Footprint'] == '-']
+        for row_index, reel, feeder_id in zip(vacant.index, vacant['Reel'], vacant['Feeder ID']):
+            reel, feeder_id = str(reel), str(feeder_id)
+            if feeder_id in self.limited:
+                limited_rows.setdefault(feeder_id, row_index)
+                continue
+            bit = self.bit_of.get(reel, {}).get(feeder_id)
+            if bit is not None and (reel, feeder_id) not in rows:
+                vacant_bits[reel] |= bit
+                rows[(reel, feeder_id)] = row_index
+        return TemplateSlots(vacant_bits, rows, limited_rows)
+
+
+class GroupAdmissibility:
+    """Constraint-table verdict for one component group"""
+    __slots__ = ('limited', 'blocked_bits')
+
+    def __init__(self, limited: Tuple[str, ...], blocked_bits: Dict[str, int]):
+        self.limited = limited  # limited feeders that accept the group
+        self.blocked_bits = blocked_bits  # restricted reel feeders that reject it
+
+    def usable(self, reel: str, bits: int) -> int:
+        return bits & ~self.blocked_bits.get(reel, 0)
+
+
+class FeederAvailability:
+    """Copy-on-write feeder availability for one placement attempt"""
+    __slots__ = ('pool', 'bits', '_owned')
+
+    def __init__(self, pool: FeederPool):
+        self.pool = pool
+        self.bits = pool.full_bits  # shared until the first take()
+        self._owned = False
+
+    def take(self, reel: str, feeder_id: str) -> None:
+        if not self._owned:
+            self.bits = dict(self.bits)
+            self._owned = True
+        self.bits[reel] &= ~self.pool.bit_of[reel][feeder_id]
+
+    def as_lists(self) -> Dict[str, List[str]]:
+        return {reel: self.pool.feeders_in(reel, bits) for reel, bits in self.bits.items()}
+
+
+class TemplateSlots:
+    """Vacant feeder rows of one template, updated as components are merged in"""
+    __slots__ = ('vacant_bits', 'rows', 'limited_rows')
+
+    def __init__(self, vacant_bits: Dict[str, int], rows: Dict[Tuple[str, str], int],
+                 limited_rows: Dict[str, int]):
+        self.vacant_bits = vacant_bits
+        self.rows = rows
+        self.limited_rows = limited_rows  # vacant limited feeder -> template row
+
+    def fill(self, pool: FeederPool, reel: str, feeder_id: str) -> None:
+        self.vacant_bits[reel] &= ~pool.bit_of[reel][feeder_id]
+
+# ---- Feeder Allocation ----
+class MinCostFlow:
+    """
+    Small min-cost flow solver (successive shortest paths, Bellman-Ford/SPFA).
+
+    Edge costs may be negative; augmentation stops as soon as the cheapest
+    source-sink path no longer lowers the total cost, so the result is the
+    minimum-cost flow of any size rather than a maximum flow.
+    """
+    def __init__(self, num_nodes: int):
+        self.num_nodes = num_nodes
+        self.graph = [[] for _ in range(num_nodes)]
+        # Parallel edge arrays: head, residual capacity, cost
+        self.to: List[int] = []
+        self.cap: List[int] = []
+        self.cost: List[float] = []
+
+    def add_edge(self, u: int, v: int, capacity: int, cost: float) -> int:
+        """Add an edge and its residual twin, returning the forward edge id"""
+        self.graph[u].append(len(self.to))
+        self.to.append(v); self.cap.append(capacity); self.cost.append(cost)
+        self.graph[v].append(len(self.to))
+        self.to.append(u); self.cap.append(0); self.cost.append(-cost)
+        return len(self.to) - 2
+
+    def flow(self, edge_id: int) -> int:
+        return self.cap[edge_id ^ 1]
+
+    def solve(self, source: int, sink: int, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Run the solver
+
+        Returns:
+            Total cost, or None if the deadline passed first
+        """
+        total_cost = 0.0
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            dist = [math.inf] * self.num_nodes
+            in_queue = [False] * self.num_nodes
+            prev_edge = [-1] * self.num_nodes
+            dist[source] = 0.0
+            queue = [source]
+            head = 0
+            while head < len(queue):
+                u = queue[head]
+                head += 1
+                in_queue[u] = False
+                for e in self.graph[u]:
+                    if self.cap[e] > 0 and dist[u] + self.cost[e] < dist[self.to[e]] - 1e-9:
+                        v = self.to[e]
+                        dist[v] = dist[u] + self.cost[e]
+                        prev_edge[v] = e
+                        if not in_queue[v]:
+                            in_queue[v] = True
+                            queue.append(v)
+            if dist[sink] == math.inf or dist[sink] >= 0:
+                return total_cost
+
+            # Unit capacities on the group side, so push one unit per path
+            v = sink
+            while v != source:
+                e = prev_edge[v]
+                self.cap[e] -= 1
+                self.cap[e ^ 1] += 1
+                v = self.to[e ^ 1]
+            total_cost += dist[sink]
+
+
+class FeederAllocationSolver:
+    """
+    Global feeder allocation for PCR_File_Splitter as a min-cost flow.
+
+    Component groups are assigned to feeder classes (template, reel width),
+    plus each limited feeder per template, whose capacities are the vacant
+    feeders in each template. Edge costs are lexicographic: every
+    machine-placed part outweighs any template usage, each part loaded from
+    template b costs more than any reel choice, and oversized reels cost a
+    little more than the exact width.
+    Specific feeders are handed out afterwards in feeder order.
+    """
+    PART_WEIGHT = 1_000_000_000
+    TEMPLATE_WEIGHT = 1_000
+    REEL_STEP_WEIGHT = 1
+
+    def __init__(self, pool: 'FeederPool', slots: Dict[str, 'TemplateSlots'],
+                 reel_progression: Callable[[str], List[str]], logger: logging.Logger):
+        self.pool = pool
+        self.slots = slots
+        self.reel_progression = reel_progression
+        self.logger = logger
+
+    @staticmethod
+    def feeder_class(feeder_id: str) -> str:
+        """Class name of a single constrained feeder"""
+        return f"feeder {feeder_id}"
+
+    def _group_classes(self, group: Dict, admissibility: 'GroupAdmissibility') -> List[Tuple[str, str, int]]:
+        """Feeder classes (suffix, reel, cost) a group may use"""
+        classes = []
+        reel = str(group['Reel'])
+        count = group['count']
+        for rank, suffix in enumerate(self.slots):
+            template_cost = rank * count * self.TEMPLATE_WEIGHT
+            for feeder_id in admissibility.limited:
+                classes.append((suffix, self.feeder_class(feeder_id), template_cost))
+            for step, candidate in enumerate(self.reel_progression(reel)):
+                cost = template_cost + step * self.REEL_STEP_WEIGHT
+                classes.append((suffix, candidate, cost))
+                # Restricted feeders of this width are single-feeder classes
+                restricted = admissibility.usable(candidate, self.pool.restricted_bits.get(candidate, 0))
+                for feeder_id in self.pool.feeders_in(candidate, restricted):
+                    classes.append((suffix, self.feeder_class(feeder_id), cost))
+        return classes
+
+    def _class_capacity(self, suffix: str, reel: str) -> int:
+        template_slots = self.slots[suffix]
+        if reel.startswith('feeder '):
+            feeder_id = reel[len('feeder '):]
+            if feeder_id in self.pool.limited:
+                return int(feeder_id in template_slots.limited_rows)
+            size = self.pool.reel_of[feeder_id]
+            return int(bool(template_slots.vacant_bits.get(size, 0) & self.pool.bit_of[size][feeder_id]))
+        free = (self.pool.full_bits.get(reel, 0) & template_slots.vacant_bits.get(reel, 0)
+                & ~self.pool.restricted_bits.get(reel, 0))
+        return bin(free).count('1')
+
+    def solve(self, groups: List[Dict], time_budget: float) -> Optional[Dict[int, Tuple[str, str]]]:
+        """
+        Allocate groups to feeder classes
+
+        Args:
+            groups: Placeable component groups (with 'Reel' and 'count')
+            time_budget: Seconds allowed before giving up
+
+        Returns:
+            {group index: (template suffix, reel class)} for placed groups,
+            or None if the time budget ran out
+        """
+        deadline = time.monotonic() + time_budget
+        class_nodes = {}
+        group_edges = []
+
+        # Nodes: 0 source, 1 sink, then groups, then feeder classes
+        per_group_classes = [self._group_classes(group, admissibility) for group, admissibility
+                             in zip(groups, self.pool.admissibility(groups))]
+        for classes in per_group_classes:
+            for suffix, reel, _ in classes:
+                class_nodes.setdefault((suffix, reel), None)
+        first_class = 2 + len(groups)
+        for offset, key in enumerate(class_nodes):
+            class_nodes[key] = first_class + offset
+
+        mcf = MinCostFlow(first_class + len(class_nodes))
+        for i, (group, classes) in enumerate(zip(groups, per_group_classes)):
+            node = 2 + i
+            mcf.add_edge(0, node, 1, 0)
+            for suffix, reel, cost in classes:
+                edge = mcf.add_edge(node, class_nodes[(suffix, reel)], 1,
+                                    cost - group['count'] * self.PART_WEIGHT)
+                group_edges.append((i, suffix, reel, edge))
+        for (suffix, reel), node in class_nodes.items():
+            capacity = self._class_capacity(suffix, reel)
+            if capacity:
+                mcf.add_edge(node, 1, capacity, 0)
+
+        if mcf.solve(0, 1, deadline) is None:
+            self.logger.warning(f"Feeder allocation solver exceeded {time_budget:.1f}s budget")
+            return None
+
+        return {i: (suffix, reel) for i, suffix, reel, edge in group_edges if mcf.flow(edge)}
+
+# ---- Machine Profile ----
+class MachineProfile:
+    """
+    Compiled machine knowledge shared by PCBDataProcessor and PCR_File_Splitter.
+
+    compile() validates Neoden4.csv, Neoden4_Nozzles.csv, Component_Table.csv
+    and the optional feeder constraint table together and prebuilds the
+    indexes the processors need: feeder slots, nozzle rotation masks and
+    footprint parameter rows. save()/load() keep it as one versioned file of
+    data only (an .npz archive of column arrays plus JSON, never a pickle);
+    load_or_compile() recompiles whenever a source file has changed.
+    """
+    SOURCES = {
+        'template': "Neoden4.csv",
+        'nozzles': "Neoden4_Nozzles.csv",
+        'components': "Component_Table.csv",
+        'constraints': FEEDER_CONSTRAINTS_FILE,
+    }
+    TEMPLATE_COLUMNS = ['Reel', '#Feeder', 'Feeder ID', 'Nozzle', 'Footprint', 'Value']
+    COMPONENT_COLUMNS = ['Reel', 'Footprint']
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+        self.sources = payload['sources']
+        self.neoden4_df = payload['neoden4_df']
+        self.component_table_df = payload['component_table_df']
+        self.reel_sizes = set(payload['reel_sizes'])
+        self.nozzle_rotations = payload['nozzle_rotations']
+        self.rotation_masks = payload['rotation_masks']
+        self.footprint_rows = payload['footprint_rows']
+        self.warnings = payload['warnings']
+        self.constraints = FeederConstraints(payload['constraint_records'])
+        self.feeder_pool = FeederPool.from_state(payload['feeder_pool'], self.constraints)
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the machine file contents this profile was compiled from"""
+        digests = sorted((name, source['sha1'] or '') for name, source in self.sources.items())
+        return hashlib.sha1(repr(digests).encode()).hexdigest()
+
+    @staticmethod
+    def source_paths(pcr_dir: str, **overrides) -> Dict[str, str]:
+        """Source file paths in a pcr_files directory, with per-file overrides"""
+        paths = {name: os.path.join(pcr_dir, filename) for name, filename in MachineProfile.SOURCES.items()}
+        paths.update({name: path for name, path in overrides.items() if path})
+        return {name: os.path.abspath(path) for name, path in paths.items()}
+
+    @staticmethod
+    def resolve_path(pcr_dir: str, config: Optional[Dict] = None) -> str:
+        """
+        Location of the compiled profile
+
+        NEODEN4_MACHINE_PROFILE wins, then 'machine_profile' in the
+        configuration (relative to the pcr_files directory), then the
+        default file name in the pcr_files directory.
+        """
+        path = os.environ.get('NEODEN4_MACHINE_PROFILE') or (config or {}).get('machine_profile')
+        if not path:
+            return os.path.join(pcr_dir, MACHINE_PROFILE_FILE)
+        return path if os.path.isabs(path) else os.path.join(pcr_dir, path)
+
+    @staticmethod
+    def _fingerprint(paths: Dict[str, str]) -> Dict[str, Optional[str]]:
+        fingerprint = {}
+        for name, path in paths.items():
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    fingerprint[name] = hashlib.sha1(f.read()).hexdigest()
+            else:
+                fingerprint[name] = None
+        return fingerprint
+
+    @classmethod
+    def compile(cls, paths: Dict[str, str], logger: logging.Logger) -> 'MachineProfile':
+        """
+        Validate the machine files together and build the profile
+
+        Raises:
+            PCBProcessingError: if the files are missing or inconsistent
+        """
+        errors = []
+        warnings = []
+        for name in ('template', 'nozzles', 'components'):
+            if not os.path.exists(paths[name]):
+                errors.append(f"Missing {cls.SOURCES[name]} at {paths[name]}")
+        if errors:
+            raise PCBProcessingError("Invalid machine profile:\n" + "\n".join(errors))
+
+        neoden4_df = pd.read_csv(paths['template'])
+        component_table_df = pd.read_csv(paths['components'])
+        nozzle_config_df = pd.read_csv(paths['nozzles'])
+
+        for name, df, columns in [('template', neoden4_df, cls.TEMPLATE_COLUMNS),
+                                  ('components', component_table_df, cls.COMPONENT_COLUMNS),
+                                  ('nozzles', nozzle_config_df, ['Nozzle', 'Rotation'])]:
+            missing = [column for column in columns if column not in df.columns]
+            if missing:
+                errors.append(f"{cls.SOURCES[name]} is missing columns {missing}")
+        if errors:
+            raise PCBProcessingError("Invalid machine profile:\n" + "\n".join(errors))
+
+        # Nozzle rotations and, per distinct angle, the mask of nozzles that reach it
+        nozzle_rotations = {}
+        for nozzle, rotation in zip(nozzle_config_df['Nozzle'], nozzle_config_df['Rotation']):
+            try:
+                nozzle_rotations[str(nozzle)] = [float(angle.strip()) for angle in str(rotation).split(',')]
+            except ValueError:
+                errors.append(f"Bad rotation list for nozzle {nozzle}: {rotation}")
+        rotation_masks = {}
+        for nozzle, rotations in nozzle_rotations.items():
+            for angle in rotations:
+                # Same [-180, 180] normalization as PCBDataProcessor._normalize_angle
+                angle = angle % 360
+                if angle > 180:
+                    angle -= 360
+                rotation_masks[angle] = rotation_masks.get(angle, 0) | FeederConstraints.nozzle_mask(nozzle)
+
+        # Feeder slots
+        stack = neoden4_df[neoden4_df['#Feeder'] == 'stack']
+        feeder_ids = [str(feeder_id) for feeder_id in stack['Feeder ID']]
+        duplicates = sorted({f for f in feeder_ids if feeder_ids.count(f) > 1}, key=str)
+        if duplicates:
+            errors.append(f"Duplicate stack feeders in Neoden4.csv: {duplicates}")
+        for feeder_id, reel, nozzle in zip(feeder_ids, stack['Reel'], stack['Nozzle']):
+            if not feeder_id.isdigit() or not str(reel).isdigit():
+                errors.append(f"Feeder {feeder_id} has a non-numeric ID or reel width ({reel})")
+            unknown = [n for n in str(nozzle) if n not in nozzle_rotations]
+            if unknown:
+                errors.append(f"Feeder {feeder_id} uses nozzles {unknown} not in Neoden4_Nozzles.csv")
+
+        # Footprint parameters: first Component_Table row per footprint wins
+        footprint_rows = {}
+        for position, footprint in enumerate(component_table_df['Footprint']):
+            if footprint in footprint_rows:
+                warnings.append(f"Duplicate footprint {footprint} in Component_Table.csv, using the first row")
+            else:
+                footprint_rows[footprint] = position
+        component_reels = set(str(size) for size in component_table_df['Reel'].unique())
+        template_reels = set(str(size) for size in neoden4_df['Reel'].unique() if str(size).isdigit())
+        for reel in sorted(component_reels - template_reels, key=lambda r: (not r.isdigit(), r)):
+            warnings.append(f"Component_Table.csv uses reel width {reel} with no matching feeder")
+
+        constraints = FeederConstraints.from_file(paths['constraints'], logger)
+        missing_feeders = [f for f in constraints.feeder_ids if f not in feeder_ids]
+        if missing_feeders:
+            errors.append(f"Feeder constraints name feeders not in Neoden4.csv: {missing_feeders}")
+
+        if errors:
+            raise PCBProcessingError("Invalid machine profile:\n" + "\n".join(errors))
+        for warning in warnings:
+            logger.warning(warning)
+
+        reel_sizes = component_reels | template_reels
+        pool = FeederPool(neoden4_df, reel_sizes, logger, constraints)
+        constraint_records = [{'Feeder ID': f,
+                               'Max Placements': constraints.limits.get(f, ''),
+                               'Reel Widths': ','.join(sorted(constraints.reel_widths.get(f, ()))),
+                               'Nozzles': constraints.nozzles.get(f, '')}
+                              for f in constraints.feeder_ids]
+        logger.info(f"Compiled machine profile: {len(feeder_ids)} feeders, "
+                    f"{len(nozzle_rotations)} nozzles, {len(footprint_rows)} footprints")
+        return cls({
+            'version': MACHINE_PROFILE_VERSION,
+            'compiled': datetime.now().isoformat(timespec='seconds'),
+            'sources': {name: {'path': path, 'sha1': sha1}
+                        for (name, path), sha1 in zip(paths.items(), cls._fingerprint(paths).values())},
+            'neoden4_df': neoden4_df,
+            'component_table_df': component_table_df,
+            'reel_sizes': sorted(reel_sizes),
+            'nozzle_rotations': nozzle_rotations,
+            'rotation_masks': rotation_masks,
+            'footprint_rows': footprint_rows,
+            'constraint_records': constraint_records,
+            'feeder_pool': pool.state(),
+            'warnings': warnings,
+        })
+
+    # Payload entries stored as column arrays; everything else goes into the JSON part
+    FRAMES = ('neoden4_df', 'component_table_df')
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    @classmethod
+    def _frame_arrays(cls, name: str, df: pd.DataFrame, arrays: Dict[str, np.ndarray]) -> List[Dict]:
+        """Add a DataFrame's columns to arrays; returns its column list for the JSON part"""
+        columns = []
+        for i, column in enumerate(df.columns):
+            values = df[column]
+            key = f"{name}/{i}"
+            if values.dtype == object:
+                # Text columns as fixed-width strings with a missing-value mask
+                missing = values.isna().to_numpy()
+                arrays[key] = np.array(['' if m else str(v) for v, m in zip(values, missing)], dtype=str)
+                arrays[f"{key}/na"] = missing
+                columns.append({'name': column, 'text': True})
+            else:
+                arrays[key] = values.to_numpy()
+                columns.append({'name': column, 'text': False})
+        return columns
+
+    @staticmethod
+    def _frame_from_arrays(name: str, columns: List[Dict], archive) -> pd.DataFrame:
+        data = {}
+        for i, column in enumerate(columns):
+            values = archive[f"{name}/{i}"]
+            if column['text']:
+                values = values.astype(object)
+                values[archive[f"{name}/{i}/na"]] = np.nan
+            data[column['name']] = values
+        return pd.DataFrame(data, columns=[column['name'] for column in columns])
+
+    def save(self, profile_path: str) -> None:
+        """Write the profile atomically"""
+        arrays = {}
+        document = {key: value for key, value in self.payload.items() if key not in self.FRAMES}
+        document['frames'] = {name: self._frame_arrays(name, self.payload[name], arrays)
+                              for name in self.FRAMES}
+        # Keys that JSON objects cannot hold are kept as pairs
+        document['rotation_masks'] = list(self.payload['rotation_masks'].items())
+        document['footprint_rows'] = list(self.payload['footprint_rows'].items())
+        arrays['document'] = np.frombuffer(json.dumps(document, default=self._json_default).encode('utf-8'),
+                                           dtype=np.uint8)
+        temp_path = f"{profile_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(MACHINE_PROFILE_MAGIC + MACHINE_PROFILE_VERSION.to_bytes(2, 'big'))
+            np.savez(f, **arrays)
+        os.replace(temp_path, profile_path)
+
+    @classmethod
+    def load(cls, profile_path: str) -> Optional['MachineProfile']:
+        """Read a compiled profile; None if absent or from another format version"""
+        if not os.path.exists(profile_path):
+            return None
+        with open(profile_path, 'rb') as f:
+            header = f.read(len(MACHINE_PROFILE_MAGIC) + 2)
+            if (header[:len(MACHINE_PROFILE_MAGIC)] != MACHINE_PROFILE_MAGIC or
+                    int.from_bytes(header[len(MACHINE_PROFILE_MAGIC):], 'big') != MACHINE_PROFILE_VERSION):
+                return None
+            data = f.read()
+        with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+            payload = json.loads(archive['document'].tobytes().decode('utf-8'))
+            for name, columns in payload.pop('frames').items():
+                payload[name] = cls._frame_from_arrays(name, columns, archive)
+        payload['rotation_masks'] = {float(angle): mask for angle, mask in payload['rotation_masks']}
+        payload['footprint_rows'] = {footprint: position for footprint, position in payload['footprint_rows']}
+        payload['feeder_pool'] = FeederPool.state_from_json(payload['feeder_pool'])
+        return cls(payload)
+
+    def is_current(self, paths: Dict[str, str]) -> bool:
+        """True if the profile was compiled from exactly these source files"""
+        stored = {name: (source['path'], source['sha1']) for name, source in self.sources.items()}
+        current = {name: (path, sha1) for (name, path), sha1
+                   in zip(paths.items(), self._fingerprint(paths).values())}
+        return stored == current
+
+    @classmethod
+    def load_or_compile(cls, paths: Dict[str, str], profile_path: str,
+                        logger: logging.Logger) -> 'MachineProfile':
+        """Load the compiled profile, recompiling and saving it when stale"""
+        try:
+            profile = cls.load(profile_path)
+        except Exception as e:
+            logger.warning(f"Could not read machine profile {profile_path}: {str(e)}")
+            profile = None
+        if profile is not None and profile.is_current(paths):
+            logger.info(f"Loaded machine profile {profile_path}")
+            return profile
+
+        profile = cls.compile(paths, logger)
+        try:
+            profile.save(profile_path)
+            logger.info(f"Saved machine profile {profile_path}")
+        except OSError as e:
+            logger.warning(f"Could not save machine profile {profile_path}: {str(e)}")
+        return profile
+
+    @classmethod
+    def load_default(cls, logger: logging.Logger, config: Optional[Dict] = None) -> 'MachineProfile':
+        """Profile of the default pcr_files directory"""
+        return cls.load_or_compile(cls.source_paths(PCR_FILES_DIR),
+                                   cls.resolve_path(PCR_FILES_DIR, config), logger)
+
+    def footprint_params(self, footprint) -> Optional[pd.Series]:
+        """Component_Table row of a footprint"""
+        position = self.footprint_rows.get(footprint)
+        return None if position is None else self.component_table_df.iloc[position]
+
+    def compatible_nozzles(self, normalized_rotation: float) -> List[str]:
+        """Nozzles that can reach a normalized rotation, in Neoden4_Nozzles.csv order"""
+        mask = 0
+        for angle, nozzles in self.rotation_masks.items():
+            if abs(normalized_rotation - angle) < 0.1:
+                mask |= nozzles
+        return [nozzle for nozzle in self.nozzle_rotations
+                if FeederConstraints.nozzle_mask(nozzle) & mask]
+
+# ---- Output Staging ----
+class OutputStage:
+    """
+    Job outputs written to local temporary storage, then published together.
+
+    Writers put files into ``folder``; publish() skips every file whose
+    content already matches its destination, copies the others next to
+    their destination under unique temporary names in parallel, and only
+    then renames them all into place. A failed copy publishes nothing, and
+    a concurrent job writing the same file replaces it whole, never in part.
+
+        with OutputStage(board_dir) as stage:
+            write_n4_file(stage.path("N4_board.csv"), ...)
+        # Published on leaving the block, discarded on an exception
+    """
+    WORKERS = 4  # Parallel copies to the destination folder
+    RETRIES = 3  # Attempts per copy or rename on a flaky share
+    RETRY_DELAY = 0.5  # Seconds, doubled after each failed attempt
+
+    def __init__(self, dest_dir: str, logger: Optional[logging.Logger] = None):
+        self.dest_dir = dest_dir or '.'
+        self.logger = logger or logging.getLogger('OutputStage')
+        self.folder = tempfile.mkdtemp(prefix='n4-stage-')
+        self.published: List[str] = []
+        self.unchanged: List[str] = []
+
+    def path(self, name: str) -> str:
+        """Local path to write the output ``name`` to"""
+        return os.path.join(self.folder, os.path.basename(name))
+
+    def destination(self, path: str) -> str:
+        """Published path of a staged file"""
+        return os.path.join(self.dest_dir, os.path.basename(path))
+
+    def files(self) -> List[str]:
+        """Staged files, by name"""
+        return [os.path.join(self.folder, name) for name in sorted(os.listdir(self.folder))]
+
+    def _retry(self, action: Callable, *args):
+        delay = self.RETRY_DELAY
+        for attempt in range(1, self.RETRIES + 1):
+            try:
+                return action(*args)
+            except OSError as e:
+                if attempt == self.RETRIES:
+                    raise
+                self.logger.warning(f"{action.__name__} {os.path.basename(args[-1])} failed "
+                                    f"({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def _changed(self, staged: str) -> bool:
+        """True unless the destination already holds the staged content"""
+        dest = self.destination(staged)
+        try:
+            if os.path.getsize(dest) != os.path.getsize(staged):
+                return True
+            return JobCache.file_digest(dest) != JobCache.file_digest(staged)
+        except OSError:
+            return True
+
+    def publish(self) -> List[str]:
+        """
+        Move the changed staged files to dest_dir
+
+        Returns:
+            Destination paths that were written
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        staged = self.files()
+        if not staged:
+            return []
+        os.makedirs(self.dest_dir, exist_ok=True)
+        tag = f"{os.getpid()}.{threading.get_ident()}"
+
+        def copy(path: str) -> Optional[Tuple[str, str]]:
+            with span('publish', file=os.path.basename(path)):
+                if not self._changed(path):
+                    return None
+                temp_path = os.path.join(self.dest_dir, f".{os.path.basename(path)}.{tag}.tmp")
+                self._retry(shutil.copyfile, path, temp_path)
+                return temp_path, self.destination(path)
+
+        with span('publish outputs', files=len(staged)), \
+                ThreadPoolExecutor(max_workers=min(self.WORKERS, len(staged)),
+                                   thread_name_prefix='n4-publish') as executor:
+            futures = [executor.submit(copy, path) for path in staged]
+        copies, errors = [], []
+        for path, future in zip(staged, futures):
+            try:
+                result = future.result()
+            except OSError as e:
+                errors.append(f"{os.path.basename(path)}: {str(e)}")
+                continue
+            if result:
+                copies.append(result)
+            else:
+                self.unchanged.append(self.destination(path))
+
+        if errors:
+            for temp_path, _ in copies:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+            raise PCBProcessingError(f"Could not write outputs to {self.dest_dir}: {'; '.join(errors)}")
+
+        try:
+            for temp_path, dest in copies:
+                self._retry(os.replace, temp_path, dest)
+                self.published.append(dest)
+        except OSError as e:
+            for temp_path, _ in copies[len(self.published):]:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+            raise PCBProcessingError(f"Could not replace outputs in {self.dest_dir}: {str(e)}")
+        self.logger.info(f"Published {len(self.published)} of {len(staged)} outputs to {self.dest_dir}"
+                         f" ({len(self.unchanged)} unchanged)")
+        return self.published
+
+    def discard(self) -> None:
+        """Delete the staging folder"""
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def __enter__(self) -> 'OutputStage':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.publish()
+        finally:
+            self.discard()
+        return False
+
+# ---- Job Cache ----
+def load_job_cache_config(pcr_dir: str = PCR_FILES_DIR, config: Optional[Dict] = None) -> Dict:
+    """Job cache settings from configuration.json merged over DEFAULT_JOB_CACHE_CONFIG"""
+    cache_config = dict(DEFAULT_JOB_CACHE_CONFIG)
+    if config is None:
+        config_file = os.path.join(pcr_dir, "configuration.json")
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+    cache_config.update(config.get('job_cache', {}))
+    return cache_config
+
+
+class JobCache:
+    """
+    Content-addressed cache of generate and split outputs.
+
+    The key hashes the contents of every input file together with the
+    machine profile fingerprint and the job parameters, so any change to
+    an input misses the cache. Each entry is a folder holding copies of
+    the output files and a meta.json; its modification time is the LRU
+    clock and the oldest entries are evicted once the cache exceeds
+    max_mb.
+    """
+    META_FILE = "meta.json"
+    _digests: Dict[Tuple[str, int, int], str] = {}  # (path, size, mtime) -> sha256, shared by all caches
+    _lock = threading.Lock()
+
+    def __init__(self, folder: str, max_mb: float):
+        self.logger = logging.getLogger('JobCache')
+        self.folder = folder
+        self.max_bytes = int(float(max_mb) * 2 ** 20)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, cache_config: Dict, pcr_dir: str = PCR_FILES_DIR) -> Optional['JobCache']:
+        """Cache described by a job_cache configuration, None when disabled"""
+        if not cache_config.get('enabled', True):
+            return None
+        folder = cache_config.get('folder') or DEFAULT_JOB_CACHE_CONFIG['folder']
+        if not os.path.isabs(folder):
+            folder = os.path.join(pcr_dir, folder)
+        return cls(folder, cache_config.get('max_mb', DEFAULT_JOB_CACHE_CONFIG['max_mb']))
+
+    @classmethod
+    def file_digest(cls, path: str) -> str:
+        """sha256 of a file's contents, remembered while its size and mtime are unchanged"""
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = cls._digests.get(signature)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            if len(cls._digests) > 4096:
+                cls._digests.clear()
+            cls._digests[signature] = digest
+        return digest
+
+    def key(self, job_type: str, files: List[str], **params) -> str:
+        """Cache key of a job from its input file contents and parameters"""
+        sha = hashlib.sha256(f"{JOB_CACHE_VERSION}:{job_type}".encode())
+        for path in files:
+            sha.update(self.file_digest(path).encode())
+        sha.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return sha.hexdigest()
+
+    def restore(self, key: str, dest_dir: str) -> Optional[Dict]:
+        """
+        Copy a cached job's outputs into dest_dir
+
+        Returns:
+            The stored meta dict, or None on a miss
+        """
+        entry = os.path.join(self.folder, key)
+        meta_file = os.path.join(entry, self.META_FILE)
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            with span('cache restore', key=key[:12]), OutputStage(dest_dir, self.logger) as stage:
+                for name in meta['files']:
+                    shutil.copyfile(os.path.join(entry, name), stage.path(name))
+            os.utime(meta_file)
+        except (OSError, ValueError, KeyError, PCBProcessingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.logger.info(f"Cache hit {key[:12]}: restored {meta['files']}")
+        return meta
+
+    def store(self, key: str, files: List[str], meta: Optional[Dict] = None) -> None:
+        """Save a finished job's output files under its key, then evict down to max_mb"""
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=f".{key[:12]}.", dir=self.folder)
+            for path in files:
+                shutil.copyfile(path, os.path.join(staging, os.path.basename(path)))
+            with open(os.path.join(staging, self.META_FILE), 'w') as f:
+                json.dump(dict(meta or {}, files=[os.path.basename(path) for path in files]), f)
+            try:
+                os.rename(staging, os.path.join(self.folder, key))
+            except OSError:
+                # Another worker stored the same job first
+                shutil.rmtree(staging, ignore_errors=True)
+        except OSError as e:
+            self.logger.warning(f"Could not cache job {key[:12]}: {str(e)}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits max_mb"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.folder):
+                entry = os.path.join(self.folder, name)
+                meta_file = os.path.join(entry, self.META_FILE)
+                if name.startswith('.') or not os.path.exists(meta_file):
+                    continue
+                size = sum(entry_file.stat().st_size for entry_file in os.scandir(entry))
+                entries.append((os.path.getmtime(meta_file), size, entry))
+                total += size
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                self.logger.info(f"Evicted cache entry {os.path.basename(entry)[:12]}")
+
+# ---- N4 File Writer ----
+def _csv_cells(values, fmt: Optional[str] = None) -> np.ndarray:
+    """
+    One column as CSV cell strings, missing values empty
+
+    Numbers are written like DataFrame.to_csv unless ``fmt`` fixes their precision.
+    """
+    values = np.asarray(values)
+    missing = pd.isna(values)
+    if fmt is not None and values.dtype.kind in 'fiu':
+        cells = np.array([fmt % value for value in np.where(missing, 0, values).tolist()], dtype=object)
+    elif values.dtype == object:
+        cells = values.copy()
+        strings = ~missing
+        cells[strings] = [value if type(value) is str else str(value) for value in values[strings]]
+    else:
+        cells = values.astype(str).astype(object)
+    cells[missing] = ''
+    return cells
+
+
+def write_csv_rows(output_path: str, header: List[str], blocks: List[Tuple[pd.DataFrame, List[str], Dict[str, str]]]) -> int:
+    """
+    Stream row blocks of DataFrames into one CSV file without merging them
+
+    Each block is (frame, columns, formats): the named columns of the frame
+    fill the leading cells of every row in that order, missing columns and
+    the rest of the header stay empty.
+
+    Args:
+        output_path: CSV file to write
+        header: Column names of the file
+        blocks: Row blocks in file order
+
+    Returns:
+        Number of rows written, without the header
+    """
+    rows = 0
+    with span('write', file=os.path.basename(output_path)) as info, \
+            open(output_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        csv.writer(f, lineterminator=os.linesep).writerow(header)
+        for frame, columns, formats in blocks:
+            if frame.empty:
+                continue
+            blank = np.full(len(frame), '', dtype=object)
+            cells = [_csv_cells(frame[column].to_numpy(), formats.get(column)) if column in frame.columns else blank
+                     for column in columns[:len(header)]]
+            # The empty trailing cells are the same on every row: end each row with them
+            padding = ',' * (len(header) - len(cells))
+            csv.writer(f, lineterminator=padding + os.linesep).writerows(zip(*cells))
+            rows += len(frame)
+        info['rows_out'] = rows
+    return rows
+
+
+def write_n4_file(output_path: str, template_df: pd.DataFrame, component_df: pd.DataFrame) -> int:
+    """
+    Write a Neoden4 machine file: the template rows as read, then the component rows
+
+    Component rows use the fixed N4_COMP_COLUMNS layout with fixed-precision
+    coordinates and rotations (N4_COMP_FORMATS).
+
+    Returns:
+        Number of component rows written
+    """
+    header = [str(column) for column in template_df.columns]
+    write_csv_rows(output_path, header, [(template_df, header, {}),
+                                         (component_df, N4_COMP_COLUMNS, N4_COMP_FORMATS)])
+    return len(component_df)
+
+# ---- Data Processing Class ----
+@dataclass
+class PreparedBoard:
+    """
+    Sort-independent state of one generate_csv input: read, side-processed,
+    fiducial-fitted and transformed components. Re-sorting only reruns
+    PCBDataProcessor.generate_prepared on it.
+    """
+    key: Tuple
+    pcb_file: str
+    n4_df: pd.DataFrame
+    components: pd.DataFrame
+    fiducial_info: Dict
+    requested_width: float
+    pcb_width: float
+    processed: Optional[pd.DataFrame] = None  # Placement rows of the last generated order
+    output_file: Optional[str] = None  # N4 file written for that order
+
+    @staticmethod
+    def signature(pcb_file: str, template_file: str, sort_config: Dict) -> Tuple:
+        """Everything the prepared state depends on: input files, width, side and panel gap"""
+        files = []
+        for path in (pcb_file.strip(), template_file.strip()):
+            stat = os.stat(path)
+            files.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+        return (tuple(files), str(sort_config.get('side')),
+                float(sort_config.get('board_gap', DEFAULT_BOARD_GAP) or 0))
+
+    def matches(self, pcb_file: str, template_file: str, pcb_width: float, sort_config: Dict) -> bool:
+        """True if these inputs would prepare the same board"""
+        try:
+            if self.signature(pcb_file, template_file, sort_config) != self.key:
+                return False
+        except OSError:
+            return False
+        # A width entry of 0 (or the width calculated from it) reuses the calculated width
+        return pcb_width in (self.requested_width, self.pcb_width)
+
+
+class PCBDataProcessor:
+    def __init__(self, profile: Optional[MachineProfile] = None, use_cache: bool = True):
+        """
+        Initialize the PCB data processor
+
+        Args:
+            profile: Compiled machine profile; the default pcr_files
+                profile is loaded (and compiled if stale) when omitted
+            use_cache: Reuse outputs of identical generate jobs from the
+                job cache (when enabled in configuration.json)
+        """
+        self.logger = logging.getLogger('PCBDataProcessor')
+        self.logger.info("PCBDataProcessor initialized")
+        self.profile = profile
+        self.nozzle_rotations = self._initialize_nozzle_rotations()
+        self.feeder_constraints = self.profile.constraints
+        self.job_cache = JobCache.from_config(load_job_cache_config()) if use_cache else None
+        self.unmatched_file = None
+        # Board prepared by the last generate_csv run, None after a job cache hit
+        self.last_board = None
+        
+    def _initialize_nozzle_rotations(self) -> Dict[str, List[float]]:
+        """Initialize nozzle rotation capabilities from the machine profile"""
+        try:
+            if self.profile is None:
+                self.profile = MachineProfile.load_default(self.logger)
+            nozzle_rotations = self.profile.nozzle_rotations
+            self.logger.info(f"Loaded nozzle rotations: {nozzle_rotations}")
+            return nozzle_rotations
+        except Exception as e:
+            self.logger.error(f"Error loading nozzle rotations: {str(e)}")
+            raise PCBProcessingError(f"Failed to load nozzle configuration: {str(e)}")
+
+    def _normalize_angle(self, angle: float) -> float:
+        """Normalize angle to range [-180, 180]"""
+        angle = angle % 360
+        if angle > 180:
+            angle -= 360
+        return angle
+
+    def _get_compatible_nozzles(self, component_rotation: float) -> List[str]:
+        """Get list of nozzles compatible with the required rotation"""
+        normalized_rotation = self._normalize_angle(component_rotation)
+        compatible_nozzles = self.profile.compatible_nozzles(normalized_rotation)
+        
+        self.logger.debug(f"Compatible nozzles for rotation {component_rotation}: {compatible_nozzles}")
+        return compatible_nozzles
+
+    def create_component_key(self,pcr_row: pd.Series) -> str:
+        """
+        Create a consistent component key for matching between PCR and template
+        
+        Args:
+            pcr_row: Row from PCR file containing component info
+            
+        Returns:
+            String key in format "FOOTPRINT/VALUE"
+            
+        Example:
+            Input PCR row:
+            - SYM_NAME: CAP0603
+            - COMP_VALUE: 0.1UF
+            Returns: "CAP0603/0.1UF"
+        """
+        try:
+            footprint = str(pcr_row['SYM_NAME']).strip()
+            value = str(pcr_row['COMP_VALUE']).strip()
+            
+            # Create combined key
+            key = f"{footprint}/{value}"
+            return key
+            
+        except Exception as e:
+            logging.error(f"Error creating component key: {str(e)}")
+            return ""
+
+    def nozzle_feeder_assignment(self, pcr_path: str, pcb_df: pd.DataFrame, n4_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Assign nozzles and feeders to components based on rotation capabilities
+        """
+        try:
+            self.logger.info("Starting nozzle and feeder assignment with rotation checking")
+            
+            # Create mapping of value to feeder information
+            n4_map = {}
+            for _, row in n4_df.iterrows():
+                if row['#Feeder'] != 'stack':
+                    continue
+                    
+                value = str(row['Value']).strip()
+                key = value
+                feeder_id = str(row['Feeder ID'])
+                
+                # Get list of available nozzles for this feeder
+                # Handle single and multi-digit nozzle numbers
+                nozzle_str = str(row['Nozzle'])
+                if len(nozzle_str) == 1:
+                    available_nozzles = [nozzle_str]
+                else:
+                    available_nozzles = [n for n in nozzle_str]
+                
+                # Nozzles the constraint table allows on this feeder
+                available_nozzles = self.feeder_constraints.allowed_nozzles(feeder_id, available_nozzles)
+                
+                if key not in n4_map:
+                    n4_map[key] = {
+                        '#Feeder': feeder_id,
+                        'Reel': str(row['Reel']) if 'Reel' in row else None,
+                        'Available_Nozzles': available_nozzles
+                    }
+                print("nozzle_str",nozzle_str)
+            # Track feeder and nozzle usage
+            feeder_nozzle_assignment = defaultdict(list)
+            nozzle_usage = defaultdict(Counter)
+            compatible_by_rotation = {}
+            feeder_component_counts = defaultdict(int)
+            unmatched_rows = []
+
+            # Resolve each footprint/value group to its template key once
+            table = ComponentTable.from_dataframe(pcb_df)
+            group_keys = []
+            for group_id in range(table.num_groups):
+                sym_name, comp_value = table.group_key(group_id)
+                group_keys.append(f"{str(sym_name).strip()}/{str(comp_value).strip()}")
+
+            # First pass: Count components per feeder for the capacity check
+            for group_id, count in enumerate(table.group_counts()):
+                if group_keys[group_id] in n4_map:
+                    feeder_id = n4_map[group_keys[group_id]]['#Feeder']
+                    feeder_component_counts[feeder_id] += int(count)
+
+            # Check all constrained feeders against the constraint table at once
+            constraints = self.feeder_constraints
+            loaded = [(entry['#Feeder'], entry['Reel'], entry['Available_Nozzles'])
+                      for entry in n4_map.values() if entry['#Feeder'] in constraints.column_of]
+            rejected_feeders = set()
+            if loaded:
+                # Generated templates may no longer carry the Reel column
+                reels = [reel for _, reel, _ in loaded]
+                verdict = constraints.admissible(
+                    [feeder_component_counts[feeder_id] for feeder_id, _, _ in loaded],
+                    None if None in reels else reels,
+                    [constraints.nozzle_mask(''.join(nozzles)) for _, _, nozzles in loaded])
+                for (feeder_id, _, _), row in zip(loaded, verdict):
+                    if not row[constraints.column_of[feeder_id]]:
+                        rejected_feeders.add(feeder_id)
+
+            # Assignments are collected per row position and written column-wise afterwards
+            feeder_column = pcb_df['Feeder ID'].to_numpy(dtype=object).copy()
+            nozzle_column = pcb_df['Nozzle'].to_numpy(dtype=object).copy()
+
+            # Process each component
+            for comp in table:
+                combined_value = group_keys[table.group_ids[comp.position]]
+                rotation = comp.rotation
+                
+                self.logger.debug(f"Processing component: {comp.refdes}, "
+                                f"Value: {combined_value}, Rotation: {rotation}")
+                
+                if combined_value in n4_map:
+                    feeder_id = n4_map[combined_value]['#Feeder']
+                    
+                    # Check the feeder's capacity constraints
+                    if feeder_id in rejected_feeders:
+                        self.logger.warning(
+                            f"Feeder {feeder_id} component count ({feeder_component_counts[feeder_id]}) "
+                            f"violates its constraints (max {constraints.limits.get(feeder_id, 'unlimited')})"
+                        )
+                        unmatched_rows.append(comp.position)
+                        continue
+                    
+                    # Get available nozzles for this feeder
+                    available_nozzles = n4_map[combined_value]['Available_Nozzles']
+                    
+                    # Get compatible nozzles for the required rotation (few distinct rotations per board)
+                    compatible_nozzles = compatible_by_rotation.get(rotation)
+                    if compatible_nozzles is None:
+                        compatible_nozzles = self._get_compatible_nozzles(rotation)
+                        compatible_by_rotation[rotation] = compatible_nozzles
+                    
+                    # Find intersection of available and compatible nozzles
+                    valid_nozzles = [n for n in available_nozzles if n in compatible_nozzles]
+                    
+                    self.logger.debug(f"Component {comp.refdes}: "
+                                    f"Available nozzles: {available_nozzles}, "
+                                    f"Compatible nozzles: {compatible_nozzles}, "
+                                    f"Valid nozzles: {valid_nozzles}")
+                    
+                    if valid_nozzles:
+                        # Choose the least used compatible nozzle
+                        nozzle_counts = {n: nozzle_usage[feeder_id][n] for n in valid_nozzles}
+                        chosen_nozzle = min(nozzle_counts.keys(), 
+                                          key=lambda k: nozzle_counts[k])
+                        
+                        # Assign feeder and nozzle
+                        feeder_column[comp.position] = feeder_id
+                        nozzle_column[comp.position] = chosen_nozzle
+                        
+                        # Track assignment
+                        feeder_nozzle_assignment[feeder_id].append(chosen_nozzle)
+                        nozzle_usage[feeder_id][chosen_nozzle] += 1
+                        
+                        self.logger.info(
+                            f"Assigned {comp.refdes} (rotation: {rotation}) to "
+                            f"feeder {feeder_id}, nozzle {chosen_nozzle}"
+                        )
+                    else:
+                        self.logger.warning(
+                            f"No compatible nozzle found for {comp.refdes} "
+                            f"rotation {rotation}"
+                        )
+                        unmatched_rows.append(comp.position)
+                else:
+                    self.logger.warning(f"No match found for component: {comp.refdes}")
+                    unmatched_rows.append(comp.position)
+
+            pcb_df['#Feeder'] = 'comp'
+            pcb_df['Feeder ID'] = feeder_column
+            pcb_df['Nozzle'] = nozzle_column
+
+            # Handle unmatched components
+            if unmatched_rows:
+                unmatched_df = pcb_df.iloc[unmatched_rows]
+                unmatched_file = os.path.join(pcr_path, 'manual_assignment.csv')
+                unmatched_df.to_csv(unmatched_file, index=False)
+                self.unmatched_file = unmatched_file
+                self.logger.warning(f"Written {len(unmatched_rows)} unmatched components to "
+                                    f"{os.path.basename(unmatched_file)}")
+
+            metrics.count('manual_placements', len(unmatched_rows))
+            metrics.add_placements(
+                feeders=[feeder_id for feeder_id, nozzles in feeder_nozzle_assignment.items() for _ in nozzles],
+                nozzles=[nozzle for nozzles in feeder_nozzle_assignment.values() for nozzle in nozzles])
+
+            # Log assignment statistics
+            for feeder_id, assignments in feeder_nozzle_assignment.items():
+                nozzle_counts = Counter(assignments)
+                self.logger.info(f"Feeder {feeder_id} nozzle usage: {dict(nozzle_counts)}")
+                if feeder_id in self.feeder_constraints.limits:
+                    self.logger.info(f"Feeder {feeder_id} total component count: {feeder_component_counts[feeder_id]}")
+
+            return pcb_df
+
+        except Exception as e:
+            self.logger.error(f"Error in nozzle_feeder_assignment: {str(e)}")
+            raise PCBProcessingError(f"Failed to assign nozzles and feeders: {str(e)}")
+
+    def process_board_side(self, pcb_df: pd.DataFrame, pcb_width: float,
+                          sort_config: Dict) -> pd.DataFrame:
+        """Process board side and apply mirroring if needed"""
+        try:
+            # Get mirror option directly from config
+            mirror_option = sort_config['side']  # Now a string, not StringVar
+            
+            if mirror_option == "True":  # Bottom side
+                if float(pcb_width) <= 0:
+                    raise PCBProcessingError("PCB width required for bottom side processing")
+                    
+                # Bottom side components, mirrored about the board width
+                pcb_df = pcb_df.loc[pcb_df['SYM_MIRROR'] == 'YES'].copy()
+                pcb_df['SYM_X'] = float(pcb_width) - pcb_df['SYM_X'].to_numpy(dtype=float)
+                pcb_df['SYM_ROTATE'] = 180 - pcb_df['SYM_ROTATE'].to_numpy(dtype=float)
+            else:  # Top side
+                pcb_df = pcb_df.loc[pcb_df['SYM_MIRROR'] == 'NO'].copy()
+
+            return pcb_df
+
+        except Exception as e:
+            logging.error(f"Error in process_board_side: {str(e)}")
+            raise PCBProcessingError(f"Failed to process board side: {str(e)}")
+
+    def estimate_board_outline(self, pcb_df: pd.DataFrame) -> BoardOutline:
+        """
+        Estimate the board outline and width from all placements and fiducials
+
+        The width is the right edge of the fiducial frame; a part beyond the
+        rightmost fiducial widens the board instead of failing the job.
+        Unusual fiducial layouts are logged as warnings, never raised.
+
+        Args:
+            pcb_df: DataFrame containing PCB component data
+
+        Returns:
+            BoardOutline: Bounds, hull, fiducial frame and width (0.0 without coordinates)
+        """
+        try:
+            outline = BoardOutline.from_pcr(pcb_df)
+        except Exception as e:
+            self.logger.error(f"Error estimating board outline: {str(e)}")
+            return BoardOutline.empty(str(e))
+
+        x_min, y_min, x_max, y_max = outline.bounds
+        self.logger.info(
+            f"Board outline: X {x_min:.3f}..{x_max:.3f}mm, Y {y_min:.3f}..{y_max:.3f}mm, "
+            f"{len(outline.hull)} hull points, {len(outline.fiducials)} fiducials"
+        )
+        (ox, oy), (ex, ey) = outline.origin, outline.extent
+        self.logger.info(f"Fiducial frame: origin ({ox:.3f}, {oy:.3f}), extent ({ex:.3f}, {ey:.3f})")
+        if outline.confident:
+            self.logger.info(f"PCB width {outline.width:.3f}mm ({outline.reason})")
+        else:
+            self.logger.warning(f"PCB width {outline.width:.3f}mm may need checking: {outline.reason}")
+        return outline
+
+    def sort_generated_file(self, file_to_sort: str, sort_config: Dict) -> str:
+        """
+        Re-sort the component rows of a generated N4 file
+
+        Args:
+            file_to_sort: Generated N4_*.csv file
+            sort_config: Sorting configuration ('columns', 'ascending')
+
+        Returns:
+            Path of the sorted copy (<name>_sorted.csv)
+        """
+        # Read and sort file
+        df = pd.read_csv(file_to_sort)
+        
+        # Split template and component data
+        template_data = df[df['#Feeder'].isin(['stack', 'mark', 'markext', 'test', 
+                                            'mirror_create', 'mirror', '#SMD'])]
+        component_data = df[df['#Feeder'] == 'comp']
+
+        # Apply sorting to component data
+        if sort_config['columns']:
+            ascending = [sort_config['ascending']] * len(sort_config['columns'])
+            component_data = component_data.sort_values(
+                by=sort_config['columns'],
+                ascending=ascending,
+                inplace=False
+            )
+
+        # Save sorted file: template rows, then the sorted component rows
+        output_path = file_to_sort.replace('.csv', '_sorted.csv')
+        columns = list(df.columns)
+        with OutputStage(os.path.dirname(output_path), self.logger) as stage:
+            write_csv_rows(stage.path(output_path), [str(column) for column in columns],
+                           [(template_data, columns, {}), (component_data, columns, {})])
+        self.logger.info(f"Sorted {file_to_sort} -> {output_path}")
+        return output_path
+
+    def generate_csv(self, pcb_file: str, template_file: str, pcb_width: float,
+                    sort_config: Dict, 
+                    progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                    width_callback: Optional[Callable[[float], None]] = None) -> str:
+        """Main method to process PCB data and generate Neoden4 CSV file"""
+        try:
+            with metrics.metrics_run('generate', Path(pcb_file.strip()).stem), \
+                    span('generate_csv', file=os.path.basename(pcb_file.strip())):
+                self.last_board = None
+                # Identical inputs give identical outputs: reuse them from the job cache
+                cache_key = None
+                if self.job_cache:
+                    cache_key = self.job_cache.key(
+                        'generate', [pcb_file.strip(), template_file.strip()],
+                        name=os.path.basename(pcb_file.strip()), profile=self.profile.fingerprint,
+                        pcb_width=pcb_width, sort_config=sort_config)
+                    cached = self.job_cache.restore(cache_key, os.path.dirname(pcb_file.strip()))
+                    metrics.set_cache_stats(self.job_cache, bool(cached))
+                    if cached:
+                        if width_callback and pcb_width <= 0:
+                            width_callback(cached['pcb_width'])
+                        if progress_callback:
+                            progress_callback(5, 5, "CSV file restored from cache")
+                        return os.path.join(os.path.dirname(pcb_file.strip()), cached['output_file'])
+
+                board = self.prepare_board(pcb_file, template_file, pcb_width, sort_config,
+                                           progress_callback, width_callback)
+                with OutputStage(os.path.dirname(board.pcb_file), self.logger) as stage:
+                    output_file = self.generate_prepared(board, sort_config, progress_callback, stage)
+                    if cache_key:
+                        # Cached from local storage before publishing
+                        self.job_cache.store(cache_key, stage.files(), {'output_file': os.path.basename(output_file),
+                                                                        'pcb_width': board.pcb_width})
+                self.last_board = board
+                return output_file
+
+        except Exception as e:
+            self.logger.error(f"Error in generate_csv: {str(e)}")
+            raise PCBProcessingError(f"Failed to generate CSV: {str(e)}")
+
+    def prepare_board(self, pcb_file: str, template_file: str, pcb_width: float, sort_config: Dict,
+                      progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                      width_callback: Optional[Callable[[float], None]] = None) -> 'PreparedBoard':
+        """
+        Sort-independent part of generate_csv: read, width, side, fiducials and transform
+
+        Args:
+            pcb_file: PCR side file
+            template_file: Neoden4 template of that side
+            pcb_width: Board width, 0 to calculate it from the fiducials
+            sort_config: Only 'side' and 'board_gap' are used here
+
+        Returns:
+            PreparedBoard to pass to generate_prepared, once per sort order
+        """
+        key = PreparedBoard.signature(pcb_file, template_file, sort_config)
+        requested_width = pcb_width
+
+        # Read input files
+        with span('read inputs') as info:
+            pcb_df = read_pcr_file(pcb_file.strip())
+            n4_df = pd.read_csv(template_file.strip())
+            info['rows_out'] = len(pcb_df)
+        
+        if progress_callback:
+            progress_callback(1, 5, "Files loaded successfully")
+
+        # Validate dataframes
+        if pcb_df.empty:
+            raise PCBProcessingError("PCB file contains no data")
+        if n4_df.empty:
+            raise PCBProcessingError("Template file contains no data")
+
+        # Log input data statistics
+        self.logger.info(f"PCB file loaded: {len(pcb_df)} components")
+        self.logger.info(f"Template file loaded: {len(n4_df)} entries")
+        self.logger.info(f"Sort configuration: {sort_config}")
+
+        # Handle PCB width
+        if pcb_width <= 0:
+            self.logger.info("No PCB width provided, estimating from the board outline...")
+            with span('board outline', rows=len(pcb_df)):
+                pcb_width = self.estimate_board_outline(pcb_df).width
+
+            if pcb_width <= 0:
+                raise PCBProcessingError(
+                    "Could not estimate PCB width: the PCB file has no placement coordinates. "
+                    "Please provide width manually."
+                )
+            
+            # Update GUI if callback provided
+            if width_callback:
+                width_callback(pcb_width)
+                self.logger.info(f"Updated GUI with calculated PCB width: {pcb_width:.3f}mm")
+        else:
+            self.logger.info(f"Using provided PCB width: {pcb_width:.3f}mm")
+
+        # Process board side
+        with span('board side', side=sort_config['side'], rows=len(pcb_df)) as info:
+            pcb_df = self.process_board_side(pcb_df, pcb_width, sort_config)
+            info['rows_out'] = len(pcb_df)
+        if progress_callback:
+            progress_callback(3, 5, "Board side processed")
+            
+        # Verify required columns before processing
+        required_cols = ['REFDES', 'COMP_VALUE', 'SYM_NAME', 'SYM_X', 'SYM_Y', 'SYM_ROTATE', 'SYM_MIRROR']
+        missing_cols = [col for col in required_cols if col not in pcb_df.columns]
+        if missing_cols:
+            raise PCBProcessingError(f"Missing required columns in PCB data: {missing_cols}")
+
+        # Log component processing start
+        self.logger.info("Starting component processing...")
+        self.logger.info(f"PCB components to process: {len(pcb_df)}")
+
+        with span('prepare components', rows=len(pcb_df)) as info:
+            components, fiducial_info = self.prepare_components(
+                pcb_df, n4_df, float(sort_config.get('board_gap', DEFAULT_BOARD_GAP) or 0))
+            info['rows_out'] = len(components)
+        return PreparedBoard(key=key, pcb_file=pcb_file.strip(), n4_df=n4_df,
+                             components=components, fiducial_info=fiducial_info,
+                             requested_width=requested_width, pcb_width=pcb_width)
+
+    def generate_prepared(self, board: 'PreparedBoard', sort_config: Dict,
+                          progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                          stage: Optional['OutputStage'] = None) -> str:
+        """
+        Sort a prepared board, assign nozzles and write its N4 file
+
+        Args:
+            stage: Output stage to write into; the caller publishes it.
+                Without one the outputs are staged and published here.
+
+        Returns:
+            Path of the generated N4_*.csv file in the board's folder
+        """
+        if stage is None:
+            with metrics.metrics_run('generate', Path(board.pcb_file).stem), \
+                    OutputStage(os.path.dirname(board.pcb_file), self.logger) as own_stage:
+                return self.generate_prepared(board, sort_config, progress_callback, own_stage)
+
+        self.unmatched_file = None
+        board.output_file = None
+
+        # Process components with proper arguments
+        with span('sequence components', rows=len(board.components)) as info:
+            processed_df = self.sequence_components(
+                board.components.copy(),  # Prepared components stay unsorted for the next order
+                board.n4_df,
+                board.fiducial_info,
+                sort_config,
+                pcr_path=stage.folder  # Directory for saving unmatched components
+            )
+            info['rows_out'] = len(processed_df)
+        metrics.count('components', len(processed_df))
+        if self.unmatched_file:
+            self.unmatched_file = stage.destination(self.unmatched_file)
+        
+        if progress_callback:
+            progress_callback(4, 5, "Components processed")
+
+        # Verify processed data
+        if processed_df.empty:
+            raise PCBProcessingError("No components were processed")
+            
+        self.logger.info(f"Component processing complete. Processed {len(processed_df)} components")
+        board.processed = processed_df
+
+        # Generate output file
+        output_file = stage.destination(self.generate_output(processed_df, board.n4_df,
+                                                             stage.path(board.pcb_file)))
+        board.output_file = output_file
+        if progress_callback:
+            progress_callback(5, 5, "CSV file generated")
+
+        # Set Neoden4 default Component XY location 
+        #output_file = self._set_default_component(output_file)
+        # Log success
+        self.logger.info(f"Successfully generated output file: {output_file}")
+        return output_file
+
+    def process_components(self, pcb_df: pd.DataFrame, n4_df: pd.DataFrame,
+                        sort_config: Dict, pcr_path: str) -> pd.DataFrame:
+        """
+        Process and sort components with coordinate transformation and rotation adjustment
+        
+        Args:
+            pcb_df: PCB component data
+            n4_df: Neoden4 template data
+            sort_config: Sorting configuration
+            pcr_path: Path to save unmatched components
+            
+        Returns:
+            Processed DataFrame
+        """
+        components, fiducial_info = self.prepare_components(
+            pcb_df, n4_df, float(sort_config.get('board_gap', DEFAULT_BOARD_GAP) or 0))
+        return self.sequence_components(components, n4_df, fiducial_info, sort_config, pcr_path)
+
+    def prepare_components(self, pcb_df: pd.DataFrame, n4_df: pd.DataFrame,
+                           board_gap: float) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Fiducial fit, placement distance and machine coordinates of every component
+
+        The transformed coordinates are kept in N4_X/N4_Y next to the PCR
+        coordinates, which sort options still refer to.
+
+        Returns:
+            Tuple of (components, fiducial information)
+        """
+        try:
+             # First get fiducial information before filtering them out
+            fiducial_info = self.get_fiducial_info(n4_df, pcb_df)
+
+              # Log processing statistics before nozzle_feeder_assignments
+            self.logger.info(f"Processed {len(pcb_df)} components")
+            
+            # Distance from the origin fiducial, available to every sort order
+            origin = [fiducial_info['offset_x'], fiducial_info['offset_y']]
+            pcb_df['XY_DIST'] = [math.dist([x, y], origin)
+                                 for x, y in zip(pcb_df['SYM_X'], pcb_df['SYM_Y'])]
+
+            # Calculate and apply coordinate transformation (one per panel board)
+            transforms, board_index = self.calculate_board_transforms(pcb_df, fiducial_info, board_gap)
+            placed = self.apply_transform(pcb_df[['SYM_X', 'SYM_Y']].copy(), transforms, board_index)
+            pcb_df['N4_X'] = placed['SYM_X']
+            pcb_df['N4_Y'] = placed['SYM_Y']
+            return pcb_df, fiducial_info
+
+        except Exception as e:
+            self.logger.error(f"Error processing components: {str(e)}")
+            raise PCBProcessingError(f"Failed to process components: {str(e)}")
+
+    def sequence_components(self, pcb_df: pd.DataFrame, n4_df: pd.DataFrame, fiducial_info: Dict,
+                            sort_config: Dict, pcr_path: str) -> pd.DataFrame:
+        """
+        Order prepared components and turn them into Neoden4 placement rows
+
+        Nozzle choice balances nozzle use in placement order, so it runs
+        after sorting.
+        """
+        try:
+            pcb_df = self.sort_components(pcb_df, sort_config)
+
+            # Clean up temporary columns
+            pcb_df.drop(columns=['XY_DIST'], inplace=True)
+            pcb_df.drop(columns=['COMP_DEVICE_TYPE'], inplace=True)
+            pcb_df.drop(columns=['COMP_TOL'], inplace=True)
+
+            # Add Neoden4 required columns
+            pcb_df.insert(0, "#Feeder", ['comp'] * len(pcb_df))
+            pcb_df.insert(1, "Feeder ID", ['1'] * len(pcb_df))
+            pcb_df.insert(2, "Nozzle", ['1'] * len(pcb_df))
+
+            # Machine coordinates from prepare_components
+            pcb_df['SYM_X'] = pcb_df.pop('N4_X')
+            pcb_df['SYM_Y'] = pcb_df.pop('N4_Y')
+
+            # Assign nozzles and feeders
+
+            pcb_df = self.nozzle_feeder_assignment(pcr_path, pcb_df, n4_df)
+             # Filter out fiducials from processing
+            pcb_df = pcb_df[
+                ~pcb_df['REFDES'].str.contains("FID", na=False, case=True)&
+                ~pcb_df['SYM_NAME'].str.contains("FID", na=False, case=False)&
+                ~pcb_df['COMP_VALUE'].str.contains("FID", na=False, case=False)
+            ]
+             # Log processing statistics before nozzle_feeder_assignments
+            self.logger.info(f"Processed {len(pcb_df)} components")
+
+            # Adjust rotation after nozzle assignment
+            pcb_df['SYM_ROTATE'] = self.adjust_rotation(pcb_df['SYM_ROTATE'], pcb_df['Feeder ID'])
+
+            # Rename columns for Neoden4 format
+            column_mapping = {
+                'Nozzle': 'Type',
+                'REFDES': 'Nozzle',
+                'COMP_VALUE': 'X',
+                'SYM_NAME': 'Y',
+                'SYM_X': 'Angle',
+                'SYM_Y': 'Footprint',
+                'SYM_ROTATE': 'Value',
+                'SYM_MIRROR': 'Pick height'
+            }
+            pcb_df.rename(columns=column_mapping, inplace=True)
+
+            
+            self.logger.info(f"Processed {len(pcb_df)} components")
+            self.logger.info(f"Applied coordinate transformation with {len(fiducial_info['points_i'])} fiducial points")
+            
+            # Validate final component positions
+            max_x = pcb_df['Angle'].max()
+            max_y = pcb_df['Footprint'].max()
+            self.logger.info(f"Component position range - X: 0 to {max_x:.2f}, Y: 0 to {max_y:.2f}")
+                    
+            return pcb_df
+
+        except Exception as e:
+            self.logger.error(f"Error processing components: {str(e)}")
+            raise PCBProcessingError(f"Failed to process components: {str(e)}")
+
+    def get_fiducial_info(self, n4_df: pd.DataFrame, pcb_df: pd.DataFrame) -> Dict:
+        """
+        Extract fiducial information from template and PCB data
+        
+        Args:
+            n4_df: Neoden4 template data
+            pcb_df: PCB component data
+            
+        Returns:
+            Dictionary containing fiducial information
+        """
+        try:
+            # Get fiducial locations from template
+            measured_fiducial_loc = n4_df.loc[n4_df['#Feeder'] == "mark"]
+            if measured_fiducial_loc.empty:
+                raise PCBProcessingError("No fiducial marks found in template")
+                
+            col_names = list(measured_fiducial_loc.columns)
+
+            # Get fiducial points from PCB data
+            fiducial_pts_i = self.get_board_fiducials(pcb_df)
+            if not fiducial_pts_i:
+                raise PCBProcessingError("No fiducials found in PCB data")
+                
+            self.logger.info(f"Found {len(fiducial_pts_i)} fiducials in PCB data")
+            for i, pt in enumerate(fiducial_pts_i):
+                self.logger.info(f"PCB Fiducial {i+1}: X={pt[0]:.3f}, Y={pt[1]:.3f}")
+
+            # Get template fiducial points
+            fiducial_pts_m = []
+            try:
+                for i in range(len(fiducial_pts_i)):
+                    x = float(measured_fiducial_loc[col_names[i*2+3]].iloc[0])
+                    y = float(measured_fiducial_loc[col_names[i*2+4]].iloc[0])
+                    fiducial_pts_m.append([x, y])
+                    self.logger.info(f"Template Fiducial {i+1}: X={x:.3f}, Y={y:.3f}")
+            except (IndexError, ValueError) as e:
+                raise PCBProcessingError(f"Error extracting template fiducial coordinates: {str(e)}")
+
+            if len(fiducial_pts_i) != len(fiducial_pts_m):
+                raise PCBProcessingError(
+                    f"Mismatch in number of fiducials: PCB has {len(fiducial_pts_i)}, "
+                    f"Template has {len(fiducial_pts_m)}"
+                )
+
+            # Sort fiducial points by distance from origin (0,0)
+            fiducial_pts_mr = sorted(
+                fiducial_pts_m, 
+                key=lambda point: math.sqrt(point[0]**2 + point[1]**2)
+            )
+            self.logger.info(f"FIDUCIALS: TEMPLATE={fiducial_pts_mr}, PCB={fiducial_pts_i}")
+            self.logger.info(f"Processed {len(pcb_df)} components")
+            print("Measured Fid", fiducial_pts_mr)
+            print("PCB Fid", fiducial_pts_i)
+            
+            # Get offset from first fiducial
+            n4_offsetx = fiducial_pts_i[0][0]
+            n4_offsety = fiducial_pts_i[0][1]
+            
+            self.logger.info(f"Using offset point: X={n4_offsetx:.3f}, Y={n4_offsety:.3f}")
+                    
+            return {
+                'offset_x': n4_offsetx,
+                'offset_y': n4_offsety,
+                'points_i': fiducial_pts_i,
+                'points_m': fiducial_pts_mr
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error in get_fiducial_info: {str(e)}")
+            raise PCBProcessingError(f"Failed to get fiducial information: {str(e)}")
+
+    def get_board_fiducials(self, pcb_df: pd.DataFrame) -> List[List[float]]:
+        """
+        Extract fiducial points from PCB data
+        
+        Args:
+            pcb_df: PCB component data
+            
+        Returns:
+            List of fiducial coordinates [[x1,y1], [x2,y2], ...]
+        """
+        try:
+            # Find fiducials in PCB data
+            fid_df = pcb_df.loc[pcb_df['REFDES'].str.contains('FID', case=False, na=False)].copy()
+            
+            if fid_df.empty:
+                self.logger.error("No fiducials found in PCB data")
+                return []
+                
+            # Calculate distance from origin for each fiducial
+            fid_df['XY_DIST'] = [math.dist(point, (0, 0))
+                                 for point in zip(fid_df['SYM_X'].tolist(), fid_df['SYM_Y'].tolist())]
+            
+            # Sort by distance
+            fid_df.sort_values("XY_DIST", ascending=True, inplace=True)
+            
+            # Log found fiducials
+            self.logger.info(f"Found {len(fid_df)} fiducials:")
+            for _, fid in fid_df.iterrows():
+                self.logger.info(
+                    f"  {fid['REFDES']}: X={fid['SYM_X']:.3f}, Y={fid['SYM_Y']:.3f}, "
+                    f"Distance={fid['XY_DIST']:.3f}"
+                )
+            
+            # Return coordinates as list of [x,y] pairs
+            fiducials = fid_df[['SYM_X', 'SYM_Y']].values.tolist()
+            
+            if not fiducials:
+                raise PCBProcessingError("No valid fiducial coordinates found")
+                
+            return fiducials
+
+        except Exception as e:
+            self.logger.error(f"Error in get_board_fiducials: {str(e)}")
+            raise PCBProcessingError(f"Failed to get board fiducials: {str(e)}")
+
+    def calculate_homography(self, fiducial_pts_i: List[List[float]],
+                           fiducial_pts_m: List[List[float]]) -> np.ndarray:
+        """Calculate homography transformation matrix"""
+        try:
+            num_points = len(fiducial_pts_i)
+            if num_points < 2:
+                raise PCBProcessingError("At least 2 fiducial points required")
+
+            if num_points == 2:
+                # Affine transformation for 2 points
+                src = np.array(fiducial_pts_i, dtype=np.float32)
+                dst = np.array(fiducial_pts_m, dtype=np.float32)
+                
+                # Calculate translation
+                t_x = np.mean(dst[:, 0] - src[:, 0])
+                t_y = np.mean(dst[:, 1] - src[:, 1])
+                
+                # Calculate rotation and scale
+                src_centered = src - np.mean(src, axis=0)
+                dst_centered = dst - np.mean(dst, axis=0)
+                
+                covariance = np.dot(src_centered.T, dst_centered)
+                U, _, Vt = np.linalg.svd(covariance)
+                
+                rotation = np.dot(Vt.T, U.T)
+                scale = np.sum(dst_centered * np.dot(src_centered, rotation)) / np.sum(src_centered**2)
+                
+                transform = np.zeros((2, 3))
+                transform[:2, :2] = scale * rotation
+                transform[:, 2] = [t_x, t_y]
+                return transform
+            else:
+                # Full homography for 3+ points
+                A = np.zeros((2*num_points, 9))
+                for i in range(num_points):
+                    x, y = fiducial_pts_i[i]
+                    x_prime, y_prime = fiducial_pts_m[i]
+                    A[2*i] = [-x, -y, -1, 0, 0, 0, x*x_prime, y*x_prime, x_prime]
+                    A[2*i+1] = [0, 0, 0, -x, -y, -1, x*y_prime, y*y_prime, y_prime]
+
+                _, _, V = np.linalg.svd(A)
+                H = V[-1].reshape(3, 3)
+                return H / H[2, 2]
+
+        except Exception as e:
+            logging.error(f"Error in calculate_homography: {str(e)}")
+            raise PCBProcessingError(f"Failed to calculate transformation: {str(e)}")
+
+    def get_board_regions(self, pcb_df: pd.DataFrame, fiducial_pts: List[List[float]],
+                          board_gap: float) -> List[Dict]:
+        """
+        Cluster fiducials by panel board
+
+        Fiducials and component placements are indexed on a grid with cell size
+        ``board_gap`` and linked into boards by single-linkage clustering, so
+        each cluster is one board of the panel.
+
+        Args:
+            pcb_df: PCB component data (fiducials included)
+            fiducial_pts: Fiducial coordinates in the order used for matching
+            board_gap: Minimum distance (mm) separating boards in the panel
+
+        Returns:
+            List of boards with at least two fiducials, each a dict with
+            'fiducials' (indices into fiducial_pts) and 'bounds'
+            (x_min, y_min, x_max, y_max)
+        """
+        fid_xy = np.asarray(fiducial_pts, dtype=float).reshape(-1, 2)
+        comp_xy = pcb_df[['SYM_X', 'SYM_Y']].to_numpy(dtype=float)
+        points = np.vstack([fid_xy, comp_xy])
+
+        labels = SpatialGridIndex(points, board_gap).connected_clusters()
+        fid_labels = labels[:len(fid_xy)]
+
+        boards = []
+        for label in np.unique(fid_labels):
+            fid_indices = np.flatnonzero(fid_labels == label)
+            if len(fid_indices) < 2:
+                self.logger.debug(f"Board cluster {label} has a single fiducial, using global transform")
+                continue
+            members = points[labels == label]
+            boards.append({
+                'fiducials': fid_indices.tolist(),
+                'bounds': (*members.min(axis=0), *members.max(axis=0))
+            })
+
+        self.logger.info(f"Found {len(boards)} board(s) with local fiducials (gap {board_gap:.3f}mm)")
+        return boards
+
+    def assign_board_transforms(self, x: np.ndarray, y: np.ndarray,
+                                boards: List[Dict]) -> np.ndarray:
+        """
+        Assign each point to the board region containing it
+
+        Returns:
+            Transform index per point: 0 for the global transform, i+1 for boards[i]
+        """
+        if not boards:
+            return np.zeros(len(x), dtype=np.int64)
+
+        bounds = np.array([board['bounds'] for board in boards], dtype=float)
+        inside = ((x[:, None] >= bounds[None, :, 0]) & (y[:, None] >= bounds[None, :, 1]) &
+                  (x[:, None] <= bounds[None, :, 2]) & (y[:, None] <= bounds[None, :, 3]))
+        return np.where(inside.any(axis=1), inside.argmax(axis=1) + 1, 0)
+
+    def calculate_board_transforms(self, pcb_df: pd.DataFrame, fiducial_info: Dict,
+                                   board_gap: float = DEFAULT_BOARD_GAP) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the global transform plus one local transform per panel board
+
+        Args:
+            pcb_df: PCB component data
+            fiducial_info: Output of get_fiducial_info
+            board_gap: Minimum distance (mm) between panel boards, 0 for a single board
+
+        Returns:
+            Tuple of (stacked 3x3 transforms, transform index per pcb_df row)
+        """
+        try:
+            points_i = fiducial_info['points_i']
+            points_m = fiducial_info['points_m']
+            transforms = [self._as_projective(self.calculate_homography(points_i, points_m))]
+            board_index = np.zeros(len(pcb_df), dtype=np.int64)
+
+            if board_gap > 0:
+                boards = self.get_board_regions(pcb_df, points_i, board_gap)
+                if len(boards) > 1:
+                    for i, board in enumerate(boards):
+                        local_i = [points_i[j] for j in board['fiducials']]
+                        local_m = [points_m[j] for j in board['fiducials']]
+                        transforms.append(self._as_projective(self.calculate_homography(local_i, local_m)))
+                        self.logger.info(f"Board {i + 1}: fiducials {board['fiducials']}, "
+                                         f"bounds {tuple(round(b, 3) for b in board['bounds'])}")
+                    board_index = self.assign_board_transforms(
+                        pcb_df['SYM_X'].to_numpy(dtype=float),
+                        pcb_df['SYM_Y'].to_numpy(dtype=float),
+                        boards
+                    )
+                    self.logger.info(f"Components outside any board region: {int((board_index == 0).sum())}")
+                else:
+                    self.logger.info("Less than two boards with local fiducials, using global transform")
+
+            return np.stack(transforms), board_index
+
+        except PCBProcessingError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error in calculate_board_transforms: {str(e)}")
+            raise PCBProcessingError(f"Failed to calculate board transforms: {str(e)}")
+
+    @staticmethod
+    def _as_projective(transform: np.ndarray) -> np.ndarray:
+        """Lift a 2x3 affine transform to 3x3 so all transforms apply the same way"""
+        if transform.shape == (2, 3):
+            return np.vstack([transform, [0.0, 0.0, 1.0]])
+        return transform
+
+    def apply_transform(self, pcb_df: pd.DataFrame, transform: np.ndarray,
+                       board_index: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Apply coordinate transformation to components in one batched pass
+
+        Args:
+            pcb_df: PCB component data
+            transform: A single 2x3/3x3 transform, or a stack of 3x3 transforms
+            board_index: Index into the transform stack for each row (default all 0)
+        """
+        try:
+            transforms = transform if transform.ndim == 3 else self._as_projective(transform)[None]
+            if board_index is None:
+                board_index = np.zeros(len(pcb_df), dtype=np.int64)
+
+            pts_h = np.column_stack([
+                pcb_df['SYM_X'].to_numpy(dtype=float),
+                pcb_df['SYM_Y'].to_numpy(dtype=float),
+                np.ones(len(pcb_df))
+            ])
+            pts_f = np.matmul(transforms[board_index], pts_h[:, :, None])[:, :, 0]
+
+            pcb_df['SYM_X'] = pts_f[:, 0] / pts_f[:, 2]
+            pcb_df['SYM_Y'] = pts_f[:, 1] / pts_f[:, 2]
+
+            return pcb_df
+
+        except Exception as e:
+            logging.error(f"Error in apply_transform: {str(e)}")
+            raise PCBProcessingError(f"Failed to apply transformation: {str(e)}")
+
+    def adjust_rotation(self, rotations: pd.Series, feeder_ids: pd.Series) -> np.ndarray:
+        """
+        Machine rotation of each placement, normalised to (-180, 180]
+
+        Parts on feeders 20 and up face the other way and are turned by 180°.
+
+        Args:
+            rotations: SYM_ROTATE per placement, in degrees
+            feeder_ids: Assigned Feeder ID per placement
+
+        Returns:
+            Array of adjusted rotations
+        """
+        rotation = pd.to_numeric(rotations, errors='coerce').to_numpy(dtype=float)
+        feeder = pd.to_numeric(feeder_ids, errors='coerce').to_numpy(dtype=float)
+
+        rotation = np.mod(rotation, 360)
+        rotation = np.where(feeder >= 20, np.mod(rotation - 180, 360), rotation)
+        rotation = np.where(rotation > 180, rotation - 360, rotation)
+
+        # Missing rotations stay missing; unparsable ones and bad feeder IDs become 0
+        invalid = np.isnan(feeder) | (np.isnan(rotation) & rotations.notna().to_numpy())
+        if invalid.any():
+            logging.error(f"Error in adjust_rotation: {int(invalid.sum())} rows without a numeric "
+                          f"rotation or feeder ID, set to 0")
+            rotation[invalid] = 0.0
+        return rotation
+
+    def generate_output(self, processed_df: pd.DataFrame, template_df: pd.DataFrame,
+                       input_file: str) -> str:
+        """
+        Generate final output CSV file
+        
+        Args:
+            processed_df: Processed PCB data
+            template_df: Template data
+            input_file: Original input file path
+            
+        Returns:
+            Path to generated output file
+        """
+        try:
+            # Generate output filename
+            output_path = os.path.join(
+                os.path.dirname(input_file),
+                f'N4_{Path(input_file).stem}.csv'
+            )
+
+            # Template rows, then component rows, straight to disk
+            write_n4_file(output_path, template_df, processed_df)
+            logging.info(f"Generated output file: {output_path}")
+
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error in generate_output: {str(e)}")
+            raise PCBProcessingError(f"Failed to generate output file: {str(e)}")
+
+    def validate_input_files(self, pcb_file: str, template_file: str) -> None:
+        """
+        Validate input files exist and have required format
+        
+        Args:
+            pcb_file: Path to PCB file
+            template_file: Path to template file
+            
+        Raises:
+            PCBProcessingError: If validation fails
+        """
+        # Check file existence
+        if not os.path.exists(pcb_file):
+            raise PCBProcessingError(f"PCB file not found: {pcb_file}")
+        if not os.path.exists(template_file):
+            raise PCBProcessingError(f"Template file not found: {template_file}")
+
+        # Check file extensions
+        if not pcb_file.lower().endswith(('.csv',) + PCR_REPORT_EXTENSIONS):
+            raise PCBProcessingError(f"Invalid PCB file format: {pcb_file}")
+        if not template_file.lower().endswith('.csv'):
+            raise PCBProcessingError(f"Invalid template file format: {template_file}")
+
+        # Validate PCB file structure
+        try:
+            pcb_df = read_pcr_file(pcb_file)
+            required_cols = ['REFDES', 'COMP_VALUE', 'SYM_NAME', 'SYM_X', 'SYM_Y', 'SYM_ROTATE', 'SYM_MIRROR']
+            missing_cols = [col for col in required_cols if col not in pcb_df.columns]
+            if missing_cols:
+                raise PCBProcessingError(f"Missing columns in PCB file: {missing_cols}")
+        except Exception as e:
+            raise PCBProcessingError(f"Failed to read PCB file: {str(e)}")
+
+        # Validate template file structure
+        try:
+            template_df = pd.read_csv(template_file)
+            required_cols = ['#Feeder', 'Feeder ID', 'Nozzle']
+            missing_cols = [col for col in required_cols if col not in template_df.columns]
+            if missing_cols:
+                raise PCBProcessingError(f"Missing columns in template file: {missing_cols}")
+        except Exception as e:
+            raise PCBProcessingError(f"Failed to read template file: {str(e)}")
+
+    def sort_components(self, pcb_df: pd.DataFrame, sort_config: Dict) -> pd.DataFrame:
+        """
+        Sort components according to multiple criteria
+        
+        Args:
+            pcb_df: DataFrame containing PCB components
+            sort_config: Dictionary containing sorting configuration
+            
+        Returns:
+            Sorted DataFrame
+        """
+        try:
+            if sort_config['columns']:
+                # Create list of ascending/descending for each column
+                ascending = [sort_config['ascending']] * len(sort_config['columns'])
+                
+                # Sort DataFrame
+                pcb_df.sort_values(
+                    by=sort_config['columns'],
+                    ascending=ascending,
+                    inplace=sort_config['inplace']
+                )
+                
+            return pcb_df
+            
+        except Exception as e:
+            logging.error(f"Error sorting components: {str(e)}")
+            raise PCBProcessingError(f"Failed to sort components: {str(e)}")
+
+    def _set_default_component1(self, pcb_data):
+        df = pd.read_csv(pcb_data)
+        try:
+            # Get XY values from #SMD row
+            smd_row = df[df['#Feeder'] == '#SMD'].iloc[0]
+            #x_val = float(smd_row['X'])  # 216.65
+            #y_val = float(smd_row['Y'])  # 157.36
+
+            # Skip first few columns which contain metadata
+            x_coord_start = 6  # X coordinate is in column 6 
+            y_coord_start = 7  # Y coordinate is in column 7
+            
+            x_val = float(smd_row.iloc[x_coord_start])  # Get X value
+            y_val = float(smd_row.iloc[y_coord_start])  # Get Y value
+
+            # Update mirror_create row's Nozzle and X columns
+            df.loc[df['#Feeder'] == 'mirror_create', ['Nozzle', 'X']] = [x_val, y_val]
+            
+            # Update mirror row's Feeder ID and Type columns 
+            df.loc[df['#Feeder'] == 'mirror', ['Feeder ID', 'Type']] = [x_val, y_val]
+
+            return df
+
+        except Exception as e:
+            self.logger.error(f"Error setting default component: {str(e)}")
+            raise PCBProcessingError(f"Failed to set default component: {str(e)}")
+
+    def _set_default_component2(self, df):
+        try:
+            # Get row with '#SMD' value
+            smd_row = df[df['#Feeder'] == '#SMD'].iloc[0]
+            
+            # Debug print
+            print("SMD row columns:", smd_row.index.tolist())
+            print("SMD row values:", smd_row.values.tolist())
+            print("Value at index 6:", smd_row.iloc[6])
+            print("Value at index 7:", smd_row.iloc[7])
+            
+            x_coord_start = 6  
+            y_coord_start = 7
+            
+            x_val = float(smd_row.iloc[x_coord_start])
+            y_val = float(smd_row.iloc[y_coord_start])
+
+            df.loc[df['#Feeder'] == 'mirror_create', ['Nozzle', 'X']] = [x_val, y_val]
+            df.loc[df['#Feeder'] == 'mirror', ['Feeder ID', 'Type']] = [x_val, y_val]
+
+            return df
+
+        except Exception as e:
+            self.logger.error(f"Error setting default component: {str(e)}")
+            raise PCBProcessingError(f"Failed to set default component: {str(e)}")
+
+    def _set_default_component(self, df):
+        try:
+            # Debug print
+            smd_row = df[df['#Feeder'] == '#SMD']
+            print("DataFrame columns:", df.columns.tolist())
+            print("\nSMD row:")
+            print(smd_row)
+            print("\nFirst SMD row values:")
+            print(smd_row.iloc[0])
+
+            # Original logic will go here after we identify correct columns
+            return df
+
+        except Exception as e:
+                self.logger.error(f"Error setting default component: {str(e)}")
+                raise PCBProcessingError(f"Failed to set default component: {str(e)}")    
+               
+class PCR_File_Splitter:
+    def __init__(self, pcr_file: str, component_table_file: str, neoden4_file: str, config_file: str, progress_callback=None,
+                 profile: Optional[MachineProfile] = None, use_cache: bool = True):
+       
+        self.logger = logging.getLogger('PCR_File_Splitter')
+        self.progress_callback = progress_callback
+        
+        self.config = self._load_config(config_file)
+        self.pcr_file = pcr_file
+        self.job_cache = (JobCache.from_config(load_job_cache_config(config=self.config),
+                                               os.path.dirname(os.path.abspath(config_file)))
+                          if use_cache else None)
+        self.ignore_matcher = IgnoreRuleMatcher.from_config(self.config)
+
+        self.pcr_df = read_pcr_file(pcr_file)
+        
+        # Machine files come from the compiled profile of their directory
+        # (or the already-loaded profile a long-running service passes in)
+        pcr_files_dir = os.path.dirname(os.path.abspath(neoden4_file))
+        self.profile = profile or MachineProfile.load_or_compile(
+            MachineProfile.source_paths(pcr_files_dir, template=neoden4_file, components=component_table_file),
+            MachineProfile.resolve_path(pcr_files_dir, self.config), self.logger)
+        self.component_table_df = self.profile.component_table_df
+        self.neoden4_df = self.profile.neoden4_df
+        self.feeder_constraints = self.profile.constraints
+        self.pcr_filename = Path(pcr_file).stem
+        self.filepath = os.path.split(pcr_file)[0]
+        self.output_dir = self.filepath  # Staging folder while process_files runs
+        
+        # Initialize with dynamic reel sizes
+        self.available_reel_sizes = set()  # Will be populated from input files
+        self._initialize_available_feeders()
+        self._remove_ignored_features()
+        
+        self.placed_components = set()
+        self.matched_count = 0
+        self.unmatched_count = 0
+
+        # Feeder pinning keeps unchanged parts on the feeders of the previous run
+        self.pin_feeders = bool(self.config.get('feeder_pinning', False))
+        self.previous_templates: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self.previous_inputs: List[str] = []  # Output files of the previous split read for feeder pinning
+        self.previous_allocation: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self.pcr_changes: Optional[Dict[str, List[str]]] = None
+        self.feeder_changes: Optional[List[Dict]] = None
+        
+        self.logger.info("PCR_File_Splitter initialized")
+        self.logger.info(f"Processing PCR file: {pcr_file}")
+        
+    def update_progress(self, current: int, total: int, status: str):
+        """Update progress bar if callback is available"""
+        if self.progress_callback:
+            self.progress_callback(current, total, status)
+
+    def _initialize_available_feeders(self):
+        """Initialize available feeders based on actual reel sizes from template and component table"""
+        # Reel sizes of template and component table, and the feeder layout,
+        # are precompiled in the machine profile; placement attempts only copy bitsets
+        self.available_reel_sizes = set(self.profile.reel_sizes)
+        self.feeder_pool = self.profile.feeder_pool
+        self.feeder_state = self.feeder_pool.fresh_state()
+        
+        self.logger.info("Available reel sizes: %s", sorted(self.available_reel_sizes))
+        self.logger.info("Available feeders after initialization:")
+        for reel_size, feeders in self.feeder_pool.reels.items():
+            self.logger.info(f"Reel {reel_size}: {list(feeders)}")
+        self.logger.info(f"Limited feeders: {list(self.feeder_pool.limited)}")
+
+    @property
+    def available_reels(self) -> Dict[str, List[str]]:
+        """Currently available feeders per reel size"""
+        return self.feeder_state.as_lists()
+
+    def _reset_available_feeders(self):
+        """Reset available feeders to their initial state based on template"""
+        self.feeder_state = self.feeder_pool.fresh_state()
+
+    def _get_reel_progression(self, initial_reel: str) -> List[str]:
+        """
+        Get progression of compatible reel sizes for a given initial reel size
+        
+        Args:
+            initial_reel: Initial reel size as string
+            
+        Returns:
+            List of compatible reel sizes in ascending order
+        """
+        try:
+            # Convert available reel sizes to integers for sorting
+            sorted_sizes = sorted([int(size) for size in self.available_reel_sizes])
+            
+            # Find starting point in progression
+            try:
+                start_index = sorted_sizes.index(int(initial_reel))
+            except ValueError:
+                self.logger.error(f"Invalid initial reel size: {initial_reel}")
+                return []
+                
+            # Return progression from initial size onwards
+            progression = [str(size) for size in sorted_sizes[start_index:]]
+            
+            self.logger.debug(f"Reel progression for {initial_reel}: {progression}")
+            return progression
+            
+        except Exception as e:
+            self.logger.error(f"Error in _get_reel_progression: {str(e)}")
+            return []
+
+    def _remove_ignored_features(self):
+        """Drop PCR rows matching the configured ignore rules"""
+        ignored = self.ignore_matcher.mask(self.pcr_df)
+        self.pcr_df = self.pcr_df[~ignored]
+        self.logger.info(f"Removed {int(ignored.sum())} ignored PCR rows")
+
+    def process_files(self, parallel: Optional[bool] = None):
+        """
+        Split the PCR into top/bottom template and placement files
+
+        Args:
+            parallel: Process _Bot and _Top in separate worker processes.
+                Defaults to the 'parallel_sides' configuration option.
+        """
+        if parallel is None:
+            parallel = bool(self.config.get('parallel_sides', False))
+        with metrics.metrics_run('split', Path(self.pcr_file).stem):
+            try:
+                if self.pin_feeders:
+                    self._load_previous_run()
+                cache_key = self._cache_key()
+                if cache_key:
+                    cached = self.job_cache.restore(cache_key, self.filepath)
+                    metrics.set_cache_stats(self.job_cache, bool(cached))
+                    if cached:
+                        self.matched_count = cached['matched']
+                        self.unmatched_count = cached['unmatched']
+                        self.pcr_changes = cached.get('pcr_changes')
+                        self.feeder_changes = cached.get('feeder_changes')
+                        metrics.count('matched', self.matched_count)
+                        metrics.count('unmatched', self.unmatched_count)
+                        self.update_progress(100, 100, "Split restored from cache")
+                        return
+                # Outputs are written locally and published to the PCR folder together
+                with span('split', file=os.path.basename(self.pcr_file)), \
+                        OutputStage(self.filepath, self.logger) as stage:
+                    self.output_dir = stage.folder
+                    try:
+                        if parallel:
+                            self._process_sides_parallel()
+                        else:
+                            pcr_groups = self._group_pcr_data()
+                            for group_name, pcr_data in pcr_groups.items():
+                                self.logger.info(f"Processing group: {group_name}")
+                                self._process_group(pcr_data, group_name)
+                                #time.sleep(1)
+                        metrics.count('matched', self.matched_count)
+                        metrics.count('unmatched', self.unmatched_count)
+                        if self.previous_templates:
+                            self._report_feeder_changes()
+                        if cache_key:
+                            self.job_cache.store(cache_key, self.output_files(),
+                                                 {'matched': self.matched_count, 'unmatched': self.unmatched_count,
+                                                  'pcr_changes': self.pcr_changes, 'feeder_changes': self.feeder_changes})
+                    finally:
+                        self.output_dir = self.filepath
+            except Exception as e:
+                self.logger.error(f"An error occurred during processing: {str(e)}", exc_info=True)
+                raise
+
+    def _process_sides_parallel(self):
+        """Process both board sides concurrently and merge their counters"""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        group_names = list(self._group_pcr_data().keys())
+        self.update_progress(0, len(group_names), "Processing board sides in parallel")
+
+        # Worker log records are replayed through this process's loggers
+        log_queue = multiprocessing.Queue()
+        listener = logging.handlers.QueueListener(log_queue, _LoggerDispatcher())
+        listener.start()
+        try:
+            with ProcessPoolExecutor(max_workers=len(group_names),
+                                     initializer=_init_side_worker,
+                                     initargs=(log_queue, tracing_enabled(), _logger_levels(),
+                                               logging.root.manager.disable)) as executor:
+                futures = {executor.submit(_process_side, self, group_name): group_name
+                           for group_name in group_names}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    merge_spans(result['spans'])
+                    if metrics.current_run() is not None:
+                        metrics.current_run().merge(result['metrics'])
+                    self.matched_count += result['matched']
+                    self.unmatched_count += result['unmatched']
+                    self.logger.info(f"Side {result['group']} finished: "
+                                     f"{result['matched']} matched, {result['unmatched']} unmatched")
+                    self.update_progress(done, len(futures), f"Completed processing {result['group']}")
+        finally:
+            listener.stop()
+
+        self.logger.info(f"Total matched components: {self.matched_count}")
+        self.logger.info(f"Total unmatched components: {self.unmatched_count}")
+
+    def __getstate__(self):
+        # GUI progress callbacks cannot cross process boundaries
+        state = self.__dict__.copy()
+        state['progress_callback'] = None
+        return state
+
+    def _create_component_groups(self, table: 'ComponentTable') -> List[Dict]:
+        """Create component groups with accurate counting"""
+        counts = table.group_counts()
+
+        result = []
+        for group_id, positions in enumerate(table.groups()):
+            first = table.row(positions[0])
+            comp_match = self._find_component_match(first)
+            result.append({
+                'footprint': first.footprint,
+                'value': first.value,
+                'Reel': comp_match['Reel'] if comp_match else None,
+                'positions': positions,
+                'count': int(counts[group_id])
+            })
+        
+        # Log component counts for verification
+        for group in result:
+            self.logger.info(f"Component group {group['footprint']}/{group['value']} count: {group['count']}")
+            
+        return result
+
+    def _sort_component_groups(self, groups: List[Dict]) -> List[Dict]:
+        """Sort component groups by count in descending order"""
+        sorted_groups = sorted(groups, key=lambda x: x['count'], reverse=True)
+        self.logger.info("Sorted groups order:")
+        for group in sorted_groups:
+            self.logger.info(f"{group['footprint']}/{group['value']}: {group['count']} placements")
+        return sorted_groups
+
+    def _find_component_match(self, pcr_row: ComponentRow) -> Optional[Dict]:
+        match = self.profile.footprint_params(pcr_row['SYM_NAME'])
+        if match is not None:
+            self.logger.info(f"Match found for {pcr_row['SYM_NAME']}/{pcr_row['COMP_VALUE']} in component table")
+            return {
+                'footprint': match['Footprint'],
+                'value': pcr_row['COMP_VALUE'],
+                'Reel': str(match['Reel'])  # Ensure Reel is converted to string
+            }
+        else:
+            self.logger.warning(f"No match found for {pcr_row['SYM_NAME']}/{pcr_row['COMP_VALUE']} in component table")
+        return None
+
+    def _place_component(self, template: pd.DataFrame, component: Dict) -> Tuple[PlacementResult, Optional[str], Optional[str]]:
+        component_key = f"{component['footprint']}/{component['value']}"
+        
+        if 'Reel' not in component:
+            self.logger.warning(f"No reel information for component {component_key}")
+            return PlacementResult.NOT_PLACED, None, None
+        
+        reel_sizes = ['8', '12', '16', '20']
+        initial_reel = component['Reel']
+        
+        # Check if the component is already placed in the template
+        already_placed_rows = template[(template['Footprint'] == component['footprint']) & 
+                                    (template['Value'] == component_key)]
+        if not already_placed_rows.empty:
+            self.logger.info(f"Component {component_key} is already placed in the template")
+            return PlacementResult.ALREADY_PLACED, initial_reel, already_placed_rows.iloc[0]['#Feeder']
+        
+        for reel in reel_sizes[reel_sizes.index(initial_reel):]:
+            self.logger.debug(f"Attempting to place component {component_key} with reel {reel}")
+            
+            if reel in self.available_reels and self.available_reels[reel]:
+                for feeder_index, feeder in enumerate(self.available_reels[reel]):
+                    vacant_rows = template[(template['Reel'] == reel) & (template['#Feeder'] == feeder) & (template['Footprint'] == '-')]
+                    if not vacant_rows.empty:
+                        row_index = vacant_rows.index[0]
+                        self._merge_component_data(template, row_index, component)
+                        # Remove the used feeder only after successful placement
+                        self.feeder_state.take(reel, feeder)
+                        self.logger.info(f"Placed component {component_key} using feeder {feeder} (reel {reel})")
+                        return PlacementResult.PLACED, reel, feeder
+            else:
+                self.logger.warning(f"No available feeders for reel {reel} for component {component_key}")
+        
+        self.logger.warning(f"No vacant positions found for component {component_key} on any available reel")
+        return PlacementResult.NOT_PLACED, None, None
+
+    def _merge_component_group_data(self, template: pd.DataFrame, row_index: int, group: Dict):
+        """Update template row with component data while preserving nozzle value"""
+        try:
+            # Get the feeder ID for this row
+            feeder_id = template.at[row_index, 'Feeder ID']
+            
+            # Get the original nozzle value from base template
+            original_nozzle = self.feeder_pool.nozzles[str(feeder_id)]
+            
+            # Get component data from component table
+            comp_data = self.profile.footprint_params(group['footprint'])
+            
+            # Update template row
+            template.at[row_index, 'Footprint'] = group['footprint']
+            template.at[row_index, 'Value'] = f"{group['footprint']}/{group['value']}"
+            template.at[row_index, 'Nozzle'] = original_nozzle  # Preserve original nozzle value
+            
+            # Copy parameters from component table
+            template.at[row_index, 'Pick height'] = comp_data['Pick height']
+            template.at[row_index, 'Pick delay'] = comp_data['Pick delay']
+            template.at[row_index, 'Place Height'] = comp_data['Place Height']
+            template.at[row_index, 'Place Delay'] = comp_data['Place Delay']
+            template.at[row_index, 'Vacuum detection'] = comp_data['Vacuum detection']
+            template.at[row_index, 'Threshold'] = comp_data['Threshold']
+            template.at[row_index, 'Vision Alignment'] = comp_data['Vision Alignment']
+            template.at[row_index, 'Speed'] = comp_data['Speed']
+            
+            # Copy unnamed parameters
+            for i in range(17, 30):
+                col_name = f'Unnamed: {i}'
+                if col_name in comp_data:
+                    template.at[row_index, col_name] = comp_data[col_name]
+            
+            self.logger.debug(
+                f"Updated template row {row_index} with component "
+                f"{group['footprint']}/{group['value']} using original nozzle {original_nozzle}"
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error merging component data for {group['footprint']}: {str(e)}")
+            raise
+
+    def _merge_component_data(self, template: pd.DataFrame, row_index: int, component: Dict):
+        # Get the component data from the component table
+        comp_data = self.profile.footprint_params(component['footprint'])
+        
+        # Update all columns except 'Reel'
+        for column in template.columns:
+            if column in comp_data.index and column != 'Reel':
+                template.at[row_index, column] = comp_data[column]
+        
+        # Update Footprint and Value separately as they might have special formatting
+        template.at[row_index, 'Footprint'] = component['footprint']
+        template.at[row_index, 'Value'] = f"{component['footprint']}/{component['value']}"
+        
+        self.logger.info(f"Updated template row {row_index} with component {component['footprint']}/{component['value']}")
+    
+    def _save_pcr(self, pcr_data: pd.DataFrame, suffix: str):
+        filename = f"{self.pcr_filename}{suffix}.csv"
+        columns = [str(column) for column in pcr_data.columns]
+        write_csv_rows(os.path.join(self.output_dir, filename), columns, [(pcr_data, list(pcr_data.columns), {})])
+        self.logger.info(f"Saved {filename}")
+
+    def _group_pcr_data(self) -> Dict[str, pd.DataFrame]:
+        grouped = {'_Bot': self.pcr_df[self.pcr_df['SYM_MIRROR'] == 'YES'],
+            '_Top': self.pcr_df[self.pcr_df['SYM_MIRROR'] == 'NO']}
+        
+        for group, data in grouped.items():
+            self.logger.info(f"Group {group} has {len(data)} components")
+            if len(data) == 0:
+                self.logger.warning(f"Group {group} is empty. Check PCR data for SYM_MIRROR values.")
+        
+        return grouped
+
+    def _is_fiducial(self, pcr_row: ComponentRow) -> bool:
+        return pcr_row.is_fiducial
+
+    def _save_template(self, template: pd.DataFrame, suffix: str):
+        # Every column but 'Reel', written without a dropped copy
+        columns = [column for column in template.columns if column != 'Reel']
+        filename = f"Neoden4_Template{self.pcr_filename}{suffix}.csv"
+        write_csv_rows(os.path.join(self.output_dir, filename), [str(column) for column in columns],
+                       [(template, columns, {})])
+        self.logger.info(f"Saved {filename}.csv (Reel column removed)")
+
+    def _save_manual_placement(self, manual_placement: pd.DataFrame, group_name: str):
+        filename = f"Manual_Placement{group_name}.csv"
+        manual_placement.to_csv(os.path.join(self.output_dir, filename), index=False)
+        self.logger.info(f"Saved {filename}")
+
+    def _get_reel_options(self, component_size: str) -> List[str]:
+        sizes = ['8', '12', '16']
+        try:
+            start_index = sizes.index(str(component_size))
+        except ValueError:
+            self.logger.warning(f"Invalid component size: {component_size}. Using smallest size.")
+            start_index = 0
+
+        reel_options = []
+        for size in sizes[start_index:]:
+            reel_options.extend(list(self.available_reels[size]))
+            if reel_options:
+                break
+        
+        return reel_options
+    
+    def _log_available_reels(self):
+        self.logger.info("Current state of available reels:")
+        for size, reels in self.available_reels.items():
+            self.logger.info(f"Size {size}: {len(reels)} reels available")
+            self.logger.debug(f"Size {size} reels: {reels}")   
+
+    def _report_matching_stats(self):
+        total = self.matched_count + self.unmatched_count
+        self.logger.info(f"Matching Statistics:")
+        self.logger.info(f"Total components: {total}")
+        self.logger.info(f"Matched components: {self.matched_count} ({self.matched_count/total*100:.2f}%)")
+        self.logger.info(f"Unmatched components: {self.unmatched_count} ({self.unmatched_count/total*100:.2f}%)")
+
+    def _load_config(self, config_file: str) -> Dict:
+        with open(config_file, 'r') as f:
+            if config_file.endswith('.json'):
+                return json.load(f)
+            elif config_file.endswith('.yaml') or config_file.endswith('.yml'):
+                import yaml  # Only YAML configurations need it
+                return yaml.safe_load(f)
+            else:
+                raise ValueError("Unsupported configuration file format")
+
+    def _cache_key(self) -> Optional[str]:
+        """Job cache key of this split: PCR contents, machine profile and allocation settings"""
+        if not self.job_cache:
+            return None
+        settings = {name: value for name, value in self.config.items()
+                    if name not in ('logging', 'service', 'watch_folders', 'job_cache', 'parallel_sides', 'metrics')}
+        # With feeder pinning the split also depends on the previous outputs it pins to
+        return self.job_cache.key('split', [self.pcr_file] + self.previous_inputs, name=self.pcr_filename,
+                                  profile=self.profile.fingerprint, settings=settings)
+
+    def _template_path(self, group_name: str, suffix: str, folder: Optional[str] = None) -> str:
+        return os.path.join(folder or self.filepath, f"Neoden4_Template{self.pcr_filename}{group_name}{suffix}.csv")
+
+    @staticmethod
+    def _comparable(column: pd.Series) -> pd.Series:
+        """PCR column as text, numbers rounded so CSV round trips compare equal"""
+        numbers = pd.to_numeric(column, errors='coerce')
+        text = column.astype(str).where(column.notna(), '')
+        return text.where(numbers.isna(), numbers.round(4).astype(str))
+
+    def _load_previous_run(self) -> None:
+        """
+        Read the previous split of this PCR from its output files
+
+        Templates give the feeder of every part placed last time; the side
+        and manual placement files give the previous PCR rows, which are
+        diffed against the current PCR by REFDES.
+        """
+        previous_rows = []
+        inputs = []
+        for group_name in ('_Bot', '_Top'):
+            templates = {}
+            allocation = {}
+            for suffix in ('a', 'b'):
+                path = self._template_path(group_name, suffix)
+                if not os.path.exists(path):
+                    continue
+                template = pd.read_csv(path, dtype=str, keep_default_na=False)
+                templates[suffix] = template
+                inputs.append(path)
+                stack = template[(template['#Feeder'] == 'stack') & (template['Footprint'] != '-')]
+                for key, feeder_id in zip(stack['Value'], stack['Feeder ID']):
+                    allocation.setdefault(key, (suffix, feeder_id))
+                side_file = os.path.join(self.filepath, f"{self.pcr_filename}{group_name}{suffix}.csv")
+                if os.path.exists(side_file):
+                    previous_rows.append(pd.read_csv(side_file))
+                    inputs.append(side_file)
+            manual_file = os.path.join(self.filepath, f"Manual_Placement{group_name}.csv")
+            if os.path.exists(manual_file):
+                previous_rows.append(pd.read_csv(manual_file))
+                inputs.append(manual_file)
+            if templates:
+                self.previous_templates[group_name] = templates
+                self.previous_allocation[group_name] = allocation
+        previous_rows = [rows for rows in previous_rows if not rows.empty]
+        if not self.previous_templates or not previous_rows:
+            self.previous_templates.clear()
+            self.previous_allocation.clear()
+            self.logger.info("No previous split found, allocating all feeders")
+            return
+        self.previous_inputs = inputs
+
+        previous = pd.concat(previous_rows, ignore_index=True).drop_duplicates('REFDES').set_index('REFDES')
+        current = self.pcr_df.drop_duplicates('REFDES').set_index('REFDES')
+        added = current.index.difference(previous.index)
+        removed = previous.index.difference(current.index)
+        common = current.index.intersection(previous.index)
+        modified = pd.Series(False, index=common)
+        for column in PCR_DIFF_COLUMNS:
+            if column in current.columns and column in previous.columns:
+                modified |= (self._comparable(current.loc[common, column]) !=
+                             self._comparable(previous.loc[common, column]))
+        self.pcr_changes = {'added': sorted(added), 'removed': sorted(removed),
+                            'modified': sorted(modified.index[modified])}
+        self.logger.info(f"Feeder pinning: {len(added)} added, {len(removed)} removed, "
+                         f"{int(modified.sum())} modified of {len(current)} PCR rows")
+        for change, refdes in self.pcr_changes.items():
+            if refdes:
+                self.logger.info(f"  {change}: {', '.join(map(str, refdes))}")
+
+    def _pin_previous_allocation(self, groups: List[Dict], destinations: List[Tuple],
+                                 slots: Dict[str, TemplateSlots], group_name: str,
+                                 previous: Dict[str, Tuple[str, str]]) -> List[Dict]:
+        """
+        Put parts of the previous run back on the feeders they used
+
+        A group keeps its feeder when that feeder is still vacant and
+        admissible for the group's reel, count and nozzles.
+
+        Returns:
+            The groups still to be allocated
+        """
+        templates = {suffix: (template, placed_rows) for suffix, template, placed_rows in destinations}
+        remaining = []
+        for group in groups:
+            target = previous.get(f"{group['footprint']}/{group['value']}")
+            if target is None or not group.get('Reel'):
+                remaining.append(group)
+                continue
+            suffix, feeder_id = target
+            template, placed_rows = templates[suffix]
+            template_slots = slots[suffix]
+            admissibility = group['admissibility']
+            reel = self.feeder_pool.reel_of.get(feeder_id)
+            bit = self.feeder_pool.bit_of.get(reel, {}).get(feeder_id, 0)
+            if feeder_id in template_slots.limited_rows and feeder_id in admissibility.limited:
+                row_index = template_slots.limited_rows.pop(feeder_id)
+            elif (reel in self._get_reel_progression(str(group['Reel'])) and
+                  admissibility.usable(reel, bit & template_slots.vacant_bits.get(reel, 0))):
+                row_index = template_slots.rows[(reel, feeder_id)]
+                template_slots.fill(self.feeder_pool, reel, feeder_id)
+            else:
+                self.logger.info(f"Feeder {feeder_id} no longer fits {group['footprint']}/{group['value']}, "
+                                 f"reallocating")
+                remaining.append(group)
+                continue
+            self._merge_component_group_data(template, row_index, group)
+            placed_rows.append(group['positions'])
+            self.matched_count += group['count']
+            self.logger.info(f"Kept {group['count']} components of {group['footprint']}/{group['value']} "
+                             f"in Template{group_name}{suffix} on feeder {feeder_id}")
+        return remaining
+
+    def _report_feeder_changes(self) -> None:
+        """Compare the new templates with the previous ones and write the feeders to reload"""
+        changes = []
+        for group_name, templates in self.previous_templates.items():
+            for suffix in ('a', 'b'):
+                path = self._template_path(group_name, suffix, self.output_dir)
+                if suffix not in templates or not os.path.exists(path):
+                    continue
+                parts = []
+                for template in (templates[suffix], pd.read_csv(path, dtype=str, keep_default_na=False)):
+                    stack = template[template['#Feeder'] == 'stack']
+                    parts.append(dict(zip(stack['Feeder ID'], stack['Value'])))
+                before, after = parts
+                for feeder_id in sorted(set(before) | set(after), key=lambda f: (len(f), f)):
+                    old, new = before.get(feeder_id, '-'), after.get(feeder_id, '-')
+                    if old == new:
+                        continue
+                    action = 'load' if old == '-' else 'unload' if new == '-' else 'swap'
+                    changes.append({'Template': f"{group_name}{suffix}", 'Feeder ID': feeder_id,
+                                    'Action': action, 'Previous': old, 'New': new})
+                    self.logger.info(f"Template{group_name}{suffix} feeder {feeder_id}: {action} {old} -> {new}")
+        self.feeder_changes = changes
+        pd.DataFrame(changes, columns=['Template', 'Feeder ID', 'Action', 'Previous', 'New']).to_csv(
+            os.path.join(self.output_dir, FEEDER_CHANGES_FILE), index=False)
+        self.logger.info(f"{len(changes)} feeders need attention, see {FEEDER_CHANGES_FILE}")
+
+    def output_files(self) -> List[str]:
+        """Files a split writes next to the PCR (into the stage while running), those that exist"""
+        names = []
+        for group_name in ('_Bot', '_Top'):
+            for suffix in ('a', 'b'):
+                names.append(f"Neoden4_Template{self.pcr_filename}{group_name}{suffix}.csv")
+                names.append(f"{self.pcr_filename}{group_name}{suffix}.csv")
+            names.append(f"Manual_Placement{group_name}.csv")
+        if self.feeder_changes is not None:
+            names.append(FEEDER_CHANGES_FILE)
+        paths = [os.path.join(self.output_dir, name) for name in names]
+        return [path for path in paths if os.path.exists(path)]
+
+    def _should_skip_component(self, pcr_row: pd.Series) -> bool:
+        return self.ignore_matcher.matches(pcr_row)
+
+    def _process_group(self, pcr_data: pd.DataFrame, group_name: str):
+        """Process a group of PCR data with smart feeder assignment"""
+        try:
+            with span(f'side {group_name}', rows=len(pcr_data)):
+                # Row positions per output file; frames are materialized once at the end
+                table = ComponentTable.from_dataframe(pcr_data)
+                manual_rows = []
+                fiducial_rows = []
+                template_a = self.neoden4_df.copy()  # Create exact copy of base template
+                template_b = self.neoden4_df.copy()
+                destinations = [('a', template_a, []), ('b', template_b, [])]
+                slots = {suffix: self.feeder_pool.template_slots(template) for suffix, template, _ in destinations}
+
+                # Create component groups and sort by count
+                if self.progress_callback:
+                    self.progress_callback(10, 100, f"Creating component groups for {group_name}")
+                
+                with span('component groups', side=group_name):
+                    component_groups = self._create_component_groups(table)
+
+                # Check every group against the feeder constraint table in one pass
+                for group, admissibility in zip(component_groups,
+                                                self.feeder_pool.admissibility(component_groups)):
+                    group['admissibility'] = admissibility
+            
+                # Split groups by count
+                low_count_groups = []
+                high_count_groups = []
+                low_count_limit = self.feeder_pool.constraints.low_count_limit
+            
+                for group in component_groups:
+                    if group['count'] <= low_count_limit:
+                        low_count_groups.append(group)
+                    else:
+                        high_count_groups.append(group)
+                    
+                # Sort groups
+                high_count_groups.sort(key=lambda x: x['count'], reverse=True)
+                low_count_groups.sort(key=lambda x: x['count'], reverse=True)
+
+                # Unchanged parts go back on last run's feeders before anything new is allocated
+                previous = self.previous_allocation.get(group_name)
+                if previous:
+                    high_count_groups = self._pin_previous_allocation(high_count_groups, destinations, slots,
+                                                                      group_name, previous)
+                    low_count_groups = self._pin_previous_allocation(low_count_groups, destinations, slots,
+                                                                     group_name, previous)
+            
+                if self.progress_callback:
+                    self.progress_callback(20, 100, 
+                        f"Sorted components - {len(high_count_groups)} high count, {len(low_count_groups)} low count groups")
+
+                # Allocate feeders, falling back to the greedy pass if the solver gives up
+                with span('allocate feeders', side=group_name,
+                          groups=len(high_count_groups) + len(low_count_groups)):
+                    allocated = False
+                    if self.config.get('feeder_allocation', 'greedy') == 'optimal':
+                        allocated = self._allocate_optimal(table, high_count_groups + low_count_groups,
+                                                           destinations, slots, group_name,
+                                                           manual_rows, fiducial_rows)
+                    if not allocated:
+                        self._allocate_greedy(table, high_count_groups, low_count_groups,
+                                              destinations, slots, group_name,
+                                              manual_rows, fiducial_rows)
+
+                # Add fiducials and save files
+                if self.progress_callback:
+                    self.progress_callback(80, 100, f"Adding fiducials and saving files for {group_name}")
+
+                manual_placement = table.frame(self._concat_positions(manual_rows))
+                fiducials = table.frame(self._concat_positions(fiducial_rows))
+            
+                for suffix, template, placed_rows in destinations:
+                    self._save_template(template, f"{group_name}{suffix}")
+                for suffix, template, placed_rows in destinations:
+                    pcr_out = table.frame(self._concat_positions(placed_rows + fiducial_rows))
+                    self._save_pcr(pcr_out, f"{group_name}{suffix}")
+                self._save_manual_placement(manual_placement, group_name)
+                self._count_placements(table, destinations, group_name)
+                metrics.count('manual_placements', len(manual_placement))
+                metrics.count('fiducials', len(fiducials))
+
+                if self.progress_callback:
+                    self.progress_callback(100, 100, f"Completed processing {group_name}")
+
+                self._log_placement_statistics(group_name, template_a, template_b, 
+                                            manual_placement, fiducials)
+                
+        except Exception as e:
+            self.logger.error(f"Error in _process_group: {str(e)}", exc_info=True)
+            raise
+
+    def _count_placements(self, table: 'ComponentTable', destinations: List[Tuple], group_name: str):
+        """Add the placements of each allocated feeder to the run's metrics, labelled <file>/<Feeder ID>"""
+        if metrics.current_run() is None:
+            return
+        for suffix, template, placed_rows in destinations:
+            feeder_of = dict(zip(template['Value'], template['Feeder ID']))
+            feeders = []
+            for positions in placed_rows:
+                first = table.row(positions[0])
+                feeder_id = feeder_of.get(f"{first.footprint}/{first.value}")
+                feeders += [f"{group_name}{suffix}".lstrip('_') + f"/{feeder_id}"] * len(positions)
+            metrics.add_placements(feeders=feeders)
+
+    def _allocate_greedy(self, table: 'ComponentTable', high_count_groups: List[Dict],
+                         low_count_groups: List[Dict], destinations: List[Tuple],
+                         slots: Dict[str, TemplateSlots], group_name: str,
+                         manual_rows: List[np.ndarray], fiducial_rows: List[np.ndarray]):
+        """Greedy allocation: high-count groups first, first free feeder of the smallest reel"""
+        # Process components in sorted order
+        total_groups = len(low_count_groups) + len(high_count_groups)
+        current_group = 0
+
+        # First process high count groups
+        self.logger.info("Processing high count groups first...")
+        for group in high_count_groups:
+            if self.progress_callback:
+                progress = 20 + int((current_group / total_groups) * 60)
+                self.progress_callback(progress, 100, 
+                    f"Processing high count group {group['footprint']}/{group['value']} (count: {group['count']})")
+        
+            # Try placement in templates
+            for suffix, template, placed_rows in destinations:
+                self._reset_available_feeders()
+                result, reel, feeder = self._place_component_group(template, group, allow_limited=False,
+                                                                   slots=slots[suffix])
+                
+                if result in [PlacementResult.PLACED, PlacementResult.ALREADY_PLACED]:
+                    placed_rows.append(group['positions'])
+                    self.matched_count += group['count']
+                    self.logger.info(f"Placed high count group {group['footprint']}/{group['value']} "
+                                f"(count: {group['count']}) on feeder {feeder}")
+                    break
+                    
+            if result == PlacementResult.NOT_PLACED:
+                manual_rows.append(group['positions'])
+                self.unmatched_count += group['count']
+                self.logger.warning(f"Could not place high count group {group['footprint']}/{group['value']} "
+                                f"(count: {group['count']})")
+                
+            current_group += 1
+
+        # Process low count groups
+        self.logger.info("Processing low count groups...")
+        for group in low_count_groups:
+            if self.progress_callback:
+                progress = 20 + int((current_group / total_groups) * 60)
+                self.progress_callback(progress, 100, 
+                    f"Processing low count group {group['footprint']}/{group['value']} (count: {group['count']})")
+            
+            # Handle fiducials
+            if self._is_fiducial(table.row(group['positions'][0])):
+                fiducial_rows.append(group['positions'])
+                current_group += 1
+                continue
+
+            # Try placement in templates
+            for suffix, template, placed_rows in destinations:
+                self._reset_available_feeders()
+                result, reel, feeder = self._place_component_group(template, group, allow_limited=True,
+                                                                   slots=slots[suffix])
+                
+                if result in [PlacementResult.PLACED, PlacementResult.ALREADY_PLACED]:
+                    placed_rows.append(group['positions'])
+                    self.matched_count += group['count']
+                    action_word = "Found" if result == PlacementResult.ALREADY_PLACED else "Placed"
+                    self.logger.info(f"{action_word} {group['count']} components of "
+                        f"{group['footprint']}/{group['value']} in Template{group_name}"
+                        f"{suffix} using reel {reel}, feeder {feeder}")
+                    break
+
+            if result == PlacementResult.NOT_PLACED:
+                manual_rows.append(group['positions'])
+                self.unmatched_count += group['count']
+                self.logger.warning(f"Could not place low count group {group['footprint']}/{group['value']} "
+                                f"(count: {group['count']})")
+                
+            current_group += 1
+
+    def _allocate_optimal(self, table: 'ComponentTable', groups: List[Dict],
+                          destinations: List[Tuple], slots: Dict[str, TemplateSlots],
+                          group_name: str, manual_rows: List[np.ndarray],
+                          fiducial_rows: List[np.ndarray]) -> bool:
+        """
+        Allocate all groups at once with FeederAllocationSolver
+
+        Maximizes machine-placed parts, then minimizes template usage.
+        Groups are handed their feeders in the greedy processing order so
+        output files keep the same layout.
+
+        Returns:
+            False if the solver ran out of time (nothing has been placed)
+        """
+        if self.progress_callback:
+            self.progress_callback(30, 100, f"Solving feeder allocation for {group_name}")
+
+        templates = {suffix: (template, placed_rows) for suffix, template, placed_rows in destinations}
+        first_suffix = destinations[0][0]
+        fiducial_groups = set()
+        already_placed = set()
+        candidates = []
+        for i, group in enumerate(groups):
+            if self._is_fiducial(table.row(group['positions'][0])):
+                fiducial_groups.add(i)
+            elif self._is_duplicate_in_template(templates[first_suffix][0], group['footprint'], group['value']):
+                already_placed.add(i)
+            elif group.get('Reel'):
+                candidates.append(i)
+
+        solver = FeederAllocationSolver(self.feeder_pool, slots, self._get_reel_progression, self.logger)
+        solution = solver.solve([groups[i] for i in candidates],
+                                float(self.config.get('allocation_time_budget', 2.0)))
+        if solution is None:
+            self.logger.warning(f"Falling back to greedy feeder allocation for {group_name}")
+            return False
+        assigned = {candidates[k]: target for k, target in solution.items()}
+
+        for i, group in enumerate(groups):
+            component_key = f"{group['footprint']}/{group['value']}"
+            if i in fiducial_groups:
+                fiducial_rows.append(group['positions'])
+                continue
+            if i in already_placed:
+                templates[first_suffix][1].append(group['positions'])
+                self.matched_count += group['count']
+                self.logger.info(f"Found {group['count']} components of {component_key} "
+                                 f"in Template{group_name}{first_suffix}")
+                continue
+            if i not in assigned:
+                manual_rows.append(group['positions'])
+                self.unmatched_count += group['count']
+                self.logger.warning(f"Could not place group {component_key} (count: {group['count']})")
+                continue
+
+            suffix, reel = assigned[i]
+            template, placed_rows = templates[suffix]
+            template_slots = slots[suffix]
+            if reel.startswith('feeder '):
+                feeder_id = reel[len('feeder '):]
+                reel = self.feeder_pool.reel_of[feeder_id]
+                if feeder_id in template_slots.limited_rows:
+                    row_index = template_slots.limited_rows.pop(feeder_id)
+                else:
+                    row_index = template_slots.rows[(reel, feeder_id)]
+                    template_slots.fill(self.feeder_pool, reel, feeder_id)
+            else:
+                # Unrestricted class: restricted feeders are handed out separately
+                feeder_id = self.feeder_pool.first_feeder(reel, self.feeder_pool.full_bits[reel] &
+                                                          template_slots.vacant_bits[reel] &
+                                                          ~self.feeder_pool.restricted_bits[reel])
+                row_index = template_slots.rows[(reel, feeder_id)]
+                template_slots.fill(self.feeder_pool, reel, feeder_id)
+
+            self._merge_component_group_data(template, row_index, group)
+            placed_rows.append(group['positions'])
+            self.matched_count += group['count']
+            self.logger.info(f"Placed {group['count']} components of {component_key} in "
+                             f"Template{group_name}{suffix} using reel {reel}, feeder {feeder_id}")
+
+        self.logger.info(f"Optimal allocation for {group_name}: {len(assigned)} groups on feeders, "
+                         f"{len(candidates) - len(assigned)} groups left for manual placement")
+        return True
+
+    @staticmethod
+    def _concat_positions(position_arrays: List[np.ndarray]) -> np.ndarray:
+        """Join collected row-position arrays, keeping collection order"""
+        if not position_arrays:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(position_arrays)
+
+    def _place_component_group(self, template: pd.DataFrame, group: Dict, 
+                            allow_limited: bool = True,
+                            slots: Optional[TemplateSlots] = None) -> Tuple[PlacementResult, Optional[str], Optional[str]]:
+        """
+        Place a component group in the template with proper reel size and feeder restrictions
+
+        Args:
+            template: Template copy to place into
+            group: Component group from _create_component_groups
+            allow_limited: Whether feeders with a placement limit may be used
+            slots: Vacant-feeder state of ``template``; rebuilt from the
+                template when omitted
+        """
+        component_key = f"{group['footprint']}/{group['value']}"
+        count = group['count']
+        if slots is None:
+            slots = self.feeder_pool.template_slots(template)
+        
+        self.logger.info(f"Attempting to place {component_key} with count {count}, allow_limited={allow_limited}")
+        
+        if not group.get('Reel'):
+            self.logger.warning(f"No reel information for component group {component_key}")
+            return PlacementResult.NOT_PLACED, None, None
+        
+        # Get the initial reel size for this component
+        initial_reel = str(group['Reel'])
+        
+        self.logger.info(f"Initial reel size for {component_key}: {initial_reel}")
+        
+        admissibility = group.get('admissibility') or self.feeder_pool.admissibility([group])[0]
+
+        # Limited feeders that accept this group are tried first
+        if allow_limited:
+            for feeder_id in admissibility.limited:
+                self.logger.debug(f"Checking Feeder {feeder_id} for {component_key}")
+                row_index = slots.limited_rows.get(feeder_id)
+                if row_index is None:
+                    continue
+                if self._is_duplicate_in_template(template, group['footprint'], group['value']):
+                    break
+                self._merge_component_group_data(template, row_index, group)
+                del slots.limited_rows[feeder_id]
+                reel = self.feeder_pool.reel_of[feeder_id]
+                self.logger.info(f"Placed low-count component {component_key} on Feeder {feeder_id}")
+                return PlacementResult.PLACED, reel, feeder_id
+        
+        # Get allowed reel sizes for this component
+        allowed_reels = self._get_reel_progression(initial_reel)
+        if not allowed_reels:
+            return PlacementResult.NOT_PLACED, None, None
+            
+        # Try each possible reel size
+        for reel in allowed_reels:
+            # Get available feeders for this reel size
+            available_bits = admissibility.usable(reel, self.feeder_state.bits.get(reel, 0))
+            if not available_bits:
+                self.logger.debug(f"No available feeders for reel size {reel}")
+                continue
+                
+            # First available feeder with a vacant position in the template
+            feeder_id = self.feeder_pool.first_feeder(reel, available_bits & slots.vacant_bits.get(reel, 0))
+            if feeder_id is None:
+                self.logger.debug(f"No vacant position on reel {reel} for {component_key}")
+                continue
+
+            # Check if component is already placed
+            if self._is_duplicate_in_template(template, group['footprint'], group['value']):
+                self.logger.info(f"Component {component_key} already exists in template")
+                return PlacementResult.ALREADY_PLACED, reel, feeder_id
+            
+            # Place the component
+            self._merge_component_group_data(template, slots.rows[(reel, feeder_id)], group)
+            
+            # Remove the used feeder from available feeders and the template's vacancies
+            self.feeder_state.take(reel, feeder_id)
+            slots.fill(self.feeder_pool, reel, feeder_id)
+            
+            self.logger.info(
+                f"Placed component group {component_key} "
+                f"(count: {count}) using feeder {feeder_id} on reel {reel}"
+            )
+            return PlacementResult.PLACED, reel, feeder_id
+        
+        self.logger.warning(
+            f"Could not place component group {component_key} "
+            f"(count: {count}) on any available feeder"
+        )
+        return PlacementResult.NOT_PLACED, None, None
+
+    def _log_placement_statistics(self, group_name: str, template_a: pd.DataFrame, 
+                                template_b: pd.DataFrame, manual_placement: pd.DataFrame, 
+                                fiducials: pd.DataFrame) -> None:
+        """Log detailed placement statistics"""
+        limited_counts = {feeder_id: sum(int(((template['Feeder ID'].astype(str) == feeder_id) &
+                                              (template['Footprint'] != '-')).sum())
+                                         for template in (template_a, template_b))
+                          for feeder_id in self.feeder_pool.limited}
+        
+        self.logger.info(f"Group {group_name} processing complete:")
+        self.logger.info(f"  Components in {group_name}a: {len(template_a)}")
+        self.logger.info(f"  Components in {group_name}b: {len(template_b)}")
+        self.logger.info(f"  Components in manual_placement: {len(manual_placement)}")
+        self.logger.info(f"  Fiducials: {len(fiducials)}")
+        for feeder_id, loaded in limited_counts.items():
+            self.logger.info(f"  Component groups assigned to Feeder #{feeder_id}: {loaded}")
+        self.logger.info(f"  Total matched components: {self.matched_count}")
+        self.logger.info(f"  Total unmatched components: {self.unmatched_count}")
+
+    def _is_duplicate_in_template(self, template: pd.DataFrame, footprint: str, value: str) -> bool:
+        return ((template['Footprint'] == footprint) & (template['Value'] == f"{footprint}/{value}")).any()
+
+# ---- Parallel Side Workers ----
+class _LoggerDispatcher:
+    """QueueListener target that hands worker records to the logger that made them"""
+    level = logging.NOTSET
+
+    def handle(self, record: logging.LogRecord) -> None:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+def _logger_levels() -> Dict[str, int]:
+    """Levels set in this process: '' for the root, then every logger with its own level"""
+    levels = {'': logging.getLogger().level}
+    for name, logger in logging.root.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logger.level
+    return levels
+
+
+def _init_side_worker(log_queue, trace: bool = False, levels: Optional[Dict[str, int]] = None,
+                      disable: int = logging.NOTSET) -> None:
+    """
+    Route all logging in a side worker process to the parent's queue, and record spans if the parent does
+
+    The parent's logger levels are applied here, so records it would drop are not sent at all.
+    """
+    for logger in [logging.getLogger()] + [logging.getLogger(name) for name in logging.root.manager.loggerDict]:
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    for name, level in (levels or {'': logging.WARNING}).items():
+        logging.getLogger(name or None).setLevel(level)
+    logging.disable(disable)
+    if trace:
+        start_tracing()
+
+
+def _process_side(splitter: PCR_File_Splitter, group_name: str) -> Dict:
+    """Worker entry point: process one board side of a PCR_File_Splitter"""
+    splitter.matched_count = 0
+    splitter.unmatched_count = 0
+    splitter.logger.info(f"Processing group: {group_name}")
+    with metrics.metrics_run('split', group_name, publish=False) as run:
+        splitter._process_group(splitter._group_pcr_data()[group_name], group_name)
+    return {
+        'group': group_name,
+        'matched': splitter.matched_count,
+        'unmatched': splitter.unmatched_count,
+        'spans': collect_spans(),  # Recorded only when the parent traces
+        'metrics': run.partial()  # Merged into the parent's run
+    }
@@ -0,0 +1,302 @@
+"""
+Local job service: JobRunner, the N4Service HTTP daemon and its client
+
+JobRunner runs generate/split/override/sort jobs given as JSON-style
+dicts; N4Service puts it behind a localhost HTTP endpoint with a bounded
+worker pool. Nothing here imports tkinter, so the service runs headless.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import urllib.request
+import urllib.error
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+
+from .override import override_templates
+from .paths import PCR_FILES_DIR
+from .processing import (DEFAULT_BOARD_GAP, MachineProfile, PCBDataProcessor, PCBProcessingError,
+                         PCR_File_Splitter)
+from .trace import span
+
+# Local job service; overridden by the "service" section of configuration.json
+DEFAULT_SERVICE_CONFIG = {'enabled': False, 'host': '127.0.0.1', 'port': 8765, 'workers': 2, 'max_pending': 8}
+
+
+def load_service_config(pcr_dir: str = PCR_FILES_DIR) -> Dict:
+    """Service settings from configuration.json merged over DEFAULT_SERVICE_CONFIG"""
+    service_config = dict(DEFAULT_SERVICE_CONFIG)
+    config_file = os.path.join(pcr_dir, "configuration.json")
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            service_config.update(json.load(f).get('service', {}))
+    return service_config
+
+
+class JobRunner:
+    """
+    Runs generate/split/override/sort jobs given as JSON-style dicts.
+
+    Keeps the machine profile warm between jobs; the profile is reloaded
+    only when a machine file changes. Every job gets its own
+    PCBDataProcessor, whose per-job state (last_board, unmatched_file)
+    concurrent service workers would otherwise overwrite.
+    """
+    JOB_TYPES = ('generate', 'split', 'override', 'sort')
+
+    def __init__(self, pcr_dir: str = PCR_FILES_DIR, use_cache: bool = True):
+        self.logger = logging.getLogger('JobRunner')
+        self.pcr_dir = pcr_dir
+        self.use_cache = use_cache
+        self.config_file = os.path.join(pcr_dir, "configuration.json")
+        self._lock = threading.Lock()
+        self.profile = self._load_profile()
+
+    def _load_profile(self) -> MachineProfile:
+        config = {}
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+        return MachineProfile.load_or_compile(MachineProfile.source_paths(self.pcr_dir),
+                                              MachineProfile.resolve_path(self.pcr_dir, config), self.logger)
+
+    def current_profile(self) -> MachineProfile:
+        """Warm profile, refreshed if a machine file changed since it was loaded"""
+        with self._lock:
+            if not self.profile.is_current(MachineProfile.source_paths(self.pcr_dir)):
+                self.logger.info("Machine files changed, reloading profile")
+                self.profile = self._load_profile()
+            return self.profile
+
+    @staticmethod
+    def _sort_config(params: Dict) -> Dict:
+        sort_config = {'columns': [], 'ascending': True, 'inplace': True, 'side': "False",
+                       'board_gap': DEFAULT_BOARD_GAP}
+        sort_config.update(params.get('sort_config') or {})
+        sort_config['side'] = str(sort_config['side'])
+        return sort_config
+
+    def run(self, job: Dict) -> Dict:
+        """
+        Run one job
+
+        Args:
+            job: {'type': one of JOB_TYPES, 'params': {...}}
+
+        Returns:
+            Job-specific result dict
+        """
+        job_type = job.get('type')
+        params = job.get('params') or {}
+        if job_type not in self.JOB_TYPES:
+            raise PCBProcessingError(f"Unknown job type: {job_type}")
+        profile = self.current_profile()
+        self.logger.info(f"Running {job_type} job: {params}")
+
+        with span(f'job {job_type}'):
+            if job_type == 'generate':
+                widths = []
+                processor = PCBDataProcessor(profile, self.use_cache)
+                output_file = processor.generate_csv(
+                    params['pcb_file'], params['template_file'], float(params.get('pcb_width') or 0),
+                    self._sort_config(params), width_callback=widths.append)
+                return {'output_file': output_file, 'pcb_width': widths[-1] if widths else None,
+                        'unmatched_file': processor.unmatched_file}
+
+            if job_type == 'split':
+                component_table_file = params.get('component_table_file') or os.path.join(self.pcr_dir, "Component_Table.csv")
+                neoden4_file = params.get('neoden4_file') or os.path.join(self.pcr_dir, "Neoden4.csv")
+                use_warm = (MachineProfile.source_paths(self.pcr_dir, template=neoden4_file,
+                                                        components=component_table_file)
+                            == MachineProfile.source_paths(self.pcr_dir))
+                splitter = PCR_File_Splitter(params['pcr_file'], component_table_file, neoden4_file,
+                                             params.get('config_file') or self.config_file,
+                                             profile=profile if use_warm else None, use_cache=self.use_cache)
+                splitter.process_files(params.get('parallel'))
+                return {'output_dir': splitter.filepath, 'matched': splitter.matched_count,
+                        'unmatched': splitter.unmatched_count, 'pcr_changes': splitter.pcr_changes,
+                        'feeder_changes': splitter.feeder_changes}
+
+            if job_type == 'override':
+                return override_templates(params['base_file'], params['second_file'], self.logger)
+
+            processor = PCBDataProcessor(profile, self.use_cache)
+            return {'output_file': processor.sort_generated_file(params['file'], self._sort_config(params))}
+
+
+class N4Service:
+    """
+    Localhost HTTP daemon in front of a warm JobRunner.
+
+    POST /jobs        {"type": ..., "params": {...}, "wait": true}
+    GET  /jobs/<id>   job record
+    GET  /status      pool and profile information
+
+    Jobs run on a bounded thread pool; when all workers are busy and
+    max_pending jobs are queued, new jobs are refused with 503.
+    """
+    MAX_JOB_RECORDS = 200
+
+    def __init__(self, runner: JobRunner, host: str, port: int, workers: int, max_pending: int):
+        self.logger = logging.getLogger('N4Service')
+        self.runner = runner
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='n4-job')
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+        self.jobs: Dict[str, Dict] = {}
+        self.futures = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.logger.info(f"Service listening on http://{host}:{self.server.server_port}")
+
+    def submit(self, job: Dict) -> Optional[str]:
+        """Queue a job, returning its id, or None if the queue is full"""
+        if not self.slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._next_id += 1
+            job_id = str(self._next_id)
+            self.jobs[job_id] = {'id': job_id, 'type': job.get('type'), 'status': 'queued',
+                                 'submitted': datetime.now().isoformat(timespec='seconds')}
+            while len(self.jobs) > self.MAX_JOB_RECORDS:
+                oldest = next(iter(self.jobs))
+                self.jobs.pop(oldest)
+                self.futures.pop(oldest, None)
+            self.futures[job_id] = self.executor.submit(self._run, job_id, job)
+        return job_id
+
+    def _run(self, job_id: str, job: Dict) -> None:
+        record = self.jobs[job_id]
+        record['status'] = 'running'
+        start = time.perf_counter()
+        try:
+            record['result'] = self.runner.run(job)
+            record['status'] = 'done'
+        except Exception as e:
+            self.logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            record['error'] = str(e)
+            record['status'] = 'failed'
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            self.slots.release()
+
+    def wait(self, job_id: str) -> Dict:
+        future = self.futures.get(job_id)
+        if future is not None:
+            future.result()
+        return self.jobs[job_id]
+
+    def status(self) -> Dict:
+        states = Counter(record['status'] for record in list(self.jobs.values()))
+        return {'workers': self.workers, 'jobs': dict(states),
+                'profile': self.runner.profile.payload['compiled']}
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code: int, body: Dict) -> None:
+                data = json.dumps(body, default=str).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/status':
+                    self._reply(200, service.status())
+                elif self.path.startswith('/jobs/') and self.path[len('/jobs/'):] in service.jobs:
+                    self._reply(200, service.jobs[self.path[len('/jobs/'):]])
+                else:
+                    self._reply(404, {'error': f"Not found: {self.path}"})
+
+            def do_POST(self):
+                if self.path != '/jobs':
+                    self._reply(404, {'error': f"Not found: {self.path}"})
+                    return
+                try:
+                    job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                except ValueError as e:
+                    self._reply(400, {'error': f"Invalid JSON: {str(e)}"})
+                    return
+                if job.get('type') not in JobRunner.JOB_TYPES:
+                    self._reply(400, {'error': f"Unknown job type: {job.get('type')}"})
+                    return
+                job_id = service.submit(job)
+                if job_id is None:
+                    self._reply(503, {'error': "Service busy, try again later"})
+                elif job.get('wait', True):
+                    self._reply(200, service.wait(job_id))
+                else:
+                    self._reply(202, service.jobs[job_id])
+
+            def log_message(self, format, *args):
+                service.logger.debug(format % args)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.executor.shutdown(wait=True)
+
+    def shutdown(self) -> None:
+        self.server.shutdown()
+
+
+class ServiceClient:
+    """Thin client for N4Service used by the GUI and the command line"""
+
+    def __init__(self, host: str = DEFAULT_SERVICE_CONFIG['host'],
+                 port: int = DEFAULT_SERVICE_CONFIG['port'], timeout: Optional[float] = None):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, service_config: Dict) -> 'ServiceClient':
+        return cls(service_config['host'], int(service_config['port']))
+
+    def _request(self, path: str, body: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise PCBProcessingError(json.loads(e.read() or b'{}').get('error', str(e)))
+
+    def available(self) -> bool:
+        """True if a service answers on the configured port"""
+        try:
+            self._request('/status', timeout=0.5)
+            return True
+        except (OSError, PCBProcessingError, ValueError):
+            return False
+
+    def submit(self, job_type: str, params: Dict, wait: bool = True) -> Dict:
+        """
+        Submit a job
+
+        Returns:
+            The finished job's result when waiting, otherwise the queued job record
+
+        Raises:
+            PCBProcessingError: if the service refused the job or the job failed
+        """
+        record = self._request('/jobs', {'type': job_type, 'params': params, 'wait': wait})
+        if record.get('status') == 'failed':
+            raise PCBProcessingError(record.get('error', "Job failed"))
+        return record.get('result', record) if wait else record
+
+    def job(self, job_id: str) -> Dict:
+        return self._request(f'/jobs/{job_id}')
@@ -0,0 +1,153 @@
+"""
+Opt-in timeline of pipeline spans, exported as Chrome trace-event JSON
+
+    start_tracing("run.trace.json")
+    with span("generate_csv", file=pcb_file):
+        ...
+    stop_tracing()  # Writes the file; open it in chrome://tracing or Perfetto
+
+Every span records its process and thread, so overlapping batch jobs and
+the parallel side workers show up as separate tracks. While tracing is
+off and no span sink (the metrics of a run) listens on the thread, span()
+records nothing.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import contextlib
+from typing import Dict, List, Optional
+
+_recorder: Optional['TraceRecorder'] = None
+_local = threading.local()  # Per-thread span sink
+
+
+class TraceRecorder:
+    """Collects complete ("X") trace events of this process"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.events: List[Dict] = []
+        self.threads: Dict[int, str] = {}
+
+    def add(self, name: str, start_ns: int, end_ns: int, args: Dict) -> None:
+        thread = threading.current_thread()
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = thread.name
+        event = {'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                 'ts': start_ns / 1000, 'dur': (end_ns - start_ns) / 1000}
+        if args:
+            event['args'] = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                             for key, value in args.items()}
+        self.events.append(event)  # list.append is atomic, no lock needed
+
+    def merge(self, events: List[Dict]) -> None:
+        """Add events recorded by another process (a side worker)"""
+        self.events.extend(events)
+
+    def export(self) -> List[Dict]:
+        """Recorded events with process and thread name metadata"""
+        pid = os.getpid()
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                     'args': {'name': f"N4 File Creator ({pid})"}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                     for tid, name in self.threads.items()]
+        for worker in sorted({event['pid'] for event in self.events} - {pid}):
+            metadata.append({'name': 'process_name', 'ph': 'M', 'pid': worker, 'tid': 0,
+                             'args': {'name': f"Side worker ({worker})"}})
+        return metadata + sorted(self.events, key=lambda event: event['ts'])
+
+    def write(self, path: Optional[str] = None) -> str:
+        """Write the trace file atomically and return its path"""
+        path = path or self.path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'traceEvents': self.export(), 'displayTimeUnit': 'ms'}, f)
+        os.replace(temp_path, path)
+        return path
+
+
+@contextlib.contextmanager
+def span(name: str, **args):
+    """
+    Record the enclosed block as one span when tracing is on
+
+    Yields the span's args; add e.g. rows_out once the block knows it.
+    """
+    recorder = _recorder
+    sink = getattr(_local, 'sink', None)
+    if recorder is None and sink is None:
+        yield args
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        end = time.perf_counter_ns()
+        if recorder is not None:
+            recorder.add(name, start, end, args)
+        if sink is not None:
+            sink.add_stage(name, (end - start) / 1e9, args)
+
+
+def set_span_sink(sink) -> Optional[object]:
+    """
+    Also hand this thread's spans to ``sink.add_stage(name, seconds, args)``
+
+    Returns:
+        The sink it replaces, None for none
+    """
+    previous = getattr(_local, 'sink', None)
+    _local.sink = sink
+    return previous
+
+
+def start_tracing(path: Optional[str] = None) -> TraceRecorder:
+    """
+    Start recording spans in this process
+
+    Args:
+        path: Trace file written by stop_tracing; None keeps the events in
+            memory only (side workers hand them back to their parent)
+
+    Returns:
+        The active recorder
+    """
+    global _recorder
+    _recorder = TraceRecorder(path)
+    return _recorder
+
+
+def tracing_enabled() -> bool:
+    """True while spans are recorded"""
+    return _recorder is not None
+
+
+def collect_spans() -> List[Dict]:
+    """Take the events recorded so far, leaving the recorder empty"""
+    if _recorder is None:
+        return []
+    events, _recorder.events = _recorder.events, []
+    return events
+
+
+def merge_spans(events: List[Dict]) -> None:
+    """Add events of another process to the active trace"""
+    if _recorder is not None and events:
+        _recorder.merge(events)
+
+
+def stop_tracing() -> Optional[str]:
+    """Stop recording and write the trace file, returning its path"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None or not recorder.path:
+        return None
+    return recorder.write()
+
+
+atexit.register(stop_tracing)
@@ -0,0 +1,318 @@
+"""
+Watch-folder automation: split and generate PCR exports dropped into folders
+
+FolderWatcher feeds new or changed PCR files through a JobRunner, using
+the Generate CSV settings saved per board folder. Nothing here imports
+tkinter, so the watcher runs headless.
+"""
+import os
+import re
+import json
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .paths import PCR_FILES_DIR
+from .processing import DEFAULT_BOARD_GAP, PCR_REPORT_EXTENSIONS, PCRReportParser
+from .service import JobRunner
+
+# Watch-folder automation; overridden by the "watch_folders" section of configuration.json
+DEFAULT_WATCH_CONFIG = {'folders': [], 'poll_interval': 2.0, 'debounce': 3.0, 'workers': 2, 'use_inotify': True}
+BOARD_SETTINGS_FILE = "board_settings.json"  # Saved per board folder by Generate CSV
+DEFAULT_WATCH_SORT = {'columns': ['XY_DIST'], 'ascending': True, 'inplace': True, 'board_gap': DEFAULT_BOARD_GAP}
+
+
+def load_watch_config(pcr_dir: str = PCR_FILES_DIR) -> Dict:
+    """Watch-folder settings from configuration.json merged over DEFAULT_WATCH_CONFIG"""
+    watch_config = dict(DEFAULT_WATCH_CONFIG)
+    config_file = os.path.join(pcr_dir, "configuration.json")
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            watch_config.update(json.load(f).get('watch_folders', {}))
+    return watch_config
+
+
+def load_board_settings(board_dir: str) -> Dict:
+    """Saved Generate CSV settings of a board folder, or the watch defaults"""
+    settings = {'pcb_width': 0.0, 'sort_config': dict(DEFAULT_WATCH_SORT)}
+    settings_file = os.path.join(board_dir, BOARD_SETTINGS_FILE)
+    if os.path.exists(settings_file):
+        with open(settings_file, 'r') as f:
+            saved = json.load(f)
+        settings['pcb_width'] = float(saved.get('pcb_width') or 0)
+        settings['sort_config'].update(saved.get('sort_config') or {})
+    return settings
+
+
+def save_board_settings(board_dir: str, pcb_width: float, sort_config: Dict) -> None:
+    """Store the width and sort options used for a board; the side is chosen per file"""
+    try:
+        with open(os.path.join(board_dir, BOARD_SETTINGS_FILE), 'w') as f:
+            json.dump({'pcb_width': pcb_width,
+                       'sort_config': {key: value for key, value in sort_config.items() if key != 'side'}},
+                      f, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not save board settings in {board_dir}: {str(e)}")
+
+
+class _InotifySource:
+    """Linux inotify change source for a set of folder trees"""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, folders: List[str]):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for folder in folders:
+            for root, _, _ in os.walk(folder):
+                self._add_watch(root)
+
+    def _add_watch(self, folder: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder),
+                                         self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.watches[wd] = folder
+
+    def changes(self, timeout: float) -> set:
+        """Paths created or written within timeout seconds"""
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if wd not in self.watches or not name:
+                continue
+            path = os.path.join(self.watches[wd], name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_watch(path)
+                    changed.update(os.path.join(path, entry) for entry in os.listdir(path))
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _PollingSource:
+    """Portable change source: compares (size, mtime) snapshots of folder trees"""
+
+    def __init__(self, folders: List[str], interval: float):
+        self.folders = folders
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for folder in self.folders:
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def changes(self, timeout: float) -> set:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path, signature in snapshot.items() if self.snapshot.get(path) != signature}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class FolderWatcher:
+    """
+    Watch-folder automation: split and generate new or changed PCR exports.
+
+    Folders are watched with inotify where available, otherwise polled.
+    A file is queued once its size and mtime have been stable for the
+    debounce period, then runs through split and generate for every side
+    with the board folder's saved settings. Jobs for different files run
+    concurrently; each writes <pcr name>.status.json next to the PCR.
+    """
+    PCR_COLUMNS = {'REFDES', 'SYM_NAME', 'SYM_X', 'SYM_Y'}
+    OUTPUT_PATTERN = re.compile(r'(_(Top|Bot)[ab]|_sorted)\.csv$|^(N4_|Neoden4_Template|Manual_Placement_|'
+                                r'manual_assignment|template_override_|Component_Replacements|Feeder_Changes|~\$)')
+    SIDES = [('Topa', "False"), ('Topb', "False"), ('Bota', "True"), ('Botb', "True")]
+
+    def __init__(self, folders: List[str], runner: JobRunner, watch_config: Dict):
+        self.logger = logging.getLogger('FolderWatcher')
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.runner = runner
+        self.debounce = float(watch_config['debounce'])
+        self.executor = ThreadPoolExecutor(max_workers=int(watch_config['workers']),
+                                           thread_name_prefix='n4-watch')
+        self.pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self.active = set()
+        self.rerun = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.source = None
+        if watch_config.get('use_inotify', True):
+            try:
+                self.source = _InotifySource(self.folders)
+                self.logger.info(f"Watching {self.folders} with inotify")
+            except (OSError, AttributeError, TypeError) as e:
+                self.logger.info(f"inotify unavailable ({str(e)}), polling instead")
+        if self.source is None:
+            self.source = _PollingSource(self.folders, float(watch_config['poll_interval']))
+            self.logger.info(f"Polling {self.folders} every {watch_config['poll_interval']}s")
+
+    @classmethod
+    def is_pcr_export(cls, path: str) -> bool:
+        """PCR CSV or PCR.htm dropped by an operator, not one of our own output files"""
+        name = os.path.basename(path)
+        if not cls.is_candidate(path):
+            return False
+        try:
+            if name.lower().endswith(PCR_REPORT_EXTENSIONS):
+                columns = set(PCRReportParser.read_header(path))
+            else:
+                columns = set(pd.read_csv(path, nrows=0).columns)
+        except Exception:
+            return False
+        return cls.PCR_COLUMNS <= columns
+
+    @classmethod
+    def is_candidate(cls, path: str) -> bool:
+        """File name looks like a PCR export worth inspecting"""
+        name = os.path.basename(path)
+        return (name.lower().endswith(('.csv',) + PCR_REPORT_EXTENSIONS)
+                and not cls.OUTPUT_PATTERN.search(name))
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll_once(self, timeout: float = 0.5) -> None:
+        """Collect changes and queue files whose writes have settled"""
+        now = time.monotonic()
+        for path in self.source.changes(timeout):
+            if self.is_candidate(path):
+                self.pending[path] = (self._signature(path), now)
+
+        now = time.monotonic()
+        for path, (signature, seen) in list(self.pending.items()):
+            current = self._signature(path)
+            if current is None:
+                del self.pending[path]
+            elif current != signature:
+                self.pending[path] = (current, now)  # still being written
+            elif now - seen >= self.debounce:
+                del self.pending[path]
+                if self.is_pcr_export(path):
+                    self.queue(path)
+
+    def queue(self, pcr_file: str) -> None:
+        with self._lock:
+            if pcr_file in self.active:
+                self.rerun.add(pcr_file)
+                return
+            self.active.add(pcr_file)
+        self._write_status(pcr_file, {'state': 'queued'})
+        self.executor.submit(self._process, pcr_file)
+
+    def _status_file(self, pcr_file: str) -> str:
+        return os.path.splitext(pcr_file)[0] + '.status.json'
+
+    def _write_status(self, pcr_file: str, status: Dict) -> None:
+        status = dict(status, pcr_file=pcr_file, updated=datetime.now().isoformat(timespec='seconds'))
+        try:
+            with open(self._status_file(pcr_file), 'w') as f:
+                json.dump(status, f, indent=2, default=str)
+        except OSError as e:
+            self.logger.warning(f"Could not write job status for {pcr_file}: {str(e)}")
+
+    def _process(self, pcr_file: str) -> None:
+        """Split a PCR file and generate every side with the board settings"""
+        board_dir = os.path.dirname(pcr_file)
+        stem = Path(pcr_file).stem
+        status = {'state': 'splitting', 'started': datetime.now().isoformat(timespec='seconds'),
+                  'outputs': [], 'errors': {}}
+        try:
+            self._write_status(pcr_file, status)
+            settings = load_board_settings(board_dir)
+            split = self.runner.run({'type': 'split', 'params': {'pcr_file': pcr_file}})
+            status.update(matched=split['matched'], unmatched=split['unmatched'],
+                          feeder_changes=split.get('feeder_changes'), state='generating')
+            self._write_status(pcr_file, status)
+
+            for side, bottom in self.SIDES:
+                side_file = os.path.join(board_dir, f"{stem}_{side}.csv")
+                template_file = os.path.join(board_dir, f"Neoden4_Template{stem}_{side}.csv")
+                if not (os.path.exists(side_file) and os.path.exists(template_file)):
+                    continue
+                try:
+                    result = self.runner.run({'type': 'generate', 'params': {
+                        'pcb_file': side_file,
+                        'template_file': template_file,
+                        'pcb_width': settings['pcb_width'],
+                        'sort_config': dict(settings['sort_config'], side=bottom)
+                    }})
+                    status['outputs'].append(result['output_file'])
+                except Exception as e:
+                    # A side without placeable parts must not stop the others
+                    status['errors'][side] = str(e)
+                    self.logger.warning(f"Generate {side} failed for {pcr_file}: {str(e)}")
+            status['state'] = 'done'
+            self.logger.info(f"Finished {pcr_file}: {len(status['outputs'])} N4 files")
+        except Exception as e:
+            status.update(state='failed', error=str(e))
+            self.logger.error(f"Watch job failed for {pcr_file}: {str(e)}", exc_info=True)
+        finally:
+            status['finished'] = datetime.now().isoformat(timespec='seconds')
+            self._write_status(pcr_file, status)
+            with self._lock:
+                self.active.discard(pcr_file)
+                again = pcr_file in self.rerun
+                self.rerun.discard(pcr_file)
+            if again:
+                self.queue(pcr_file)
+
+    def run(self) -> None:
+        """Watch until stop() is called"""
+        try:
+            while not self._stop.is_set():
+                self.poll_once()
+        finally:
+            self.source.close()
+            self.executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stop.set()
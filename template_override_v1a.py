@@ -1,9 +1,10 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext, messagebox
-import pandas as pd
 import os
 import logging
 from datetime import datetime
+from n4_core.override import override_templates
+from n4_core.logs import logging_configured, setup_logging
 
 class Template_Override:
     def __init__(self, root):
@@ -29,34 +30,10 @@ class Template_Override:
         return logger
 
     def setup_logger(self):
-        # Create logger
-        logger = logging.getLogger('TemplateOverride')
-        logger.setLevel(logging.INFO)
-        
-        # Create logs directory if it doesn't exist
-        log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-            
-        # Create log file with timestamp in logs directory
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        log_file = os.path.join(log_dir, f'template_override_{timestamp}.log')
-        
-        # Create file handler
-        fh = logging.FileHandler(log_file)
-        fh.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        fh.setFormatter(formatter)
-        
-        # Add handler to logger
-        logger.addHandler(fh)
-        
-        # Log the startup
-        logger.info(f"Log file created: {log_file}")
-        
-        return logger
+        # Write through the shared log files; a standalone run starts the writer itself
+        if not logging_configured():
+            setup_logging()
+        return logging.getLogger('TemplateOverride')
         
 
     def setup_gui(self):
@@ -122,91 +99,8 @@ class Template_Override:
             return
 
         try:
-            self.logger.info("Starting file processing")
-            
-            # Read CSV files
-            df1 = pd.read_csv(self.base_file_path, dtype=str, keep_default_na=False)
-            df2 = pd.read_csv(self.second_file_path, dtype=str, keep_default_na=False)
-            
-            # Split into stack and non-stack rows
-            df1_stack = df1[df1['#Feeder'] == 'stack'].copy()
-            df2_stack = df2[df2['#Feeder'] == 'stack'].copy()
-            preserve_rows = df1[df1['#Feeder'] != 'stack'].copy()
-            
-            # Convert second file components to list
-            available_components = df2_stack.to_dict('records')
-            matched_components = set()  # Track which components from file2 have been used
-            
-            # Lists to track results and replacements
-            result_rows = []
-            replacement_rows = []  # Track replacements for the new file
-            match_count = 0
-            fill_count = 0
-            
-            # First pass: Identify matches and keep them
-            for idx, base_row in df1_stack.iterrows():
-                new_row = base_row.copy()
-                match_found = False
-                replacement_row = base_row.copy()  # Create empty row for replacement tracking
-                
-                # Only look for match if position has component
-                if base_row['Footprint'].strip() not in ['-', ''] and base_row['Value'].strip() not in ['-', '']:
-                    for i, comp in enumerate(available_components):
-                        if (i not in matched_components and
-                            comp['Footprint'] == base_row['Footprint'] and 
-                            comp['Value'] == base_row['Value']):
-                            match_found = True
-                            matched_components.add(i)
-                            match_count += 1
-                            self.logger.info(f"Matched at Feeder ID {base_row['Feeder ID']}: {base_row['Footprint']} - {base_row['Value']}")
-                            # Clear replacement row for matched components
-                            for col in df1.columns[7:]:
-                                replacement_row[col] = ''
-                            break
-                
-                # If no match found, this position needs filling
-                if not match_found:
-                    # Get next unused component
-                    for i, comp in enumerate(available_components):
-                        if i not in matched_components:
-                            # Update component data from Footprint onwards
-                            for col in df1.columns[7:]:
-                                new_row[col] = comp[col]
-                                replacement_row[col] = comp[col]  # Track the replacement
-                            matched_components.add(i)
-                            fill_count += 1
-                            self.logger.info(f"Filled position at Feeder ID {base_row['Feeder ID']} with: {comp['Footprint']} - {comp['Value']}")
-                            break
-                else:
-                    # Clear replacement row for matched components
-                    for col in df1.columns[7:]:
-                        replacement_row[col] = ''
-                
-                result_rows.append(new_row)
-                replacement_rows.append(replacement_row)
-            
-            # Create main result dataframe
-            stack_df = pd.DataFrame(result_rows)
-            result_df = pd.concat([stack_df, preserve_rows], ignore_index=True)
-            
-            # Create replacement tracking dataframe
-            replacement_df = pd.DataFrame(replacement_rows)
-            replacement_df = pd.concat([replacement_df, preserve_rows], ignore_index=True)
-            
-            # Save main result
-            output_path = os.path.join(os.path.dirname(self.second_file_path), 
-                                     'template_override_' + os.path.basename(self.second_file_path))
-            result_df.to_csv(output_path, index=False)
-            
-            # Save replacement tracking file
-            replacement_path = os.path.join(os.path.dirname(self.second_file_path), 
-                                          'Component_Replacements.csv')
-            replacement_df.to_csv(replacement_path, index=False)
-            
-            self.logger.info(f"Matches (kept original): {match_count}")
-            self.logger.info(f"Positions filled: {fill_count}")
-            self.logger.info(f"Output files saved: \n{os.path.basename(output_path)}\n{os.path.basename(replacement_path)}")
-            msg = f"Processing complete\nMatches: {match_count}\nFilled: {fill_count}"
+            result = override_templates(self.base_file_path, self.second_file_path, self.logger)
+            msg = f"Processing complete\nMatches: {result['matches']}\nFilled: {result['filled']}"
             self.status_label.config(text=msg)
             
         except Exception as e: